@@ -0,0 +1,308 @@
+import asyncio
+import struct
+
+READ_COILS = 0x01
+READ_DISCRETE_INPUTS = 0x02
+READ_HOLDING_REGISTERS = 0x03
+READ_INPUT_REGISTERS = 0x04
+WRITE_MULTIPLE_COILS = 0x0F
+WRITE_MULTIPLE_REGISTERS = 0x10
+WRITE_READ_MULTIPLE_REGISTERS = 0x17
+
+_MBAP_HEADER = struct.Struct(">HHHB")
+
+
+def _pack_bits(values: list[bool]) -> bytes:
+    packed = bytearray((len(values) + 7) // 8)
+    for i, value in enumerate(values):
+        if value:
+            packed[i // 8] |= 1 << (i % 8)
+    return bytes(packed)
+
+
+def _unpack_bits(data: bytes, count: int) -> list[bool]:
+    return [bool(data[i // 8] >> (i % 8) & 1) for i in range(count)]
+
+
+class AsyncModbusClient:
+    """
+    Modbus TCP client on asyncio streams.
+
+    Mirrors the request methods of :class:`pyModbusTCP.client.ModbusClient` as coroutines, including
+    its error convention: failed requests return None (reads) or False (writes) and the reason is
+    available in :attr:`last_error`. The connection is opened on the first request and closed on
+    any transport error or invalid frame, so the next request reconnects. A request that times out
+    does not close it.
+
+    Up to ``max_outstanding`` requests are pipelined on the connection: they are sent without waiting
+    for the previous replies, which are matched to their requests by transaction ID. Every request
+    method accepts an optional ``unit_id``, so devices behind a gateway can share one connection.
+    """
+
+    def __init__(
+        self,
+        host: str = "localhost",
+        port: int = 502,
+        unit_id: int = 1,
+        timeout: float = 30.0,
+        max_outstanding: int = 1,
+    ):
+        if max_outstanding < 1:
+            raise ValueError("max_outstanding must be at least 1")
+        self.host: str = host
+        self.port: int = port
+        self.unit_id: int = unit_id
+        self.timeout: float = timeout
+        self.max_outstanding: int = max_outstanding
+        self.last_error: str = ""
+
+        self._writer: asyncio.StreamWriter | None = None
+        self._receive_task: asyncio.Task[None] | None = None
+        self._transaction_id: int = 0
+        self._pending: dict[int, asyncio.Future[tuple[int, int, bytes]]] = {}
+        self._open_lock: asyncio.Lock = asyncio.Lock()
+        self._slots: asyncio.Semaphore = asyncio.Semaphore(max_outstanding)
+
+    @property
+    def is_open(self) -> bool:
+        return self._writer is not None and not self._writer.is_closing()
+
+    def lower_max_outstanding(self, max_outstanding: int) -> None:
+        """
+        Lowers the number of requests that may be in flight at once, higher values are ignored.
+
+        Must only be called while no requests are in flight, e.g. when devices are added to a shared
+        connection before the simulation starts.
+
+        :param max_outstanding: the new maximum
+        :type max_outstanding: int
+        """
+        if max_outstanding < 1:
+            raise ValueError("max_outstanding must be at least 1")
+        if max_outstanding < self.max_outstanding:
+            self.max_outstanding = max_outstanding
+            self._slots = asyncio.Semaphore(max_outstanding)
+
+    async def open(self) -> bool:
+        async with self._open_lock:
+            if self.is_open:
+                return True
+            try:
+                reader, self._writer = await asyncio.wait_for(
+                    asyncio.open_connection(self.host, self.port), self.timeout
+                )
+            except (OSError, asyncio.TimeoutError) as e:
+                self.last_error = f"connect to {self.host}:{self.port} failed: {e!r}"
+                return False
+            self._receive_task = asyncio.get_running_loop().create_task(
+                self._receive_loop(reader, self._writer)
+            )
+            return True
+
+    async def close(self) -> None:
+        writer = self._writer
+        receive_task = self._receive_task
+        self._writer = None
+        self._receive_task = None
+        self._fail_pending(ConnectionError("connection closed"))
+        if receive_task is not None and receive_task is not asyncio.current_task():
+            receive_task.cancel()
+        if writer is None:
+            return
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except OSError:
+            pass
+
+    async def read_coils(
+        self, bit_addr: int, bit_nb: int = 1, unit_id: int | None = None
+    ) -> list[bool] | None:
+        return await self._read_bits(READ_COILS, bit_addr, bit_nb, unit_id)
+
+    async def read_discrete_inputs(
+        self, bit_addr: int, bit_nb: int = 1, unit_id: int | None = None
+    ) -> list[bool] | None:
+        return await self._read_bits(READ_DISCRETE_INPUTS, bit_addr, bit_nb, unit_id)
+
+    async def read_holding_registers(
+        self, reg_addr: int, reg_nb: int = 1, unit_id: int | None = None
+    ) -> list[int] | None:
+        return await self._read_registers(
+            READ_HOLDING_REGISTERS, reg_addr, reg_nb, unit_id
+        )
+
+    async def read_input_registers(
+        self, reg_addr: int, reg_nb: int = 1, unit_id: int | None = None
+    ) -> list[int] | None:
+        return await self._read_registers(
+            READ_INPUT_REGISTERS, reg_addr, reg_nb, unit_id
+        )
+
+    async def write_multiple_coils(
+        self, bits_addr: int, bits_value: list[bool], unit_id: int | None = None
+    ) -> bool:
+        packed = _pack_bits(bits_value)
+        pdu = (
+            struct.pack(
+                ">BHHB", WRITE_MULTIPLE_COILS, bits_addr, len(bits_value), len(packed)
+            )
+            + packed
+        )
+        return await self._request(pdu, unit_id) is not None
+
+    async def write_multiple_registers(
+        self, regs_addr: int, regs_value: list[int], unit_id: int | None = None
+    ) -> bool:
+        pdu = struct.pack(
+            f">BHHB{len(regs_value)}H",
+            WRITE_MULTIPLE_REGISTERS,
+            regs_addr,
+            len(regs_value),
+            2 * len(regs_value),
+            *regs_value,
+        )
+        return await self._request(pdu, unit_id) is not None
+
+    async def write_read_multiple_registers(
+        self,
+        write_addr: int,
+        write_values: list[int],
+        read_addr: int,
+        read_nb: int = 1,
+        unit_id: int | None = None,
+    ) -> list[int] | None:
+        pdu = struct.pack(
+            f">BHHHHB{len(write_values)}H",
+            WRITE_READ_MULTIPLE_REGISTERS,
+            read_addr,
+            read_nb,
+            write_addr,
+            len(write_values),
+            2 * len(write_values),
+            *write_values,
+        )
+        rx_pdu = await self._request(pdu, unit_id)
+        if rx_pdu is None:
+            return None
+        return self._decode_registers(rx_pdu, read_nb)
+
+    async def _read_bits(
+        self, function_code: int, bit_addr: int, bit_nb: int, unit_id: int | None
+    ) -> list[bool] | None:
+        rx_pdu = await self._request(
+            struct.pack(">BHH", function_code, bit_addr, bit_nb), unit_id
+        )
+        if rx_pdu is None:
+            return None
+        if rx_pdu[1] < (bit_nb + 7) // 8 or rx_pdu[1] != len(rx_pdu) - 2:
+            self.last_error = "rx byte count mismatch"
+            return None
+        return _unpack_bits(rx_pdu[2:], bit_nb)
+
+    async def _read_registers(
+        self, function_code: int, reg_addr: int, reg_nb: int, unit_id: int | None
+    ) -> list[int] | None:
+        rx_pdu = await self._request(
+            struct.pack(">BHH", function_code, reg_addr, reg_nb), unit_id
+        )
+        if rx_pdu is None:
+            return None
+        return self._decode_registers(rx_pdu, reg_nb)
+
+    def _decode_registers(self, rx_pdu: bytes, reg_nb: int) -> list[int] | None:
+        if rx_pdu[1] < 2 * reg_nb or rx_pdu[1] != len(rx_pdu) - 2:
+            self.last_error = "rx byte count mismatch"
+            return None
+        return list(struct.unpack_from(f">{reg_nb}H", rx_pdu, 2))
+
+    async def _request(self, tx_pdu: bytes, unit_id: int | None) -> bytes | None:
+        """
+        Sends a request PDU and waits for the matching response PDU.
+
+        :param tx_pdu: the request PDU
+        :type tx_pdu: bytes
+        :param unit_id: the unit ID to address, None for the default unit ID of the client
+        :type unit_id: int | None
+        :return: the response PDU, or None if the request failed
+        :rtype: bytes | None
+        """
+        tx_unit_id = self.unit_id if unit_id is None else unit_id
+        async with self._slots:
+            if not await self.open():
+                return None
+            writer = self._writer
+            assert writer is not None
+
+            self._transaction_id = (self._transaction_id + 1) & 0xFFFF
+            transaction_id = self._transaction_id
+            future: asyncio.Future[tuple[int, int, bytes]] = (
+                asyncio.get_running_loop().create_future()
+            )
+            self._pending[transaction_id] = future
+            try:
+                writer.write(
+                    _MBAP_HEADER.pack(transaction_id, 0, len(tx_pdu) + 1, tx_unit_id)
+                    + tx_pdu
+                )
+                await writer.drain()
+                protocol_id, rx_unit_id, rx_pdu = await asyncio.wait_for(
+                    future, self.timeout
+                )
+            except asyncio.TimeoutError:
+                # a late reply matches no pending request and is dropped, so the
+                # connection stays open for the other devices sharing it
+                self._pending.pop(transaction_id, None)
+                self.last_error = "request timed out"
+                return None
+            except OSError as e:
+                self._pending.pop(transaction_id, None)
+                self.last_error = f"request failed: {e!r}"
+                await self.close()
+                return None
+
+        if protocol_id != 0 or rx_unit_id != tx_unit_id or len(rx_pdu) < 2:
+            self.last_error = "invalid response frame"
+            await self.close()
+            return None
+        if rx_pdu[0] == tx_pdu[0] | 0x80:
+            self.last_error = f"modbus exception {rx_pdu[1]}"
+            return None
+        if rx_pdu[0] != tx_pdu[0]:
+            self.last_error = "function code mismatch"
+            return None
+        return rx_pdu
+
+    async def _receive_loop(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        """
+        Reads response frames and hands them to the waiting request by transaction ID.
+        """
+        try:
+            while True:
+                header = await reader.readexactly(_MBAP_HEADER.size)
+                transaction_id, protocol_id, length, unit_id = _MBAP_HEADER.unpack(
+                    header
+                )
+                if length < 2:
+                    # no unit ID and function code, the stream can not be resynchronized
+                    if self._writer is writer:
+                        self.last_error = "invalid response frame"
+                        await self.close()
+                    return
+                rx_pdu = await reader.readexactly(length - 1)
+                future = self._pending.pop(transaction_id, None)
+                if future is not None and not future.done():
+                    future.set_result((protocol_id, unit_id, rx_pdu))
+        except (OSError, asyncio.IncompleteReadError) as e:
+            if self._writer is writer:
+                self.last_error = f"connection lost: {e!r}"
+                await self.close()
+
+    def _fail_pending(self, exc: Exception) -> None:
+        pending = self._pending
+        self._pending = {}
+        for future in pending.values():
+            if not future.done():
+                future.set_exception(exc)
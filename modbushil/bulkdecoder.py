@@ -0,0 +1,81 @@
+from typing import Any
+
+from .variablecodec import VariableCodec
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional, MappingManager decodes without it
+    np = None
+
+# variable slot, codec, image, byte offset and scale of a read variable
+ReadBinding = tuple[int, VariableCodec, bytearray, int, float | None]
+
+
+class BulkDecoder:
+    """
+    Decodes the read variables of a model with NumPy, in one vectorized operation per group of
+    variables sharing a register image and value type.
+
+    Each group gathers the value bytes of all its variables from the image with a fancy index built
+    once on construction, least significant byte first, so byte and word orders cost nothing extra.
+    The gathered bytes are viewed as a little-endian array of the value type and scaled as a whole.
+    Variables without a NumPy type, e.g. integers spanning 3 registers, are left in :attr:`remaining`
+    for the caller to decode one at a time.
+    """
+
+    def __init__(self, read_bindings: list[ReadBinding]):
+        if np is None:
+            raise ImportError("BulkDecoder requires NumPy")
+
+        grouped: dict[tuple[int, str, int, bool], list[ReadBinding]] = {}
+        self.remaining: list[ReadBinding] = []
+        images: dict[int, bytearray] = {}
+        for binding in read_bindings:
+            _, codec, data, _, scale = binding
+            if codec.size not in (1, 2, 4, 8):
+                self.remaining.append(binding)
+                continue
+            images[id(data)] = data
+            key = (id(data), codec.kind, codec.size, scale is not None)
+            grouped.setdefault(key, []).append(binding)
+
+        self.groups: list[tuple[list[int], Any, Any, Any, Any]] = []
+        for (image_id, kind, size, scaled), bindings in grouped.items():
+            raw = np.frombuffer(images[image_id], dtype=np.uint8)
+            index = np.array(
+                [
+                    [offset + p for p in codec.byte_positions]
+                    for _, codec, _, offset, _ in bindings
+                ],
+                dtype=np.intp,
+            )
+            dtype = np.dtype("?") if kind == "b" else np.dtype(f"<{kind}{size}")
+            scales = (
+                np.array([scale for *_, scale in bindings], dtype=np.float64)
+                if scaled
+                else None
+            )
+            self.groups.append(
+                ([slot for slot, *_ in bindings], raw, index, dtype, scales)
+            )
+
+    @staticmethod
+    def is_available() -> bool:
+        """
+        Whether NumPy is installed.
+        """
+        return np is not None
+
+    def decode(self, buffer: list[Any]) -> None:
+        """
+        Decodes all grouped variables into the variable buffer.
+
+        :param buffer: the slot indexed variable buffer to store the values in
+        :type buffer: list[Any]
+        """
+        for slots, raw, index, dtype, scales in self.groups:
+            values = raw[index].view(dtype).ravel()
+            if scales is not None:
+                values = values * scales
+            for slot, value in zip(slots, values.tolist()):
+                buffer[slot] = value
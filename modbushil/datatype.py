@@ -1,3 +1,4 @@
+import re
 from enum import Enum
 
 
@@ -11,6 +12,7 @@ class DataType(Enum):
     float32 = "float32"
     float64 = "float64"
     bool = "bool"
+    bits = "bits"
 
     @classmethod
     def from_string(cls, s: str) -> "DataType":
@@ -33,5 +35,39 @@ class DataType(Enum):
             return DataType.float64
         elif s_lower == "bool" or s_lower == "boolean":
             return DataType.bool
+        elif s_lower == "bits":
+            return DataType.bits
         else:
             raise ValueError(f"Invalid DataType string: {s}")
+
+    @classmethod
+    def from_array_string(cls, s: str) -> tuple["DataType", int | None]:
+        """
+        Parses a data type string, optionally followed by an array length like ``float32[96]``.
+
+        :param s: the data type string
+        :type s: str
+        :return: the data type and the array length, None if it is no array
+        :rtype: tuple[DataType, int | None]
+        """
+        match = re.fullmatch(r"\s*(\w+)\s*\[\s*(\d+)\s*\]\s*", s)
+        if match is None:
+            return cls.from_string(s), None
+        count = int(match.group(2))
+        if count < 1:
+            raise ValueError(f"Array length must be at least 1: {s}")
+        return cls.from_string(match.group(1)), count
+
+    def register_count(self) -> int:
+        """
+        Gets the number of registers (or discretes for bool) a single value of this type occupies.
+
+        :return: the number of registers
+        :rtype: int
+        """
+        if self in (DataType.uint16, DataType.int16, DataType.bool, DataType.bits):
+            return 1
+        elif self in (DataType.uint32, DataType.int32, DataType.float32):
+            return 2
+        else:
+            return 4
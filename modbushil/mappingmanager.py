@@ -1,108 +1,311 @@
+import logging
 from typing import Any
 
+from pyModbusTCP.client import ModbusClient
+
+from .asyncmodbusclient import AsyncModbusClient
+from .bulkdecoder import BulkDecoder, ReadBinding
+from .methodgraph import MethodGraphState
 from .modbusclientmanager import ModbusClientManager
+from .modbusconnectionpool import PooledAsyncModbusClient, PooledModbusClient
 from .modbusintegrationsettings import ModbusIntegrationSettings
+from .modbusiobundlesconfiguration import ReadInterval
 from .variablemapping import VariableMapping
-from .iotype import IOType
-from .datatype import DataType
+from .modbusregistertypes import ModbusRegisterTypes
+from .variablecodec import VariableCodec
+from .variableplan import VariablePlan
+from .variableslots import UNSET, VariableSlots
 
+logger = logging.getLogger(__name__)
 
 class MappingManager:
-    def __init__(self, config: ModbusIntegrationSettings, host: str, port: int):
+    def __init__(
+        self,
+        config: ModbusIntegrationSettings,
+        host: str,
+        port: int,
+        modbus_client: (
+            ModbusClient
+            | AsyncModbusClient
+            | PooledModbusClient
+            | PooledAsyncModbusClient
+            | None
+        ) = None,
+    ):
         self.config: ModbusIntegrationSettings = config
 
-        self.variable_buffer: dict[str, Any] = {}
+        # values of all variables of this entity, indexed by their slots in the
+        # shared numbering of the model
+        self.slots: VariableSlots = config.slots
+        self.variable_buffer: list[Any] = config.slots.create_buffer()
+        # reused for the values sent to Mosaik after every step
+        self.mosaik_persistent_values: dict[str, Any] = {}
+        # values seen by the incremental method evaluation of this entity
+        self.read_method_state: MethodGraphState = (
+            config.read_method_graph.create_state()
+        )
+        self.write_method_state: MethodGraphState = (
+            config.write_method_graph.create_state()
+        )
 
         self.modbus_manager: ModbusClientManager = ModbusClientManager(
-            host, port, config.modbus_io_bundles
+            host,
+            port,
+            config.request_plan,
+            modbus_client=modbus_client,
+            client_settings=config.modbus_client,
         )
-        self.modbus_manager.connect()
+        if not self.modbus_manager.is_async:
+            self.modbus_manager.connect()
+
+        # the read and write images of this entity, the shared variable plan of
+        # the model holds the offsets of the variables within them
+        self.plan: VariablePlan = config.variable_plan
+        self.read_data: dict[ModbusRegisterTypes, bytearray] = {
+            reg_type: image.data
+            for reg_type, image in self.modbus_manager.read_images.items()
+        }
+        self.write_data: dict[ModbusRegisterTypes, bytearray] = {
+            reg_type: image.data
+            for reg_type, image in self.modbus_manager.write_images.items()
+        }
+
+        # decodes the scalar read variables in bulk with NumPy, if enabled
+        vectorized_decode = config.vectorized_decode
+        if vectorized_decode and not BulkDecoder.is_available():
+            logger.warning(
+                "vectorized_decode is enabled but NumPy is not installed, "
+                "decoding without it"
+            )
+            vectorized_decode = False
+        # the read variables of every interval and their bulk decoder, they are only
+        # decoded on the read cycles sending the requests of their interval
+        self.read_plans: dict[
+            ReadInterval, tuple[VariablePlan, BulkDecoder | None]
+        ] = {
+            interval: (
+                plan,
+                self._create_bulk_decoder(plan) if vectorized_decode else None,
+            )
+            for interval, plan in config.read_variable_plans.items()
+        }
+
+    def _create_bulk_decoder(self, plan: VariablePlan) -> BulkDecoder:
+        read_bindings: list[ReadBinding] = []
+        for reg_type, entries in plan.reads:
+            data = self.read_data[reg_type]
+            read_bindings.extend(
+                (slot, codec, data, offset, None) for slot, codec, offset in entries
+            )
+        for reg_type, entries in plan.scaled_reads:
+            data = self.read_data[reg_type]
+            read_bindings.extend(
+                (slot, codec, data, offset, scale)
+                for slot, codec, offset, scale in entries
+            )
+        return BulkDecoder(read_bindings)
 
     def close(self) -> None:
         self.modbus_manager.disconnect()
 
+    async def close_async(self) -> None:
+        await self.modbus_manager.disconnect_async()
+
     def get_variable_mapping(self, variable_name: str) -> VariableMapping:
         return self.config.variables[variable_name]
 
     def read_phase(self) -> None:
         self.modbus_manager.do_read()
+        self._decode_read_variables()
 
-        # direct variable mappings
-        for var_name, var in self.config.variables.items():
-            if var.register is None:
-                continue
+    def write_phase(self) -> None:
+        self._encode_write_variables()
+        self.modbus_manager.do_write()
 
-            if var.io_type not in (IOType.READ, IOType.BOTH):
-                continue
+    def read_write_phase(self) -> None:
+        """
+        Runs the write phase followed by the read phase, sharing Modbus transactions between both where the device allows it.
+        """
+        self._encode_write_variables()
+        self.modbus_manager.do_read_write()
+        self._decode_read_variables()
 
-            value = None
-            if var.data_type in (DataType.int16, DataType.int32, DataType.int64):
-                value = self.modbus_manager.get_int(var.register)
-            elif var.data_type in (DataType.uint16, DataType.uint32, DataType.uint64):
-                value = self.modbus_manager.get_uint(var.register)
-            elif var.data_type in (DataType.float32, DataType.float64):
-                value = self.modbus_manager.get_float(var.register)
-            elif var.data_type == DataType.bool:
-                value = self.modbus_manager.get_bool(var.register)
-            else:
-                raise ValueError(f"Unsupported data type: {var.data_type}")
+    async def read_write_phase_async(self) -> None:
+        """
+        Coroutine version of :func:`read_write_phase`, requires an :class:`AsyncModbusClient`.
+        """
+        self._encode_write_variables()
+        await self.modbus_manager.do_read_write_async()
+        self._decode_read_variables()
 
-            if var.scale is not None:
-                value = value * var.scale
+    def _decode_read_variables(self) -> None:
+        buffer = self.variable_buffer
+        read_data = self.read_data
 
-            self.variable_buffer[var_name] = value
+        # direct variable mappings of the bundles read by the last read cycle
+        for interval in self.modbus_manager.refreshed_intervals:
+            if interval not in self.read_plans:
+                continue
+            plan, bulk_decoder = self.read_plans[interval]
+            if bulk_decoder is not None:
+                bulk_decoder.decode(buffer)
+                for slot, codec, data, offset, scale in bulk_decoder.remaining:
+                    value = codec.decode_from(data, offset)
+                    buffer[slot] = value if scale is None else value * scale
+            else:
+                for reg_type, entries in plan.reads:
+                    data = read_data[reg_type]
+                    for slot, codec, offset in entries:
+                        buffer[slot] = codec.decode_from(data, offset)
+                for reg_type, scaled_entries in plan.scaled_reads:
+                    data = read_data[reg_type]
+                    for slot, codec, offset, scale in scaled_entries:
+                        buffer[slot] = codec.decode_from(data, offset) * scale
+            for reg_type, groups in plan.bit_field_groups:
+                data = read_data[reg_type]
+                for word_codec, offset, flags, fields in groups:
+                    word = word_codec.decode_from(data, offset)
+                    for slot, mask in flags:
+                        buffer[slot] = word & mask != 0
+                    for slot, shift, mask in fields:
+                        buffer[slot] = (word >> shift) & mask
+            for reg_type, entries in plan.array_reads:
+                data = read_data[reg_type]
+                for slot, codec, offset in entries:
+                    buffer[slot] = codec.decode_from(data, offset)
+            for reg_type, scaled_entries in plan.scaled_array_reads:
+                data = read_data[reg_type]
+                for slot, codec, offset, scale in scaled_entries:
+                    buffer[slot] = [
+                        v * scale for v in codec.decode_from(data, offset)
+                    ]
 
         # read methods
-        for method in self.config.read_methods:
-            result = method.invoke(self.variable_buffer)
-            self.variable_buffer[method.variable] = result
+        if self.config.incremental_methods:
+            self.config.read_method_graph.evaluate(buffer, self.read_method_state)
+        else:
+            for method in self.config.read_methods:
+                buffer[method.slot] = method.evaluate(buffer)
 
-    def write_phase(self) -> None:
-        # write methods
-        for method in self.config.write_methods:
-            result = method.invoke(self.variable_buffer)
-            self.variable_buffer[method.variable] = result
-
-        # direct variable mappings
-        for var_name, var in self.config.variables.items():
-            if var.register is None:
-                continue
+    def _encode_write_variables(self) -> None:
+        buffer = self.variable_buffer
+        plan = self.plan
+        write_data = self.write_data
+        dirty_write = self.modbus_manager.dirty_write
 
-            if var.io_type not in (IOType.WRITE, IOType.BOTH):
-                continue
+        # write methods
+        if self.config.incremental_methods:
+            self.config.write_method_graph.evaluate(buffer, self.write_method_state)
+        else:
+            for method in self.config.write_methods:
+                buffer[method.slot] = method.evaluate(buffer)
 
-            if var_name not in self.variable_buffer:
-                raise ValueError(f"Variable '{var_name}' not found in variable buffer.")
-
-            value = self.variable_buffer[var_name]
-            if var.scale is not None:
-                value = value / var.scale
-
-            if var.data_type in (DataType.int16, DataType.int32, DataType.int64):
-                self.modbus_manager.set_int(var.register, int(value))
-            elif var.data_type in (DataType.uint16, DataType.uint32, DataType.uint64):
-                self.modbus_manager.set_uint(var.register, int(value))
-            elif var.data_type in (DataType.float32, DataType.float64):
-                self.modbus_manager.set_float(var.register, float(value))
-            elif var.data_type == DataType.bool:
-                self.modbus_manager.set_bool(var.register, bool(value))
-            else:
-                raise ValueError(f"Unsupported data type: {var.data_type}")
+        # direct variable mappings, changed spans are sent on the next write cycle
+        try:
+            for reg_type, entries in plan.writes:
+                data, dirty = write_data[reg_type], dirty_write[reg_type]
+                for slot, codec, offset, range_start, span in entries:
+                    if codec.encode_into(data, offset, buffer[slot]):
+                        dirty[range_start].add(span)
+            for reg_type, scaled_entries in plan.scaled_writes:
+                data, dirty = write_data[reg_type], dirty_write[reg_type]
+                for slot, codec, offset, range_start, span, scale in scaled_entries:
+                    if codec.encode_into(data, offset, buffer[slot] / scale):
+                        dirty[range_start].add(span)
+            for reg_type, entries in plan.array_writes:
+                data, dirty = write_data[reg_type], dirty_write[reg_type]
+                for slot, codec, offset, range_start, span in entries:
+                    values = buffer[slot]
+                    self._check_length(slot, codec, values)
+                    if codec.encode_into(data, offset, values):
+                        dirty[range_start].add(span)
+            for reg_type, scaled_entries in plan.scaled_array_writes:
+                data, dirty = write_data[reg_type], dirty_write[reg_type]
+                for slot, codec, offset, range_start, span, scale in scaled_entries:
+                    values = buffer[slot]
+                    self._check_length(slot, codec, values)
+                    values = [v / scale for v in values]
+                    if codec.encode_into(data, offset, values):
+                        dirty[range_start].add(span)
+        except TypeError:
+            # unset variables fail to encode, report them instead
+            for groups in (
+                plan.writes,
+                plan.scaled_writes,
+                plan.array_writes,
+                plan.scaled_array_writes,
+            ):
+                for _, entries in groups:
+                    for slot, *_ in entries:
+                        if buffer[slot] is UNSET:
+                            raise ValueError(
+                                f"Variable '{self.slots.names[slot]}' not found in variable buffer."
+                            ) from None
+            raise
 
-        self.modbus_manager.do_write()
+    def _check_length(
+        self, slot: int, codec: VariableCodec, values: list[Any]
+    ) -> None:
+        if values is not UNSET and len(values) != codec.count:
+            raise ValueError(
+                f"Variable '{self.slots.names[slot]}' requires {codec.count} values, got {len(values)}."
+            )
 
     def get_variable_value(self, variable_name: str) -> Any:
-        return self.variable_buffer[variable_name]
+        value = self.variable_buffer[self.slots[variable_name]]
+        if value is UNSET:
+            raise KeyError(variable_name)
+        return value
 
     def set_variable_value(self, variable_name: str, value: Any) -> None:
-        self.variable_buffer[variable_name] = value
+        self.variable_buffer[self.slots[variable_name]] = value
 
     def update_variable_buffer(self, vars: dict[str, Any]) -> None:
+        buffer = self.variable_buffer
+        slots = self.slots
         for var_name, value in vars.items():
-            self.set_variable_value(var_name, value)
+            buffer[slots[var_name]] = value
+
+    def get_variables(self) -> dict[str, Any]:
+        """
+        Gets the values of all variables which are set, by name.
+
+        :return: a new dict of the values
+        :rtype: dict[str, Any]
+        """
+        return {
+            name: value
+            for name, value in zip(self.slots.names, self.variable_buffer)
+            if value is not UNSET
+        }
+
+    def get_refreshed_mosaik_persistent_variables(self) -> list[str]:
+        """
+        Gets the variables sent to Mosaik which were updated by the last read cycle.
+
+        Variables of bundles which were not due keep their previous value and are left out, those
+        set by read methods are always included.
+
+        :return: the names of the variables
+        :rtype: list[str]
+        """
+        intervals = self.config.mosaik_persistent_intervals
+        refreshed = list(intervals.get(None, ()))
+        for interval in self.modbus_manager.refreshed_intervals:
+            refreshed.extend(intervals.get(interval, ()))
+        return refreshed
 
     def get_all_mosaik_persistent_variables(self) -> dict[str, Any]:
-        result = {}
-        for var_name in self.config.get_mosaik_persistent_variables():
-            result[var_name] = self.get_variable_value(var_name)
+        """
+        Gets the values of the variables sent to Mosaik.
+
+        The same dict is updated and returned on every call, so it must be consumed before the next step.
+
+        :return: the values by variable name
+        :rtype: dict[str, Any]
+        """
+        buffer = self.variable_buffer
+        result = self.mosaik_persistent_values
+        for var_name, slot in self.config.mosaik_persistent_slots:
+            result[var_name] = buffer[slot]
         return result
@@ -0,0 +1,73 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Callable
+
+
+class MethodCache:
+    """
+    Least recently used cache of the results of a pure function, keyed by its parameters.
+
+    Lists are keyed as tuples, but passed to the function as they are. With a quantization step,
+    float parameters and float elements of list parameters are rounded to a multiple of it before
+    the lookup and passed to the function rounded, so near-identical inputs share a result. The
+    cache is shared by all entities of a model and safe to use from multiple threads, the function
+    itself is called outside of the lock.
+    """
+
+    def __init__(self, function: Callable[..., Any], cache_config: dict[str, Any]):
+        self.function: Callable[..., Any] = function
+
+        self.size: int = cache_config["size"]
+        if not isinstance(self.size, int) or self.size < 1:
+            raise ValueError(f"Invalid cache size: {self.size}")
+
+        # step float parameters are rounded to, None to use them as they are
+        self.quantize: float | None = None
+        if "quantize" in cache_config:
+            self.quantize = float(cache_config["quantize"])
+            if not self.quantize > 0:
+                raise ValueError(f"Invalid cache quantization: {self.quantize}")
+
+        self.hits: int = 0
+        self.misses: int = 0
+        self._results: OrderedDict[tuple[Any, ...], Any] = OrderedDict()
+        self._lock: threading.Lock = threading.Lock()
+
+    def __call__(self, *params: Any) -> Any:
+        if self.quantize is not None:
+            params = tuple(self._quantize(p) for p in params)
+        key = tuple(tuple(p) if isinstance(p, list) else p for p in params)
+
+        with self._lock:
+            if key in self._results:
+                self._results.move_to_end(key)
+                self.hits += 1
+                return self._results[key]
+            self.misses += 1
+
+        result = self.function(*params)
+        with self._lock:
+            self._results[key] = result
+            if len(self._results) > self.size:
+                self._results.popitem(last=False)
+        return result
+
+    def __len__(self) -> int:
+        return len(self._results)
+
+    def clear(self) -> None:
+        """
+        Removes all cached results and resets the hit and miss counters.
+        """
+        with self._lock:
+            self._results.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def _quantize(self, value: Any) -> Any:
+        assert self.quantize is not None
+        if isinstance(value, float):
+            return round(value / self.quantize) * self.quantize
+        if isinstance(value, list):
+            return [self._quantize(v) for v in value]
+        return value
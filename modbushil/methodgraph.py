@@ -0,0 +1,102 @@
+from heapq import heappop, heappush
+from typing import Any
+
+from .methodinvoker import MethodInvoker
+from .variableslots import UNSET
+
+# last seen value of every input variable and the methods to run on the next
+# evaluation, kept per entity
+MethodGraphState = tuple[list[Any], set[int]]
+
+
+class MethodGraph:
+    """
+    Dependency graph of the read or write methods of a model, evaluating only the methods affected by
+    changed variables.
+
+    The methods stay in their configured order, in which :func:`ModbusIntegrationSettings.check_validity`
+    already ensures every required variable is set before it is used. On construction the slot of each
+    variable is mapped to the methods requiring it, and to the methods setting it, which overwrite it
+    again when it changes, so the methods have to be bound with :func:`MethodInvoker.bind` first. An
+    evaluation compares the inputs with the values seen last time and runs the dependents of the changed
+    ones in order. A method whose result changed schedules its later dependents in the same evaluation,
+    and its earlier dependents as well as itself, if it requires its own variable, for the next one,
+    exactly like running all methods every time.
+
+    Methods are assumed to depend only on their variables. The graph itself is immutable and shared by
+    all entities of a model, the values seen by an entity are kept in its :class:`MethodGraphState`.
+    """
+
+    def __init__(self, methods: list[MethodInvoker]):
+        self.methods: tuple[MethodInvoker, ...] = tuple(methods)
+
+        dependents: dict[int, set[int]] = {}
+        for i, method in enumerate(self.methods):
+            for slot in method.parameter_slots:
+                dependents.setdefault(slot, set()).add(i)
+            dependents.setdefault(method.slot, set()).add(i)
+        # variable slot -> indices of the methods to run when it changes
+        self.dependents: dict[int, tuple[int, ...]] = {
+            slot: tuple(sorted(indices)) for slot, indices in dependents.items()
+        }
+        self.inputs: tuple[int, ...] = tuple(self.dependents)
+        self.input_index: dict[int, int] = {
+            slot: k for k, slot in enumerate(self.inputs)
+        }
+        # methods requiring the variable they set, which see their own result
+        # on the next evaluation
+        self.self_dependent: frozenset[int] = frozenset(
+            i
+            for i, method in enumerate(self.methods)
+            if method.slot in method.parameter_slots
+        )
+
+    def create_state(self) -> MethodGraphState:
+        """
+        Creates the state of an entity which has not evaluated any method yet.
+
+        :return: no input seen and all methods pending
+        :rtype: MethodGraphState
+        """
+        return [UNSET] * len(self.inputs), set(range(len(self.methods)))
+
+    def evaluate(self, buffer: list[Any], state: MethodGraphState) -> None:
+        """
+        Runs the methods affected by the variables changed since the last evaluation.
+
+        :param buffer: the slot indexed variables of the entity, method results are stored in it
+        :type buffer: list[Any]
+        :param state: the state of the entity, updated in place
+        :type state: MethodGraphState
+        """
+        seen, deferred = state
+        queued = set(deferred)
+        deferred.clear()
+        for k, slot in enumerate(self.inputs):
+            value = buffer[slot]
+            if value is not seen[k] and value != seen[k]:
+                seen[k] = value
+                queued.update(self.dependents[slot])
+        if not queued:
+            return
+
+        # sorted lists are valid heaps
+        queue = sorted(queued)
+        while queue:
+            i = heappop(queue)
+            method = self.methods[i]
+            slot = method.slot
+            previous = buffer[slot]
+            result = method.evaluate(buffer)
+            buffer[slot] = result
+            if result is previous or (previous is not UNSET and result == previous):
+                continue
+
+            seen[self.input_index[slot]] = result
+            for j in self.dependents[slot]:
+                if j > i:
+                    if j not in queued:
+                        queued.add(j)
+                        heappush(queue, j)
+                elif j < i or j in self.self_dependent:
+                    deferred.add(j)
@@ -1,37 +1,109 @@
 import re
-from typing import Any
+from typing import Any, Callable
+
+from .methodcache import MethodCache
+from .restrictedexpression import RestrictedExpression
+from .variableslots import UNSET, VariableSlots
+
+# $(variable) references in eval expressions
+_VARIABLE_PATTERN = re.compile(r"\$\((.*?)\)")
 
 
 class MethodInvoker:
-    def __init__(self, method_config: dict[str, Any]):
+    def __init__(self, method_config: dict[str, Any], restricted: bool = False):
         self.variable = method_config["set"]
         self.action = method_config["action"]
         if self.action == "eval":
             self.expression = method_config["expression"]
             # extract all $(variable) occurrences
-            self.required_variables: list[str] = re.findall(
-                r"\$\((.*?)\)", self.expression
+            self.required_variables: list[str] = _VARIABLE_PATTERN.findall(
+                self.expression
+            )
+            self.parameters: list[str] = list(dict.fromkeys(self.required_variables))
+            self.function: Callable[..., Any] = MethodInvoker.compile_expression(
+                self.expression, self.parameters, restricted
             )
         elif self.action == "function":
             self.required_variables: list[str] = method_config["parameters"]
+            self.parameters = self.required_variables
             self.function = method_config["function"]
         else:
             raise ValueError(f"Invalid method action: {self.action}")
 
+        # memoized results of pure functions, None if not cached
+        self.cache: MethodCache | None = None
+        if "cache" in method_config:
+            if self.action != "function":
+                raise ValueError("Only function methods can be cached")
+            self.cache = MethodCache(self.function, method_config["cache"])
+            self.function = self.cache
+
+        # slots of the set variable and the parameters, resolved by bind
+        self.slot: int = -1
+        self.parameter_slots: tuple[int, ...] = ()
+
+    @staticmethod
+    def compile_expression(
+        expression: str, parameters: list[str], restricted: bool = False
+    ) -> Callable[..., Any]:
+        """
+        Compiles an eval expression once into a function taking the values of its variables.
+
+        Every ``$(variable)`` is replaced by a parameter of the function, so values are passed
+        as they are instead of being formatted into the expression on every call.
+
+        :param expression: the expression with ``$(variable)`` references
+        :type expression: str
+        :param parameters: the referenced variables in the order of the function parameters
+        :type parameters: list[str]
+        :param restricted: limit the expression to the whitelist of :class:`RestrictedExpression`
+            instead of allowing any Python expression
+        :type restricted: bool
+        :return: the compiled function
+        :rtype: Callable[..., Any]
+        """
+        names = {var: f"_var{i}" for i, var in enumerate(parameters)}
+        source = _VARIABLE_PATTERN.sub(lambda m: names[m.group(1)], expression)
+        try:
+            if restricted:
+                return RestrictedExpression(source, list(names.values())).function
+            return eval(f"lambda {', '.join(names.values())}: ({source})", {})
+        except SyntaxError as e:
+            raise ValueError(f"Invalid expression {expression}: {e.msg}") from e
+        except ValueError as e:
+            raise ValueError(f"Invalid expression {expression}: {e}") from e
+
     def invoke(self, variable_values: dict[str, Any]) -> float:
-        if self.action == "eval":
-            eval_expression = self.expression
-            for var in self.required_variables:  # TODO: optimize
-                if var not in variable_values:
-                    raise ValueError(
-                        f"Variable {var} not provided for method evaluation"
-                    )
-                eval_expression = eval_expression.replace(
-                    f"$({var})", str(variable_values[var])
-                )
-            return eval(eval_expression)
-        elif self.action == "function":
-            params = [variable_values[var] for var in self.required_variables]
-            return self.function(*params)
-        else:
-            raise ValueError(f"Invalid method action: {self.action}")
+        try:
+            params = [variable_values[var] for var in self.parameters]
+        except KeyError as e:
+            raise ValueError(
+                f"Variable {e.args[0]} not provided for method evaluation"
+            ) from None
+        return self.function(*params)
+
+    def bind(self, slots: VariableSlots) -> None:
+        """
+        Resolves the set variable and the parameters to their slots, for :func:`evaluate`.
+
+        :param slots: the slots of the variables of the model
+        :type slots: VariableSlots
+        """
+        self.slot = slots[self.variable]
+        self.parameter_slots = tuple(slots[var] for var in self.parameters)
+
+    def evaluate(self, buffer: list[Any]) -> Any:
+        """
+        Calls the method with the values of its parameters in the slot indexed variable buffer of an
+        entity, requires :func:`bind`.
+
+        :param buffer: the variable buffer
+        :type buffer: list[Any]
+        :return: the result of the method
+        :rtype: Any
+        """
+        params = [buffer[slot] for slot in self.parameter_slots]
+        if UNSET in params:
+            var = self.parameters[params.index(UNSET)]
+            raise ValueError(f"Variable {var} not provided for method evaluation")
+        return self.function(*params)
@@ -1,20 +1,65 @@
-from typing import cast
+import asyncio
+import inspect
+import time
+from typing import Any, Callable
 
 from pyModbusTCP.client import ModbusClient
 
 from . import registerhelpers as rh
-from .modbusiobundlesconfiguration import ModbusIOBundlesConfiguration
+from .asyncmodbusclient import AsyncModbusClient
+from .modbusclientsettings import ModbusClientSettings
+from .modbusconnectionpool import PooledAsyncModbusClient, PooledModbusClient
+from .modbusiobundlesconfiguration import ModbusIOBundlesConfiguration, ReadInterval
+from .registerimage import RegisterImage
 from .registerrange import RegisterRange
+from .requestplanner import RequestPlan
 from .modbusregistertypes import ModbusRegisterTypes
 
+# protocol limits of Modbus function code 23 (Read/Write Multiple Registers)
+FC23_MAX_WRITE_REGISTERS = 121
+FC23_MAX_READ_REGISTERS = 125
+
+
+def _merge_spans(
+    spans: set[tuple[int, int]], max_gap: int
+) -> list[tuple[int, int]]:
+    """
+    Merges (offset, length) spans that overlap or are separated by at most max_gap elements.
+
+    :param spans: the spans to merge
+    :type spans: set[tuple[int, int]]
+    :param max_gap: the largest gap that is bridged by a merge
+    :type max_gap: int
+    :return: the merged spans, sorted by offset
+    :rtype: list[tuple[int, int]]
+    """
+    merged: list[tuple[int, int]] = []
+    for offset, length in sorted(spans):
+        if merged and offset <= merged[-1][0] + merged[-1][1] + max_gap:
+            merged_offset, merged_length = merged[-1]
+            merged[-1] = (
+                merged_offset,
+                max(merged_length, offset + length - merged_offset),
+            )
+        else:
+            merged.append((offset, length))
+    return merged
+
 
 class ModbusClientManager:
     def __init__(
         self,
         host: str,
         port: int,
-        io_config: ModbusIOBundlesConfiguration,
-        modbus_client: ModbusClient | None = None,
+        io_config: ModbusIOBundlesConfiguration | RequestPlan,
+        modbus_client: (
+            ModbusClient
+            | AsyncModbusClient
+            | PooledModbusClient
+            | PooledAsyncModbusClient
+            | None
+        ) = None,
+        client_settings: ModbusClientSettings | None = None,
     ):
         self.client = (
             modbus_client
@@ -22,134 +67,448 @@ class ModbusClientManager:
             else ModbusClient(host=host, port=port)
         )
         self.io_config = io_config
-        self.buffer_register_read: dict[ModbusRegisterTypes, dict[int, list[int]]] = {}
-        self.buffer_discrete_read: dict[ModbusRegisterTypes, dict[int, list[bool]]] = {}
-        self.buffer_register_write: dict[ModbusRegisterTypes, dict[int, list[int]]] = {}
-        self.buffer_discrete_write: dict[
-            ModbusRegisterTypes, dict[int, list[bool]]
-        ] = {}
-
+        self.client_settings = (
+            client_settings
+            if client_settings is not None
+            else ModbusClientSettings({})
+        )
+        # one contiguous image per register type and direction, reads are stored
+        # into it in place
+        self.read_images: dict[ModbusRegisterTypes, RegisterImage] = {}
+        self.write_images: dict[ModbusRegisterTypes, RegisterImage] = {}
         for reg_type in ModbusRegisterTypes:
-            self.buffer_register_read[reg_type] = {}
-            self.buffer_discrete_read[reg_type] = {}
-            self.buffer_register_write[reg_type] = {}
-            self.buffer_discrete_write[reg_type] = {}
-
-            for reg_range in self.io_config.read_ranges[reg_type]:
-                if reg_type in (
-                    ModbusRegisterTypes.COIL,
-                    ModbusRegisterTypes.DISCRETE_INPUT,
-                ):
-                    self.buffer_discrete_read[reg_type][reg_range.start] = [
-                        False
-                    ] * reg_range.length
-                else:
-                    self.buffer_register_read[reg_type][reg_range.start] = [
-                        0
-                    ] * reg_range.length
-
-            for reg_range in self.io_config.write_ranges[reg_type]:
-                if reg_type in (
-                    ModbusRegisterTypes.COIL,
-                    ModbusRegisterTypes.DISCRETE_INPUT,
-                ):
-                    self.buffer_discrete_write[reg_type][reg_range.start] = [
-                        False
-                    ] * reg_range.length
-                else:
-                    self.buffer_register_write[reg_type][reg_range.start] = [
-                        0
-                    ] * reg_range.length
+            self.read_images[reg_type] = RegisterImage(
+                reg_type, self.io_config.read_ranges[reg_type]
+            )
+            self.write_images[reg_type] = RegisterImage(
+                reg_type, self.io_config.write_ranges[reg_type]
+            )
+
+        # spans (offset, length) within each write range that changed since
+        # they were last written, everything starts out dirty as the state of the
+        # device is unknown
+        self.dirty_write: dict[ModbusRegisterTypes, dict[int, set[tuple[int, int]]]] = {
+            reg_type: {} for reg_type in ModbusRegisterTypes
+        }
+        self.write_cycle_count: int = 0
+        self.mark_all_dirty()
+
+        # read requests with the interval they are sent at, and the read cycle and
+        # time.monotonic() of the last read of every interval
+        self.read_requests: list[tuple[RegisterRange, ReadInterval]] = [
+            (reg_range, interval)
+            for reg_type, ranges in self.io_config.read_ranges.items()
+            for reg_range, interval in zip(
+                ranges, self.io_config.read_intervals[reg_type]
+            )
+        ]
+        self.read_intervals: set[ReadInterval] = {
+            interval for _, interval in self.read_requests
+        }
+        self.read_cycle_count: int = 0
+        self.last_reads: dict[ReadInterval, tuple[int, float]] = {}
+        # intervals whose requests were sent by the last read cycle
+        self.refreshed_intervals: set[ReadInterval] = set()
+
+    @property
+    def is_async(self) -> bool:
+        """
+        Whether the underlying client has coroutine methods like :class:`AsyncModbusClient`, which requires the ``*_async`` methods.
+        """
+        return inspect.iscoroutinefunction(self.client.open)
 
     def connect(self):
         if not self.client.is_open:
             self.client.open()
+            # the device may have been restarted in the meantime
+            self.mark_all_dirty()
+
+    async def connect_async(self):
+        if not self.client.is_open:
+            await self.client.open()
+            # the device may have been restarted in the meantime
+            self.mark_all_dirty()
 
     def disconnect(self):
         if self.client.is_open:
             self.client.close()
 
+    async def disconnect_async(self):
+        if self.client.is_open:
+            await self.client.close()
+
+    def mark_all_dirty(self):
+        """
+        Marks every write range as changed, so it is written completely on the next write cycle.
+
+        :param self: The ModbusInterface instance
+        :type self: ModbusInterface
+        """
+        for reg_type, image in self.write_images.items():
+            for range_start, length in image.ranges.items():
+                # updated in place, the sets are handed out by resolve_write
+                spans = self.dirty_write[reg_type].setdefault(range_start, set())
+                spans.clear()
+                spans.add((0, length))
+
     def do_read(self):
         """
         Reads the configured registers and discrete inputs from the Modbus server and updates the internal buffers.
 
+        Only the requests whose interval has passed are sent, :attr:`refreshed_intervals` holds their intervals
+        afterwards.
+
+        :param self: The ModbusInterface instance
+        :type self: ModbusInterface
+        """
+        reads, due = self._read_requests()
+        if reads:
+            self.connect()
+        for reg_range in reads:
+            self._store_read(
+                reg_range,
+                self._read_function(reg_range.type)(reg_range.start, reg_range.length),
+            )
+        self._finish_read(due)
+
+    async def do_read_async(self):
+        """
+        Coroutine version of :func:`do_read` for an :class:`AsyncModbusClient`.
+
+        All read requests are issued concurrently, so the client can pipeline them on its connection.
+
         :param self: The ModbusInterface instance
         :type self: ModbusInterface
         """
+        reads, due = self._read_requests()
+        if reads:
+            await self.connect_async()
+            await self._read_concurrently(reads)
+        self._finish_read(due)
+
+    def do_write(self):
+        """
+        Writes the changed registers and coils to the Modbus server from the internal buffers.
+
+        Only spans changed since the last write cycle are sent, nearby spans are merged into a single request.
+        If nothing changed, no request is sent at all.
+
+        :param self: The ModbusInterface instance
+        :type self: ModbusInterface
+        """
+        writes = self._collect_writes()
+        if not writes:
+            return
+
         self.connect()
-        for reg_type, ranges in self.io_config.read_ranges.items():
-            for i, reg_range in enumerate(ranges):
-                if reg_type == ModbusRegisterTypes.COIL:
-                    regs = self.client.read_coils(reg_range.start, reg_range.length)
-                elif reg_type == ModbusRegisterTypes.DISCRETE_INPUT:
-                    regs = self.client.read_discrete_inputs(
-                        reg_range.start, reg_range.length
-                    )
-                elif reg_type == ModbusRegisterTypes.HOLDING_REGISTER:
-                    regs = self.client.read_holding_registers(
-                        reg_range.start, reg_range.length
+        try:
+            for reg_range, values in writes:
+                self._check_write(
+                    reg_range,
+                    self._write_function(reg_range.type)(reg_range.start, values),
+                )
+        except ConnectionError:
+            self.mark_all_dirty()
+            raise
+
+    async def do_write_async(self):
+        """
+        Coroutine version of :func:`do_write` for an :class:`AsyncModbusClient`.
+
+        All write requests are issued concurrently, so the client can pipeline them on its connection.
+
+        :param self: The ModbusInterface instance
+        :type self: ModbusInterface
+        """
+        writes = self._collect_writes()
+        if not writes:
+            return
+
+        await self.connect_async()
+        try:
+            await self._write_concurrently(writes)
+        except ConnectionError:
+            self.mark_all_dirty()
+            raise
+
+    def do_read_write(self):
+        """
+        Writes the changed registers and coils and afterwards reads the configured registers and discrete inputs.
+
+        If the device supports Modbus function code 23 (Read/Write Multiple Registers), holding register write
+        and read requests are paired into a single transaction each, halving the round trips for those requests.
+        Unpaired write requests are sent first and unpaired read requests last. Within the paired transactions,
+        the read of one pair does not observe the writes of the pairs following it.
+
+        Without function code 23 support this is equivalent to :func:`do_write` followed by :func:`do_read`.
+
+        :param self: The ModbusInterface instance
+        :type self: ModbusInterface
+        """
+        if not self.client_settings.use_fc23:
+            self.do_write()
+            self.do_read()
+            return
+
+        writes, pairs, reads, due = self._plan_read_write()
+        self.connect()
+        try:
+            for reg_range, values in writes:
+                self._check_write(
+                    reg_range,
+                    self._write_function(reg_range.type)(reg_range.start, values),
+                )
+            for (write_range, values), read_range in pairs:
+                self._store_read(
+                    read_range,
+                    self.client.write_read_multiple_registers(
+                        write_range.start, values, read_range.start, read_range.length
+                    ),
+                )
+        except ConnectionError:
+            self.mark_all_dirty()
+            raise
+
+        for reg_range in reads:
+            self._store_read(
+                reg_range,
+                self._read_function(reg_range.type)(reg_range.start, reg_range.length),
+            )
+        self._finish_read(due)
+
+    async def do_read_write_async(self):
+        """
+        Coroutine version of :func:`do_read_write` for an :class:`AsyncModbusClient`.
+
+        The unpaired write requests are issued concurrently first. Once they are confirmed, the function
+        code 23 pairs and the unpaired read requests are issued concurrently, in this order. Whether the
+        unpaired reads observe the paired writes depends on the device processing pipelined requests
+        in order.
+
+        :param self: The ModbusInterface instance
+        :type self: ModbusInterface
+        """
+        if not self.client_settings.use_fc23:
+            await self.do_write_async()
+            await self.do_read_async()
+            return
+
+        writes, pairs, reads, due = self._plan_read_write()
+        await self.connect_async()
+        try:
+            await self._write_concurrently(writes)
+            results = await asyncio.gather(
+                *(
+                    self.client.write_read_multiple_registers(
+                        write_range.start, values, read_range.start, read_range.length
                     )
-                elif reg_type == ModbusRegisterTypes.INPUT_REGISTER:
-                    regs = self.client.read_input_registers(
+                    for (write_range, values), read_range in pairs
+                ),
+                *(
+                    self._read_function(reg_range.type)(
                         reg_range.start, reg_range.length
                     )
-                else:
-                    raise ValueError(f"Unsupported register type: {reg_type}")
+                    for reg_range in reads
+                ),
+            )
+            for (_, read_range), regs in zip(pairs, results):
+                self._store_read(read_range, regs)
+        except ConnectionError:
+            self.mark_all_dirty()
+            raise
+
+        for reg_range, regs in zip(reads, results[len(pairs) :]):
+            self._store_read(reg_range, regs)
+        self._finish_read(due)
+
+    async def _read_concurrently(self, reads: list[RegisterRange]):
+        results = await asyncio.gather(
+            *(
+                self._read_function(reg_range.type)(reg_range.start, reg_range.length)
+                for reg_range in reads
+            )
+        )
+        for reg_range, regs in zip(reads, results):
+            self._store_read(reg_range, regs)
 
-                if regs is None or len(regs) < reg_range.length:
-                    raise ConnectionError(
-                        f"Failed to read {reg_type.name} registers from Modbus server"
-                    )
+    async def _write_concurrently(
+        self, writes: list[tuple[RegisterRange, list[int] | list[bool]]]
+    ):
+        results = await asyncio.gather(
+            *(
+                self._write_function(reg_range.type)(reg_range.start, values)
+                for reg_range, values in writes
+            )
+        )
+        for (reg_range, _), success in zip(writes, results):
+            self._check_write(reg_range, success)
 
-                if reg_type in (
-                    ModbusRegisterTypes.COIL,
-                    ModbusRegisterTypes.DISCRETE_INPUT,
-                ):
-                    self.buffer_discrete_read[reg_type][reg_range.start] = cast(
-                        list[bool], regs
-                    )  # discrete inputs are bools
-                else:
-                    self.buffer_register_read[reg_type][reg_range.start] = cast(
-                        list[int], regs
-                    )  # registers are ints
+    def _read_requests(
+        self,
+    ) -> tuple[list[RegisterRange], dict[ReadInterval, tuple[int, float]]]:
+        """
+        Starts a read cycle and selects the read requests which are due.
 
-    def do_write(self):
+        :param self: The ModbusInterface instance
+        :type self: ModbusInterface
+        :return: The due read requests and the read cycle and time to record for their intervals once they are read
+        :rtype: tuple[list[RegisterRange], dict[ReadInterval, tuple[int, float]]]
+        """
+        self.read_cycle_count += 1
+        now = time.monotonic()
+        due: dict[ReadInterval, tuple[int, float]] = {}
+        for interval in self.read_intervals:
+            last = self.last_reads.get(interval)
+            if (
+                last is None
+                or self.read_cycle_count - last[0] >= interval[0]
+                and now - last[1] >= interval[1]
+            ):
+                due[interval] = (self.read_cycle_count, now)
+        return [
+            reg_range for reg_range, interval in self.read_requests if interval in due
+        ], due
+
+    def _finish_read(self, due: dict[ReadInterval, tuple[int, float]]):
+        self.last_reads.update(due)
+        self.refreshed_intervals = set(due)
+
+    def _plan_read_write(
+        self,
+    ) -> tuple[
+        list[tuple[RegisterRange, list[int] | list[bool]]],
+        list[tuple[tuple[RegisterRange, list[int] | list[bool]], RegisterRange]],
+        list[RegisterRange],
+        dict[ReadInterval, tuple[int, float]],
+    ]:
         """
-        Writes the configured registers and coils to the Modbus server from the internal buffers.
+        Splits a read/write cycle into unpaired writes, function code 23 pairs and unpaired reads.
 
         :param self: The ModbusInterface instance
         :type self: ModbusInterface
+        :return: The unpaired write requests, the (write request, read range) pairs, the unpaired read ranges and the due intervals
+        :rtype: tuple
         """
-        # TODO: optimize by only writing changed registers
-        self.connect()
-        for reg_type, ranges in self.io_config.write_ranges.items():
-            for i, reg_range in enumerate(ranges):
-                if reg_type in (
-                    ModbusRegisterTypes.COIL,
-                    ModbusRegisterTypes.DISCRETE_INPUT,
+        writes = self._collect_writes()
+        reads, due = self._read_requests()
+        pairs = self._pair_fc23_requests(writes, reads)
+        paired_writes = {write_range for (write_range, _), _ in pairs}
+        paired_reads = {read_range for _, read_range in pairs}
+        return (
+            [w for w in writes if w[0] not in paired_writes],
+            pairs,
+            [r for r in reads if r not in paired_reads],
+            due,
+        )
+
+    def _collect_writes(self) -> list[tuple[RegisterRange, list[int] | list[bool]]]:
+        """
+        Collects the pending write requests from the dirty spans and marks them clean.
+
+        Dirty spans whose gap is at most ``write_merge_gap`` are merged into one request.
+        Every ``full_refresh_interval`` cycles all write buffers are sent completely.
+
+        :param self: The ModbusInterface instance
+        :type self: ModbusInterface
+        :return: The (register range, values) pairs to write
+        :rtype: list[tuple[RegisterRange, list[int] | list[bool]]]
+        """
+        self.write_cycle_count += 1
+        refresh_interval = self.client_settings.full_refresh_interval
+        if refresh_interval > 0 and self.write_cycle_count % refresh_interval == 0:
+            self.mark_all_dirty()
+
+        writes: list[tuple[RegisterRange, list[int] | list[bool]]] = []
+        for reg_type, entries in self.dirty_write.items():
+            for range_start, spans in entries.items():
+                if not spans:
+                    continue
+
+                image = self.write_images[reg_type]
+                for offset, length in _merge_spans(
+                    spans, self.client_settings.write_merge_gap
                 ):
-                    values = self.buffer_discrete_write[reg_type][reg_range.start]
-                else:
-                    values = self.buffer_register_write[reg_type][reg_range.start]
-
-                if reg_type == ModbusRegisterTypes.COIL:
-                    success = self.client.write_multiple_coils(reg_range.start, values)
-                elif reg_type == ModbusRegisterTypes.HOLDING_REGISTER:
-                    success = self.client.write_multiple_registers(
-                        reg_range.start, values
-                    )
-                else:
-                    raise ValueError(
-                        f"Unsupported register type for writing: {reg_type}"
+                    writes.append(
+                        (
+                            RegisterRange(range_start + offset, length, reg_type),
+                            (
+                                image.get_discretes(range_start + offset, length)
+                                if reg_type == ModbusRegisterTypes.COIL
+                                else image.get_registers(range_start + offset, length)
+                            ),
+                        )
                     )
+                spans.clear()
+        return writes
 
-                if not success:
-                    raise ConnectionError(
-                        f"Failed to write {reg_type.name} registers to Modbus server"
-                    )
-    
-    # TODO: implement combined read_write function to utilize Modbus function code 23 (Read/Write Multiple Registers)
+    def _pair_fc23_requests(
+        self,
+        writes: list[tuple[RegisterRange, list[int] | list[bool]]],
+        reads: list[RegisterRange],
+    ) -> list[tuple[tuple[RegisterRange, list[int] | list[bool]], RegisterRange]]:
+        """
+        Pairs holding register write requests with holding register read bundles for function code 23 transactions.
 
+        :param self: The ModbusInterface instance
+        :type self: ModbusInterface
+        :param writes: The pending write requests
+        :type writes: list[tuple[RegisterRange, list[int] | list[bool]]]
+        :param reads: The due read requests
+        :type reads: list[RegisterRange]
+        :return: The (write request, read range) pairs, in order
+        :rtype: list[tuple[tuple[RegisterRange, list[int] | list[bool]], RegisterRange]]
+        """
+        write_requests = [
+            w
+            for w in writes
+            if w[0].type == ModbusRegisterTypes.HOLDING_REGISTER
+            and w[0].length <= FC23_MAX_WRITE_REGISTERS
+        ]
+        read_ranges = [
+            r
+            for r in reads
+            if r.type == ModbusRegisterTypes.HOLDING_REGISTER
+            and r.length <= FC23_MAX_READ_REGISTERS
+        ]
+        return list(zip(write_requests, read_ranges))
+
+    def _read_function(self, reg_type: ModbusRegisterTypes) -> Callable[..., Any]:
+        if reg_type == ModbusRegisterTypes.COIL:
+            return self.client.read_coils
+        elif reg_type == ModbusRegisterTypes.DISCRETE_INPUT:
+            return self.client.read_discrete_inputs
+        elif reg_type == ModbusRegisterTypes.HOLDING_REGISTER:
+            return self.client.read_holding_registers
+        elif reg_type == ModbusRegisterTypes.INPUT_REGISTER:
+            return self.client.read_input_registers
+        else:
+            raise ValueError(f"Unsupported register type: {reg_type}")
+
+    def _write_function(self, reg_type: ModbusRegisterTypes) -> Callable[..., Any]:
+        if reg_type == ModbusRegisterTypes.COIL:
+            return self.client.write_multiple_coils
+        elif reg_type == ModbusRegisterTypes.HOLDING_REGISTER:
+            return self.client.write_multiple_registers
+        else:
+            raise ValueError(f"Unsupported register type for writing: {reg_type}")
+
+    def _store_read(
+        self, reg_range: RegisterRange, regs: list[int] | list[bool] | None
+    ):
+        if regs is None or len(regs) < reg_range.length:
+            raise ConnectionError(
+                f"Failed to read {reg_range.type.name} registers from Modbus server"
+            )
+
+        if len(regs) > reg_range.length:
+            regs = regs[: reg_range.length]
+        self.read_images[reg_range.type].store(reg_range.start, regs)
+
+    def _check_write(self, reg_range: RegisterRange, success: bool):
+        if not success:
+            raise ConnectionError(
+                f"Failed to write {reg_range.type.name} registers to Modbus server"
+            )
 
     def get_registers(self, address: RegisterRange) -> list[int]:
         """
@@ -166,20 +525,8 @@ class ModbusClientManager:
         :return: The list of integer values at the specified register addresses
         :rtype: list[int]
         """
-        for range_start, regs in self.buffer_register_read[address.type].items():
-            if range_start <= address.start < range_start + len(regs):
-                if address.start + address.length <= range_start + len(regs):
-                    return regs[
-                        address.start - range_start : address.start
-                        - range_start
-                        + address.length
-                    ]
-                else:
-                    raise ValueError(
-                        f"Requested length exceeds buffer for {address.type.name} starting at {address.start}"
-                    )
-        raise ValueError(
-            f"Start address {address.start} not in buffer for {address.type.name}"
+        return self.read_images[address.type].get_registers(
+            address.start, address.length
         )
 
     def set_registers(self, address: RegisterRange, values: list[int]):
@@ -203,22 +550,13 @@ class ModbusClientManager:
             raise ValueError(
                 f"Register type must be HOLDING_REGISTER for set_registers, got {address.type.name}"
             )
-        for range_start, regs in self.buffer_register_write[address.type].items():
-            if range_start <= address.start < range_start + len(regs):
-                if address.start + len(values) <= range_start + len(regs):
-                    regs[
-                        address.start - range_start : address.start
-                        - range_start
-                        + len(values)
-                    ] = [v & 0xFFFF for v in values]
-                    return
-                else:
-                    raise ValueError(
-                        f"Values exceed buffer for {address.type.name} starting at {address.start}"
-                    )
-        raise ValueError(
-            f"Start address {address.start} not in buffer for {address.type.name}"
+        range_start = self.write_images[address.type].set_registers(
+            address.start, values
         )
+        if range_start is not None:
+            self.dirty_write[address.type][range_start].add(
+                (address.start - range_start, len(values))
+            )
 
     def get_discretes(self, address: RegisterRange) -> list[bool]:
         """
@@ -235,22 +573,62 @@ class ModbusClientManager:
         :return: The list of boolean values at the specified discrete addresses
         :rtype: list[bool]
         """
-        for range_start, discretes in self.buffer_discrete_read[address.type].items():
-            if range_start <= address.start < range_start + len(discretes):
-                if address.start + address.length <= range_start + len(discretes):
-                    return discretes[
-                        address.start - range_start : address.start
-                        - range_start
-                        + address.length
-                    ]
-                else:
-                    raise ValueError(
-                        f"Requested length exceeds buffer for {address.type.name} starting at {address.start}"
-                    )
-        raise ValueError(
-            f"Start address {address.start} not in buffer for {address.type.name}"
+        return self.read_images[address.type].get_discretes(
+            address.start, address.length
+        )
+
+    def resolve_read(self, address: RegisterRange) -> tuple[bytearray, int]:
+        """
+        Resolves the specified range to its location in the read image, for decoding with a :class:`VariableCodec`.
+
+        :param self: The ModbusInterface instance
+        :param address: The register or discrete range
+        :type address: RegisterRange
+        :return: The read image and the byte offset of the range within it
+        :rtype: tuple[bytearray, int]
+        """
+        image = self.read_images[address.type]
+        _, offset = image.locate(address.start, address.length)
+        return image.data, offset
+
+    def resolve_write(
+        self, address: RegisterRange
+    ) -> tuple[bytearray, int, set[tuple[int, int]], tuple[int, int]]:
+        """
+        Resolves the specified range to its location in the write image, for encoding with a :class:`VariableCodec`.
+
+        When the encoded value changed, the returned span has to be added to the returned dirty spans, so
+        it is sent on the next write cycle.
+
+        :param self: The ModbusInterface instance
+        :param address: The register or discrete range
+        :type address: RegisterRange
+        :return: The write image, the byte offset of the range within it, the dirty spans of its write range and its span
+        :rtype: tuple[bytearray, int, set[tuple[int, int]], tuple[int, int]]
+        """
+        image = self.write_images[address.type]
+        range_start, offset = image.locate(address.start, address.length)
+        return (
+            image.data,
+            offset,
+            self.dirty_write[address.type][range_start],
+            (address.start - range_start, address.length),
         )
 
+    def get_view(self, address: RegisterRange) -> memoryview:
+        """
+        Gets the raw bytes of the specified range from the read image, without copying.
+
+        Registers take two bytes each in little-endian byte order, discretes one byte each.
+
+        :param self: The ModbusInterface instance
+        :param address: The register or discrete range
+        :type address: RegisterRange
+        :return: A view on the read image
+        :rtype: memoryview
+        """
+        return self.read_images[address.type].view(address.start, address.length)
+
     def set_discretes(self, address: RegisterRange, values: list[bool]):
         """
         Sets a list of boolean values in the internal buffer for the specified discrete type, starting address, and length.
@@ -272,22 +650,13 @@ class ModbusClientManager:
             raise ValueError(
                 f"Discrete type must be COIL for set_discretes, got {address.type.name}"
             )
-        for range_start, discretes in self.buffer_discrete_write[address.type].items():
-            if range_start <= address.start < range_start + len(discretes):
-                if address.start + len(values) <= range_start + len(discretes):
-                    discretes[
-                        address.start - range_start : address.start
-                        - range_start
-                        + len(values)
-                    ] = values
-                    return
-                else:
-                    raise ValueError(
-                        f"Values exceed buffer for {address.type.name} starting at {address.start}"
-                    )
-        raise ValueError(
-            f"Start address {address.start} not in buffer for {address.type.name}"
+        range_start = self.write_images[address.type].set_discretes(
+            address.start, values
         )
+        if range_start is not None:
+            self.dirty_write[address.type][range_start].add(
+                (address.start - range_start, len(values))
+            )
 
     def get_int(self, address: RegisterRange) -> int:
         """
@@ -432,6 +801,4 @@ class ModbusClientManager:
         :type value: bool
         """
 
-        discretes = self.get_discretes(address)
-        discretes[0] = value
-        self.set_discretes(address, discretes)
+        self.set_discretes(address, [value])
@@ -0,0 +1,34 @@
+from typing import Any
+
+
+class ModbusClientSettings:
+    def __init__(self, client_config: dict[str, Any]):
+        # Modbus function code 23 (Read/Write Multiple Registers) is optional
+        # in the specification, so it has to be enabled explicitly per device
+        self.use_fc23: bool = False
+        if "use_fc23" in client_config:
+            self.use_fc23 = bool(client_config["use_fc23"])
+
+        # dirty write spans separated by at most this many registers/coils are
+        # merged into one request, rewriting the unchanged values in between
+        self.write_merge_gap: int = 8
+        if "write_merge_gap" in client_config:
+            self.write_merge_gap = int(client_config["write_merge_gap"])
+            if self.write_merge_gap < 0:
+                raise ValueError("write_merge_gap must not be negative")
+
+        # rewrite all write ranges every N write cycles, e.g. for devices with
+        # a watchdog expecting periodic writes; 0 disables the full refresh
+        self.full_refresh_interval: int = 0
+        if "full_refresh_interval" in client_config:
+            self.full_refresh_interval = int(client_config["full_refresh_interval"])
+            if self.full_refresh_interval < 0:
+                raise ValueError("full_refresh_interval must not be negative")
+
+        # maximum number of requests in flight on one connection, replies are
+        # matched by transaction ID; only used by the native asyncio client
+        self.pipeline_depth: int = 1
+        if "pipeline_depth" in client_config:
+            self.pipeline_depth = int(client_config["pipeline_depth"])
+            if self.pipeline_depth < 1:
+                raise ValueError("pipeline_depth must be at least 1")
@@ -0,0 +1,228 @@
+import threading
+from typing import Any, Callable
+
+from pyModbusTCP.client import ModbusClient
+
+from .asyncmodbusclient import AsyncModbusClient
+
+
+class PooledModbusClient:
+    """
+    View on a pooled :class:`pyModbusTCP.client.ModbusClient` that addresses a single unit ID.
+
+    Requests of all views on the same connection are serialized, as the blocking client allows only
+    one outstanding request. Closing a view does not close the shared connection, see
+    :func:`ModbusConnectionPool.close`.
+    """
+
+    def __init__(self, client: ModbusClient, lock: threading.Lock, unit_id: int):
+        self.client: ModbusClient = client
+        self.unit_id: int = unit_id
+        self._lock: threading.Lock = lock
+
+    @property
+    def is_open(self) -> bool:
+        return self.client.is_open
+
+    def open(self) -> bool:
+        with self._lock:
+            return self.client.is_open or self.client.open()
+
+    def close(self) -> None:
+        pass
+
+    def read_coils(self, bit_addr: int, bit_nb: int = 1) -> list[bool] | None:
+        return self._call(self.client.read_coils, bit_addr, bit_nb)
+
+    def read_discrete_inputs(
+        self, bit_addr: int, bit_nb: int = 1
+    ) -> list[bool] | None:
+        return self._call(self.client.read_discrete_inputs, bit_addr, bit_nb)
+
+    def read_holding_registers(
+        self, reg_addr: int, reg_nb: int = 1
+    ) -> list[int] | None:
+        return self._call(self.client.read_holding_registers, reg_addr, reg_nb)
+
+    def read_input_registers(self, reg_addr: int, reg_nb: int = 1) -> list[int] | None:
+        return self._call(self.client.read_input_registers, reg_addr, reg_nb)
+
+    def write_multiple_coils(self, bits_addr: int, bits_value: list[bool]) -> bool:
+        return self._call(self.client.write_multiple_coils, bits_addr, bits_value)
+
+    def write_multiple_registers(self, regs_addr: int, regs_value: list[int]) -> bool:
+        return self._call(self.client.write_multiple_registers, regs_addr, regs_value)
+
+    def write_read_multiple_registers(
+        self,
+        write_addr: int,
+        write_values: list[int],
+        read_addr: int,
+        read_nb: int = 1,
+    ) -> list[int] | None:
+        return self._call(
+            self.client.write_read_multiple_registers,
+            write_addr,
+            write_values,
+            read_addr,
+            read_nb,
+        )
+
+    def _call(self, function: Callable[..., Any], *args: Any) -> Any:
+        with self._lock:
+            self.client.unit_id = self.unit_id
+            return function(*args)
+
+
+class PooledAsyncModbusClient:
+    """
+    View on a pooled :class:`AsyncModbusClient` that addresses a single unit ID.
+
+    Requests of all views on the same connection are pipelined together up to the depth of the
+    connection. Closing a view does not close the shared connection, see
+    :func:`ModbusConnectionPool.close_async`.
+    """
+
+    def __init__(self, client: AsyncModbusClient, unit_id: int):
+        self.client: AsyncModbusClient = client
+        self.unit_id: int = unit_id
+
+    @property
+    def is_open(self) -> bool:
+        return self.client.is_open
+
+    async def open(self) -> bool:
+        return await self.client.open()
+
+    async def close(self) -> None:
+        pass
+
+    async def read_coils(self, bit_addr: int, bit_nb: int = 1) -> list[bool] | None:
+        return await self.client.read_coils(bit_addr, bit_nb, unit_id=self.unit_id)
+
+    async def read_discrete_inputs(
+        self, bit_addr: int, bit_nb: int = 1
+    ) -> list[bool] | None:
+        return await self.client.read_discrete_inputs(
+            bit_addr, bit_nb, unit_id=self.unit_id
+        )
+
+    async def read_holding_registers(
+        self, reg_addr: int, reg_nb: int = 1
+    ) -> list[int] | None:
+        return await self.client.read_holding_registers(
+            reg_addr, reg_nb, unit_id=self.unit_id
+        )
+
+    async def read_input_registers(
+        self, reg_addr: int, reg_nb: int = 1
+    ) -> list[int] | None:
+        return await self.client.read_input_registers(
+            reg_addr, reg_nb, unit_id=self.unit_id
+        )
+
+    async def write_multiple_coils(
+        self, bits_addr: int, bits_value: list[bool]
+    ) -> bool:
+        return await self.client.write_multiple_coils(
+            bits_addr, bits_value, unit_id=self.unit_id
+        )
+
+    async def write_multiple_registers(
+        self, regs_addr: int, regs_value: list[int]
+    ) -> bool:
+        return await self.client.write_multiple_registers(
+            regs_addr, regs_value, unit_id=self.unit_id
+        )
+
+    async def write_read_multiple_registers(
+        self,
+        write_addr: int,
+        write_values: list[int],
+        read_addr: int,
+        read_nb: int = 1,
+    ) -> list[int] | None:
+        return await self.client.write_read_multiple_registers(
+            write_addr, write_values, read_addr, read_nb, unit_id=self.unit_id
+        )
+
+
+class ModbusConnectionPool:
+    """
+    Shares Modbus TCP connections between all devices reached through the same host:port.
+
+    Each host:port gets up to ``connections_per_host`` connections, devices are assigned to them
+    round-robin and addressed by their unit ID.
+    """
+
+    def __init__(self, native_async: bool = False, connections_per_host: int = 1):
+        if connections_per_host < 1:
+            raise ValueError("connections_per_host must be at least 1")
+        self.native_async: bool = native_async
+        self.connections_per_host: int = connections_per_host
+
+        self.clients: dict[
+            tuple[str, int], list[tuple[ModbusClient, threading.Lock]]
+        ] = {}
+        self.async_clients: dict[tuple[str, int], list[AsyncModbusClient]] = {}
+        self.device_count: dict[tuple[str, int], int] = {}
+
+    def get_client(
+        self, host: str, port: int, unit_id: int = 1, pipeline_depth: int = 1
+    ) -> PooledModbusClient | PooledAsyncModbusClient:
+        """
+        Gets a client for the device with the given unit ID behind host:port.
+
+        :param host: the host of the Modbus server or gateway
+        :type host: str
+        :param port: the port of the Modbus server or gateway
+        :type port: int
+        :param unit_id: the unit ID of the device
+        :type unit_id: int
+        :param pipeline_depth: the pipeline depth the device supports, the smallest depth of all devices on a connection is used, so no device receives more requests at once than it supports
+        :type pipeline_depth: int
+        :return: a client view addressing the device
+        :rtype: PooledModbusClient | PooledAsyncModbusClient
+        """
+        key = (host, port)
+        index = self.device_count.get(key, 0) % self.connections_per_host
+        self.device_count[key] = self.device_count.get(key, 0) + 1
+
+        if self.native_async:
+            async_clients = self.async_clients.setdefault(key, [])
+            if index == len(async_clients):
+                async_clients.append(
+                    AsyncModbusClient(
+                        host=host, port=port, max_outstanding=pipeline_depth
+                    )
+                )
+            async_client = async_clients[index]
+            async_client.lower_max_outstanding(pipeline_depth)
+            return PooledAsyncModbusClient(async_client, unit_id)
+
+        clients = self.clients.setdefault(key, [])
+        if index == len(clients):
+            clients.append((ModbusClient(host=host, port=port), threading.Lock()))
+        client, lock = clients[index]
+        return PooledModbusClient(client, lock, unit_id)
+
+    def close(self) -> None:
+        """
+        Closes all connections on shutdown.
+
+        Connections busy with a request, e.g. of a cycle that missed its step deadline against a
+        device that does not answer, are closed without waiting for the request.
+        """
+        for clients in self.clients.values():
+            for client, lock in clients:
+                locked = lock.acquire(blocking=False)
+                try:
+                    client.close()
+                finally:
+                    if locked:
+                        lock.release()
+
+    async def close_async(self) -> None:
+        for async_clients in self.async_clients.values():
+            for async_client in async_clients:
+                await async_client.close()
@@ -1,30 +1,159 @@
 from typing import Any
 
 from .datatype import DataType
+from .methodgraph import MethodGraph
 from .methodinvoker import MethodInvoker
 from .iotype import IOType
-from .modbusiobundlesconfiguration import ModbusIOBundlesConfiguration
+from .modbusclientsettings import ModbusClientSettings
+from .modbusiobundlesconfiguration import (
+    EVERY_STEP,
+    ModbusIOBundlesConfiguration,
+    ReadInterval,
+)
+from .requestplanner import RequestPlan, RequestPlanner
+from .requestplannersettings import RequestPlannerSettings
 from .variablemapping import VariableMapping
+from .variableplan import VariablePlan
+from .variableslots import VariableSlots
 
 
 class ModbusIntegrationSettings:
     def __init__(self, config: dict[str, Any]):
-        self.modbus_io_bundles: ModbusIOBundlesConfiguration = (
-            ModbusIOBundlesConfiguration(config["modbus_io_bundles"])
-        )
+        # model wide defaults for the options of all variables
+        variable_defaults: dict[str, Any] = config.get("variable_defaults", {})
+        for key in variable_defaults:
+            if key not in ("byteorder", "wordorder"):
+                raise ValueError(f"Unsupported variable default: {key}")
         self.variables: dict[str, VariableMapping] = {
-            k: VariableMapping(v) for k, v in config["variables"].items()
+            k: VariableMapping(variable_defaults | v)
+            for k, v in config["variables"].items()
         }
+        if config["modbus_io_bundles"] == "auto":
+            self.modbus_io_bundles: ModbusIOBundlesConfiguration = (
+                ModbusIOBundlesConfiguration.from_variables(self.variables)
+            )
+        else:
+            self.modbus_io_bundles = ModbusIOBundlesConfiguration(
+                config["modbus_io_bundles"]
+            )
+        self.modbus_client: ModbusClientSettings = ModbusClientSettings(
+            config.get("modbus_client", {})
+        )
+        # decode all read variables in bulk with NumPy, if it is installed
+        self.vectorized_decode: bool = False
+        if "vectorized_decode" in config:
+            self.vectorized_decode = bool(config["vectorized_decode"])
+        # share of the wall clock duration of a step, step_size * time_resolution
+        # seconds, a step waits for the device; None to always wait
+        self.step_deadline: float | None = None
+        if "step_deadline" in config:
+            self.step_deadline = float(config["step_deadline"])
+            if not self.step_deadline > 0:
+                raise ValueError(f"Invalid step deadline: {self.step_deadline}")
+
         self.read_methods: list[MethodInvoker] = []
         self.write_methods: list[MethodInvoker] = []
+        # only run the methods affected by changed variables on every step
+        self.incremental_methods: bool = True
+        # eval expressions as any Python expression or limited to a whitelist
+        self.expressions: str = "python"
         if "methods" in config:
             method_configs = config["methods"]
+            if "expressions" in method_configs:
+                self.expressions = method_configs["expressions"]
+                if self.expressions not in ("python", "restricted"):
+                    raise ValueError(f"Invalid expressions mode: {self.expressions}")
+            restricted = self.expressions == "restricted"
             if "read" in method_configs:
-                self.read_methods = [MethodInvoker(m) for m in method_configs["read"]]
+                self.read_methods = [
+                    MethodInvoker(m, restricted) for m in method_configs["read"]
+                ]
             if "write" in method_configs:
-                self.write_methods = [MethodInvoker(m) for m in method_configs["write"]]
+                self.write_methods = [
+                    MethodInvoker(m, restricted) for m in method_configs["write"]
+                ]
+            if "incremental" in method_configs:
+                self.incremental_methods = bool(method_configs["incremental"])
         self.check_validity()
 
+        # slots of all variables, including those only set by methods
+        self.slots: VariableSlots = VariableSlots(
+            [*self.variables]
+            + [
+                var
+                for method in self.read_methods + self.write_methods
+                for var in (method.variable, *method.parameters)
+            ]
+        )
+        for method in self.read_methods + self.write_methods:
+            method.bind(self.slots)
+        self.read_method_graph: MethodGraph = MethodGraph(self.read_methods)
+        self.write_method_graph: MethodGraph = MethodGraph(self.write_methods)
+
+        self.request_plan: RequestPlan = RequestPlanner(
+            RequestPlannerSettings(config.get("request_planner", {}))
+        ).plan(
+            self.modbus_io_bundles,
+            [
+                var.register
+                for var in self.variables.values()
+                if var.register is not None
+            ],
+        )
+        self.variable_plan: VariablePlan = VariablePlan(
+            self.variables, self.slots, self.request_plan
+        )
+        # plans of the read variables by the interval of their bundle, as they are
+        # only decoded when it was read; the full plan if all are read every step
+        read_variables: dict[ReadInterval, dict[str, VariableMapping]] = {}
+        for var_name, var in self.variables.items():
+            if var.register is not None and var.io_type in (IOType.READ, IOType.BOTH):
+                read_variables.setdefault(
+                    self.modbus_io_bundles.get_read_interval(var.register), {}
+                )[var_name] = var
+        self.read_variable_plans: dict[ReadInterval, VariablePlan] = {
+            EVERY_STEP: self.variable_plan
+        }
+        if set(read_variables) - {EVERY_STEP}:
+            self.read_variable_plans = {
+                interval: VariablePlan(variables, self.slots, self.request_plan)
+                for interval, variables in read_variables.items()
+            }
+        # persistent variables by the interval they are decoded at; those without
+        # a register are set by read methods on every read cycle, under None
+        persistent_intervals: dict[ReadInterval | None, list[str]] = {}
+        for var_name in self.get_mosaik_persistent_variables():
+            interval = next(
+                (i for i, variables in read_variables.items() if var_name in variables),
+                None,
+            )
+            persistent_intervals.setdefault(interval, []).append(var_name)
+        self.mosaik_persistent_intervals: dict[
+            ReadInterval | None, tuple[str, ...]
+        ] = {
+            interval: tuple(names)
+            for interval, names in persistent_intervals.items()
+        }
+        # (name, slot) of the variables sent to Mosaik after every step
+        self.mosaik_persistent_slots: tuple[tuple[str, int], ...] = tuple(
+            (var_name, self.slots[var_name])
+            for var_name in self.get_mosaik_persistent_variables()
+        )
+        # (name, age attribute, stale attribute) of the persistent variables, sent
+        # to Mosaik along with them if the model has a step deadline
+        self.mosaik_staleness_attributes: tuple[tuple[str, str, str], ...] = ()
+        if self.step_deadline is not None:
+            self.mosaik_staleness_attributes = tuple(
+                (var_name, f"{var_name}_age", f"{var_name}_stale")
+                for var_name in self.get_mosaik_persistent_variables()
+            )
+            for _, *attributes in self.mosaik_staleness_attributes:
+                for attribute in attributes:
+                    if attribute in self.slots.index:
+                        raise ValueError(
+                            f"Staleness attribute '{attribute}' collides with a variable"
+                        )
+
     def check_validity(self) -> None:
         # read cycle: all varaibles shown to Mosaik must be valid
         valid_vars = set()
@@ -124,9 +253,15 @@ class ModbusIntegrationSettings:
         vars_dict: dict[str, Any] = {}
         for var_name, var in self.variables.items():
             if var.mosaik and var.io_type in (IOType.READ, IOType.BOTH):
-                if var.data_type == DataType.bool:
-                    vars_dict[var_name] = False
+                default = (
+                    False
+                    if var.data_type == DataType.bool
+                    or (var.bits is not None and var.bits[1] == 1)
+                    else 0
+                )
+                if var.count is not None:
+                    vars_dict[var_name] = [default] * var.count
                 else:
-                    vars_dict[var_name] = 0
+                    vars_dict[var_name] = default
 
         return vars_dict
@@ -1,35 +1,93 @@
+from typing import Any
 
+from .iotype import IOType
 from .modbusregistertypes import ModbusRegisterTypes
 from .registerrange import RegisterRange
+from .variablemapping import VariableMapping
+
+# (steps, seconds) between two reads of a bundle, it is read again once both
+# have passed since its last read
+ReadInterval = tuple[int, float]
+# interval of the bundles without one, which are read on every step
+EVERY_STEP: ReadInterval = (1, 0.0)
 
 
 class ModbusIOBundlesConfiguration():
     def __init__(
-        self, io_config: dict[str, dict[str, list[str]]]
+        self, io_config: dict[str, dict[str, list[str | dict[str, Any]]]]
     ):
         self.read_ranges: dict[ModbusRegisterTypes, list[RegisterRange]] = {}
         self.write_ranges: dict[ModbusRegisterTypes, list[RegisterRange]] = {}
+        # interval of every read range, in the same order
+        self.read_intervals: dict[ModbusRegisterTypes, list[ReadInterval]] = {}
 
         for reg_type in ModbusRegisterTypes:
             self.read_ranges[reg_type] = []
             self.write_ranges[reg_type] = []
+            self.read_intervals[reg_type] = []
 
         for direction, regs in io_config.items():
             for reg_type_str, reg_list in regs.items():
                 reg_type = ModbusRegisterTypes.parse_regtype(reg_type_str)
-                for reg_str in reg_list:
+                for bundle in reg_list:
+                    # a bundle is either its range or an object with its options
+                    interval = EVERY_STEP
+                    if isinstance(bundle, dict):
+                        if "interval" in bundle:
+                            if direction != "read":
+                                raise ValueError(
+                                    "Intervals are only supported for read bundles"
+                                )
+                            interval = ModbusIOBundlesConfiguration.parse_interval(
+                                bundle["interval"]
+                            )
+                        bundle = bundle["range"]
                     reg_range = RegisterRange.parse_registerrange(
-                        reg_str,
+                        bundle,
                         reg_type_override=reg_type,
                     )
 
                     if direction == "read":
                         self.read_ranges[reg_type].append(reg_range)
+                        self.read_intervals[reg_type].append(interval)
                     elif direction == "write":
                         self.write_ranges[reg_type].append(reg_range)
                     else:
                         raise ValueError(f"Invalid IO config direction: {direction}")
 
+        # every register is read at a single interval, so the variables in it can be
+        # decoded whenever their bundle was read
+        for reg_type, ranges in self.read_ranges.items():
+            intervals = self.read_intervals[reg_type]
+            for i, reg_range in enumerate(ranges):
+                for other, interval in zip(ranges[i + 1 :], intervals[i + 1 :]):
+                    if interval != intervals[i] and reg_range.overlaps(other):
+                        raise ValueError(
+                            f"Read bundles {reg_range} and {other} overlap with different intervals"
+                        )
+
+    @staticmethod
+    def parse_interval(interval: Any) -> ReadInterval:
+        """
+        Parses the interval of a read bundle, a number of steps or a number of seconds like "60s".
+
+        :param interval: the configured interval
+        :type interval: Any
+        :return: the steps and seconds between two reads of the bundle
+        :rtype: ReadInterval
+        """
+        if isinstance(interval, int) and not isinstance(interval, bool):
+            if interval >= 1:
+                return interval, 0.0
+        elif isinstance(interval, str) and interval.endswith("s"):
+            try:
+                seconds = float(interval[:-1])
+            except ValueError:
+                seconds = 0.0
+            if seconds > 0:
+                return 1, seconds
+        raise ValueError(f"Invalid read interval: {interval!r}")
+
                     
     
     def has_read_range(self, reg_range: RegisterRange) -> bool:
@@ -42,4 +100,55 @@ class ModbusIOBundlesConfiguration():
         for existing_range in self.write_ranges[reg_range.type]:
             if existing_range.contains_range(reg_range):
                 return True
-        return False
\ No newline at end of file
+        return False
+
+    def get_read_interval(self, reg_range: RegisterRange) -> ReadInterval:
+        """
+        Gets the interval the given registers are read at.
+
+        :param reg_range: registers within a read bundle
+        :type reg_range: RegisterRange
+        :return: the interval of the bundle holding them
+        :rtype: ReadInterval
+        """
+        for existing_range, interval in zip(
+            self.read_ranges[reg_range.type], self.read_intervals[reg_range.type]
+        ):
+            if existing_range.contains_range(reg_range):
+                return interval
+        raise ValueError(f"Register range {reg_range} is not in any read bundle")
+
+    @classmethod
+    def from_variables(
+        cls, variables: dict[str, VariableMapping]
+    ) -> "ModbusIOBundlesConfiguration":
+        """
+        Derives the I/O bundles from the registers of the given variables.
+
+        Every variable mapped to a register gets its own read and/or write range depending on its iotype.
+        Combining them into as few requests as possible is left to the request planner.
+
+        :param variables: the variables of the model
+        :type variables: dict[str, VariableMapping]
+        :return: the derived I/O bundles
+        :rtype: ModbusIOBundlesConfiguration
+        """
+        io_bundles = cls({})
+        for var_name, var in variables.items():
+            if var.register is None:
+                continue
+
+            if var.io_type in (IOType.READ, IOType.BOTH):
+                io_bundles.read_ranges[var.register.type].append(var.register)
+                io_bundles.read_intervals[var.register.type].append(EVERY_STEP)
+
+            if var.io_type in (IOType.WRITE, IOType.BOTH):
+                if var.register.type not in (
+                    ModbusRegisterTypes.COIL,
+                    ModbusRegisterTypes.HOLDING_REGISTER,
+                ):
+                    raise ValueError(
+                        f"Variable '{var_name}' is mapped to register {var.register} which can not be written."
+                    )
+                io_bundles.write_ranges[var.register.type].append(var.register)
+        return io_bundles
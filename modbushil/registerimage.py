@@ -0,0 +1,169 @@
+import struct
+from functools import lru_cache
+
+from .modbusregistertypes import ModbusRegisterTypes
+from .registerrange import RegisterRange
+
+
+@lru_cache(maxsize=None)
+def registers_struct(count: int) -> struct.Struct:
+    """
+    Gets the struct packing count registers in the byte order of a :class:`RegisterImage`.
+
+    :param count: the number of registers
+    :type count: int
+    :return: the struct for count little-endian unsigned 16-bit values
+    :rtype: struct.Struct
+    """
+    return struct.Struct(f"<{count}H")
+
+
+class RegisterImage:
+    """
+    Contiguous image of all registers or discretes of one register type within the given ranges.
+
+    Registers are stored as two bytes each in little-endian byte order, which is the memory layout of
+    ``array('H')`` on common platforms. Discretes are stored as one byte each, 0 or 1. Overlapping and
+    adjacent ranges share one segment of the image and the segments are packed back to back, so the
+    addresses between them take no memory. Values are stored into the image in place, and
+    :func:`view` hands out memoryview slices without copying.
+
+    Every address is resolved to the range it belongs to and its byte offset through an index built
+    once on construction.
+    """
+
+    def __init__(self, reg_type: ModbusRegisterTypes, ranges: list[RegisterRange]):
+        self.reg_type: ModbusRegisterTypes = reg_type
+        is_discrete = reg_type in (
+            ModbusRegisterTypes.COIL,
+            ModbusRegisterTypes.DISCRETE_INPUT,
+        )
+        self.item_size: int = 1 if is_discrete else 2
+
+        # start address -> length of every range within the image
+        self.ranges: dict[int, int] = {}
+        for reg_range in ranges:
+            self.ranges[reg_range.start] = max(
+                self.ranges.get(reg_range.start, 0), reg_range.length
+            )
+
+        # start of every range -> byte offset of its first address in the image
+        self.offsets: dict[int, int] = {}
+        size = 0
+        segment_start = segment_end = segment_offset = 0
+        for range_start, length in sorted(self.ranges.items()):
+            if not self.offsets or range_start > segment_end:
+                segment_start = segment_end = range_start
+                segment_offset = size
+            self.offsets[range_start] = segment_offset + self.item_size * (
+                range_start - segment_start
+            )
+            end = max(segment_end, range_start + length)
+            size += self.item_size * (end - segment_end)
+            segment_end = end
+        self.data: bytearray = bytearray(size)
+        self._view: memoryview = memoryview(self.data)
+
+        # address -> start of the range holding it
+        self.index: dict[int, int] = {}
+        for range_start, length in sorted(self.ranges.items()):
+            for address in range(range_start, range_start + length):
+                self.index.setdefault(address, range_start)
+
+    def locate(self, start: int, length: int) -> tuple[int, int]:
+        """
+        Resolves an address range to the range holding it and its byte offset within the image.
+
+        :param start: the first address
+        :type start: int
+        :param length: the number of registers or discretes
+        :type length: int
+        :return: the start of the range holding the addresses and the byte offset of start in the image
+        :rtype: tuple[int, int]
+        """
+        range_start = self.index.get(start)
+        if range_start is None:
+            raise ValueError(
+                f"Start address {start} not in buffer for {self.reg_type.name}"
+            )
+        if start + length > range_start + self.ranges[range_start]:
+            raise ValueError(
+                f"Requested length exceeds buffer for {self.reg_type.name} starting at {start}"
+            )
+        return range_start, self.offsets[range_start] + self.item_size * (
+            start - range_start
+        )
+
+    def view(self, start: int, length: int) -> memoryview:
+        """
+        Gets the raw bytes of the given addresses without copying.
+
+        :param start: the first address
+        :type start: int
+        :param length: the number of registers or discretes
+        :type length: int
+        :return: a view on the image
+        :rtype: memoryview
+        """
+        _, offset = self.locate(start, length)
+        return self._view[offset : offset + self.item_size * length]
+
+    def get_registers(self, start: int, length: int) -> list[int]:
+        _, offset = self.locate(start, length)
+        return list(registers_struct(length).unpack_from(self.data, offset))
+
+    def get_discretes(self, start: int, length: int) -> list[bool]:
+        _, offset = self.locate(start, length)
+        return [value != 0 for value in self._view[offset : offset + length]]
+
+    def set_registers(self, start: int, values: list[int]) -> int | None:
+        """
+        Stores register values, masked to 16 bits.
+
+        :param start: the first address
+        :type start: int
+        :param values: the register values
+        :type values: list[int]
+        :return: the start of the range holding the addresses if any value changed, None otherwise
+        :rtype: int | None
+        """
+        range_start, offset = self.locate(start, len(values))
+        packed = registers_struct(len(values)).pack(*(v & 0xFFFF for v in values))
+        if self._view[offset : offset + len(packed)] == packed:
+            return None
+        self.data[offset : offset + len(packed)] = packed
+        return range_start
+
+    def set_discretes(self, start: int, values: list[bool]) -> int | None:
+        """
+        Stores discrete values.
+
+        :param start: the first address
+        :type start: int
+        :param values: the discrete values
+        :type values: list[bool]
+        :return: the start of the range holding the addresses if any value changed, None otherwise
+        :rtype: int | None
+        """
+        range_start, offset = self.locate(start, len(values))
+        packed = bytes(map(bool, values))
+        if self._view[offset : offset + len(packed)] == packed:
+            return None
+        self.data[offset : offset + len(packed)] = packed
+        return range_start
+
+    def store(self, start: int, values: list[int] | list[bool]):
+        """
+        Stores the values received for a request in place, without change detection.
+
+        :param start: the first address
+        :type start: int
+        :param values: the register or discrete values
+        :type values: list[int] | list[bool]
+        """
+        range_start = self.index[start]
+        offset = self.offsets[range_start] + self.item_size * (start - range_start)
+        if self.item_size == 1:
+            self.data[offset : offset + len(values)] = bytes(map(bool, values))
+        else:
+            registers_struct(len(values)).pack_into(self.data, offset, *values)
@@ -28,6 +28,22 @@ class RegisterRange:
             other.start + other.length
         )
 
+    def overlaps(self, other: "RegisterRange") -> bool:
+        """
+        Checks if this register range shares any address with another register range.
+
+        :param other: the other register range to check
+        :type other: RegisterRange
+        :return: True if both ranges share an address, False otherwise
+        :rtype: bool
+        """
+        if self.type != other.type:
+            return False
+        return (
+            self.start < other.start + other.length
+            and other.start < self.start + self.length
+        )
+
     @staticmethod
     def parse_registerrange(
         range_str: str, reg_type_override: ModbusRegisterTypes | None
@@ -0,0 +1,249 @@
+import logging
+
+from .modbusiobundlesconfiguration import (
+    EVERY_STEP,
+    ModbusIOBundlesConfiguration,
+    ReadInterval,
+)
+from .modbusregistertypes import ModbusRegisterTypes
+from .registerrange import RegisterRange
+from .requestplannersettings import RequestPlannerSettings
+
+logger = logging.getLogger(__name__)
+
+# protocol limits of a single read request (function codes 1 to 4)
+MAX_READ_LENGTH: dict[ModbusRegisterTypes, int] = {
+    ModbusRegisterTypes.COIL: 2000,
+    ModbusRegisterTypes.DISCRETE_INPUT: 2000,
+    ModbusRegisterTypes.HOLDING_REGISTER: 125,
+    ModbusRegisterTypes.INPUT_REGISTER: 125,
+}
+
+# protocol limits of a single write request (function codes 15 and 16)
+MAX_WRITE_LENGTH: dict[ModbusRegisterTypes, int] = {
+    ModbusRegisterTypes.COIL: 1968,
+    ModbusRegisterTypes.DISCRETE_INPUT: 0,
+    ModbusRegisterTypes.HOLDING_REGISTER: 123,
+    ModbusRegisterTypes.INPUT_REGISTER: 0,
+}
+
+
+class RequestPlan:
+    """
+    The requests sent to the Modbus device on every step, per register type.
+
+    Has the same shape as :class:`ModbusIOBundlesConfiguration`, so it can be used in its place.
+    Without read intervals, every read request is sent on every step.
+    """
+
+    def __init__(
+        self,
+        read_ranges: dict[ModbusRegisterTypes, list[RegisterRange]],
+        write_ranges: dict[ModbusRegisterTypes, list[RegisterRange]],
+        read_intervals: dict[ModbusRegisterTypes, list[ReadInterval]] | None = None,
+    ):
+        self.read_ranges: dict[ModbusRegisterTypes, list[RegisterRange]] = read_ranges
+        self.write_ranges: dict[ModbusRegisterTypes, list[RegisterRange]] = (
+            write_ranges
+        )
+        self.read_intervals: dict[ModbusRegisterTypes, list[ReadInterval]] = (
+            read_intervals
+            if read_intervals is not None
+            else {
+                reg_type: [EVERY_STEP] * len(ranges)
+                for reg_type, ranges in read_ranges.items()
+            }
+        )
+
+    def __str__(self) -> str:
+        lines = []
+        for direction, ranges in (
+            ("read", self.read_ranges),
+            ("write", self.write_ranges),
+        ):
+            for reg_type, reg_ranges in ranges.items():
+                for reg_range in reg_ranges:
+                    lines.append(
+                        f"{direction} {reg_type} {reg_range.start}-{reg_range.start + reg_range.length - 1}"
+                    )
+        return "\n".join(lines)
+
+    def request_count(self) -> int:
+        return sum(len(r) for r in self.read_ranges.values()) + sum(
+            len(r) for r in self.write_ranges.values()
+        )
+
+    def has_read_range(self, reg_range: RegisterRange) -> bool:
+        for existing_range in self.read_ranges[reg_range.type]:
+            if existing_range.contains_range(reg_range):
+                return True
+        return False
+
+    def has_write_range(self, reg_range: RegisterRange) -> bool:
+        for existing_range in self.write_ranges[reg_range.type]:
+            if existing_range.contains_range(reg_range):
+                return True
+        return False
+
+
+class RequestPlanner:
+    """
+    Turns the configured Modbus I/O bundles into the requests actually sent to the device.
+
+    Overlapping and adjacent ranges are always combined. Read ranges are additionally combined across gaps
+    whose cost is below the cost of an extra round trip. Read bundles with different intervals are never
+    combined and gaps are not bridged across the bundles of another interval, so each request is sent at the
+    interval of its bundles and reads no register of another interval. Ranges exceeding the protocol
+    limits are split into legal chunks, without cutting through any of the given variable registers.
+    Requests are packed greedily, which yields the smallest number of requests under these constraints.
+    """
+
+    def __init__(self, settings: RequestPlannerSettings):
+        self.settings = settings
+
+    def plan(
+        self,
+        io_config: ModbusIOBundlesConfiguration,
+        variable_registers: list[RegisterRange],
+    ) -> RequestPlan:
+        """
+        Creates the request plan for the given I/O bundles.
+
+        :param io_config: the configured Modbus I/O bundles
+        :type io_config: ModbusIOBundlesConfiguration
+        :param variable_registers: the registers of all variables, which must not be split across requests
+        :type variable_registers: list[RegisterRange]
+        :return: the request plan
+        :rtype: RequestPlan
+        """
+        read_ranges: dict[ModbusRegisterTypes, list[RegisterRange]] = {}
+        write_ranges: dict[ModbusRegisterTypes, list[RegisterRange]] = {}
+        read_intervals: dict[ModbusRegisterTypes, list[ReadInterval]] = {}
+
+        for reg_type in ModbusRegisterTypes:
+            atoms = sorted(
+                (r for r in variable_registers if r.type == reg_type),
+                key=lambda r: r.start,
+            )
+            bundles: dict[ReadInterval, list[RegisterRange]] = {}
+            for reg_range, interval in zip(
+                io_config.read_ranges[reg_type], io_config.read_intervals[reg_type]
+            ):
+                bundles.setdefault(interval, []).append(reg_range)
+            read_ranges[reg_type] = []
+            read_intervals[reg_type] = []
+            for interval, ranges in bundles.items():
+                # reading the bundles of another interval along would send them on
+                # every request of this one as well
+                others = [
+                    r
+                    for other, other_ranges in bundles.items()
+                    if other != interval
+                    for r in other_ranges
+                ]
+                requests = self._plan_ranges(
+                    ranges,
+                    atoms,
+                    MAX_READ_LENGTH[reg_type],
+                    bridge_gaps=True,
+                    barriers=others,
+                )
+                read_ranges[reg_type].extend(requests)
+                read_intervals[reg_type].extend([interval] * len(requests))
+            write_ranges[reg_type] = self._plan_ranges(
+                io_config.write_ranges[reg_type],
+                atoms,
+                MAX_WRITE_LENGTH[reg_type],
+                bridge_gaps=False,
+            )
+
+        plan = RequestPlan(read_ranges, write_ranges, read_intervals)
+        logger.debug("Modbus request plan:\n%s", plan)
+        return plan
+
+    def _plan_ranges(
+        self,
+        ranges: list[RegisterRange],
+        atoms: list[RegisterRange],
+        max_length: int,
+        bridge_gaps: bool,
+        barriers: list[RegisterRange] | None = None,
+    ) -> list[RegisterRange]:
+        """
+        Greedily packs the ranges into as few requests as possible.
+
+        Each request is extended as far as the protocol limit allows, across gaps only if bridge_gaps is set,
+        the gap is worth reading and it does not overlap any of the barriers. Requests never end inside an atom.
+        """
+        if ranges and max_length <= 0:
+            raise ValueError(
+                f"Register type {ranges[0].type.name} can not be used in this direction"
+            )
+
+        requests: list[RegisterRange] = []
+        for covered in self._union(ranges):
+            pos = covered.start
+            end = covered.start + covered.length
+
+            start = pos
+            if bridge_gaps and requests:
+                last = requests[-1]
+                gap = pos - (last.start + last.length)
+                gap_range = RegisterRange(last.start + last.length, gap, covered.type)
+                if self.settings.is_gap_worth_reading(covered.type, gap) and not any(
+                    barrier.overlaps(gap_range) for barrier in barriers or []
+                ):
+                    start = last.start
+
+            while pos < end:
+                cut = self._find_cut(start, end, atoms, max_length)
+                if cut <= pos:
+                    if start == pos:
+                        raise ValueError(
+                            f"Register range starting at {pos} can not be requested within the protocol limit of {max_length}"
+                        )
+                    # nothing of this range fits into the previous request
+                    start = pos
+                    continue
+
+                if start < pos:
+                    requests.pop()
+                requests.append(RegisterRange(start, cut - start, covered.type))
+                start = pos = cut
+        return requests
+
+    @staticmethod
+    def _find_cut(
+        start: int, end: int, atoms: list[RegisterRange], max_length: int
+    ) -> int:
+        """
+        Finds the end of a request starting at start, so it does not exceed max_length, end or cut through an atom.
+        """
+        cut = min(end, start + max_length)
+        if cut == end:
+            return cut
+        for atom in atoms:
+            if atom.start >= cut:
+                break
+            if atom.start < cut < atom.start + atom.length:
+                return atom.start
+        return cut
+
+    @staticmethod
+    def _union(ranges: list[RegisterRange]) -> list[RegisterRange]:
+        """
+        Combines overlapping and adjacent ranges.
+        """
+        result: list[RegisterRange] = []
+        for reg_range in sorted(ranges, key=lambda r: r.start):
+            if result and reg_range.start <= result[-1].start + result[-1].length:
+                last = result[-1]
+                end = max(
+                    last.start + last.length, reg_range.start + reg_range.length
+                )
+                result[-1] = RegisterRange(last.start, end - last.start, last.type)
+            else:
+                result.append(
+                    RegisterRange(reg_range.start, reg_range.length, reg_range.type)
+                )
+        return result
@@ -0,0 +1,42 @@
+from typing import Any
+
+from .modbusregistertypes import ModbusRegisterTypes
+
+
+class RequestPlannerSettings:
+    def __init__(self, planner_config: dict[str, Any]):
+        # the cost model is expressed in bytes on the wire: a gap between two read
+        # ranges is read along if transferring it is cheaper than one more request;
+        # off by default, as devices may reject reads of unmapped addresses
+        self.round_trip_cost: float = 0.0
+        if "round_trip_cost" in planner_config:
+            self.round_trip_cost = float(planner_config["round_trip_cost"])
+
+        self.register_cost: float = 2.0
+        if "register_cost" in planner_config:
+            self.register_cost = float(planner_config["register_cost"])
+
+        self.coil_cost: float = 0.125
+        if "coil_cost" in planner_config:
+            self.coil_cost = float(planner_config["coil_cost"])
+
+        if min(self.round_trip_cost, self.register_cost, self.coil_cost) < 0:
+            raise ValueError("Request planner costs must not be negative")
+
+    def gap_cost(self, reg_type: ModbusRegisterTypes, gap: int) -> float:
+        """
+        Calculates the cost of reading a gap of unused addresses along with the surrounding ranges.
+
+        :param reg_type: the register type of the gap
+        :type reg_type: ModbusRegisterTypes
+        :param gap: the number of unused addresses
+        :type gap: int
+        :return: the cost of the gap, comparable to round_trip_cost
+        :rtype: float
+        """
+        if reg_type in (ModbusRegisterTypes.COIL, ModbusRegisterTypes.DISCRETE_INPUT):
+            return gap * self.coil_cost
+        return gap * self.register_cost
+
+    def is_gap_worth_reading(self, reg_type: ModbusRegisterTypes, gap: int) -> bool:
+        return self.gap_cost(reg_type, gap) < self.round_trip_cost
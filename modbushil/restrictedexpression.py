@@ -0,0 +1,146 @@
+import ast
+from typing import Any, Callable
+
+
+def _clamp(value: Any, lower: Any, upper: Any) -> Any:
+    return min(max(value, lower), upper)
+
+
+# the only names an expression can call, everything else is unavailable
+_FUNCTIONS: dict[str, Callable[..., Any]] = {
+    "min": min,
+    "max": max,
+    "abs": abs,
+    "round": round,
+    "clamp": _clamp,
+}
+
+_NODES: tuple[type[ast.AST], ...] = (
+    ast.Expression,
+    ast.BinOp,
+    ast.UnaryOp,
+    ast.BoolOp,
+    ast.Compare,
+    ast.IfExp,
+    ast.Call,
+    ast.Name,
+    ast.Load,
+    ast.Constant,
+    ast.Add,
+    ast.Sub,
+    ast.Mult,
+    ast.Div,
+    ast.FloorDiv,
+    ast.Mod,
+    ast.Pow,
+    ast.UAdd,
+    ast.USub,
+    ast.Not,
+    ast.And,
+    ast.Or,
+    ast.Eq,
+    ast.NotEq,
+    ast.Lt,
+    ast.LtE,
+    ast.Gt,
+    ast.GtE,
+)
+
+# largest constant exponent, so a single expression can not stall a step
+_MAX_EXPONENT: int = 64
+
+
+class RestrictedExpression:
+    """
+    Expression limited to arithmetic, comparisons, boolean operators, conditional expressions and the
+    functions min, max, abs, round and clamp(value, lower, upper) on numbers and its parameters.
+
+    The expression is parsed once on construction and every element outside of this whitelist is
+    rejected with a ValueError, as are nested powers and exponents other than numeric constants up to
+    64. The checked syntax tree is compiled into :attr:`function` without access to any builtins, so
+    evaluating it is a single call of compiled code like an unrestricted expression.
+    """
+
+    def __init__(self, expression: str, parameters: list[str]):
+        self.parameters: list[str] = parameters
+
+        try:
+            tree = ast.parse(expression.strip(), mode="eval")
+        except SyntaxError as e:
+            raise ValueError(e.msg) from e
+        self._check(tree)
+
+        code = compile(
+            ast.fix_missing_locations(
+                ast.Expression(
+                    body=ast.Lambda(
+                        args=ast.arguments(
+                            posonlyargs=[],
+                            args=[ast.arg(arg=name) for name in parameters],
+                            kwonlyargs=[],
+                            kw_defaults=[],
+                            defaults=[],
+                        ),
+                        body=tree.body,
+                    )
+                )
+            ),
+            "<expression>",
+            "eval",
+        )
+        self.function: Callable[..., Any] = eval(
+            code, {"__builtins__": {}, **_FUNCTIONS}
+        )
+
+    def _check(self, tree: ast.AST) -> None:
+        functions = {
+            id(node.func)
+            for node in ast.walk(tree)
+            if isinstance(node, ast.Call) and isinstance(node.func, ast.Name)
+        }
+        for node in ast.walk(tree):
+            if not isinstance(node, _NODES):
+                raise ValueError(f"Unsupported element {type(node).__name__}")
+            if isinstance(node, ast.Call) and (
+                not isinstance(node.func, ast.Name)
+                or node.func.id not in _FUNCTIONS
+                or node.keywords
+            ):
+                raise ValueError("Unsupported function call")
+            if (
+                isinstance(node, ast.Name)
+                and id(node) not in functions
+                and node.id not in self.parameters
+            ):
+                raise ValueError(f"Unknown name {node.id}")
+            if isinstance(node, ast.Constant) and not isinstance(
+                node.value, (int, float)
+            ):
+                raise ValueError(f"Unsupported constant {node.value!r}")
+            if isinstance(node, ast.BinOp) and isinstance(node.op, ast.Pow):
+                exponent = RestrictedExpression._constant(node.right)
+                if (
+                    exponent is None
+                    or abs(exponent) > _MAX_EXPONENT
+                    or any(
+                        isinstance(n, ast.BinOp) and isinstance(n.op, ast.Pow)
+                        for n in ast.walk(node.left)
+                    )
+                ):
+                    raise ValueError(
+                        f"Exponents must be numbers up to {_MAX_EXPONENT} and can not be nested"
+                    )
+
+    @staticmethod
+    def _constant(node: ast.AST) -> int | float | None:
+        """
+        Gets the value of a possibly signed numeric constant, None for other nodes.
+        """
+        sign = 1
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.UAdd, ast.USub)):
+            if isinstance(node.op, ast.USub):
+                sign = -1
+            node = node.operand
+        if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)):
+            return sign * node.value
+        return None
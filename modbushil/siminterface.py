@@ -1,13 +1,21 @@
+from collections import deque
+from contextlib import nullcontext
 from typing import Any
 import threading
+import time
 import asyncio
 import concurrent.futures as cf
 
 import mosaik_api_v3
 
 from .mappingmanager import MappingManager
+from .modbusconnectionpool import ModbusConnectionPool
 from .configurationmanager import ConfigurationManager
 
+# time the values were read, as time.monotonic(), the persistent variables and
+# the names of those among them which were read by the cycle
+CycleResult = tuple[float, dict[str, Any], list[str]]
+
 
 class ModbusSimInterface(mosaik_api_v3.Simulator):
     metadata: dict[str, Any] = {
@@ -20,35 +28,108 @@ class ModbusSimInterface(mosaik_api_v3.Simulator):
 
     def __init__(self):
         for modelname in ConfigurationManager.get_registered_models():
+            model_config = ConfigurationManager.get_model_config(modelname)
             self.metadata["models"][modelname] = {
                 "public": True,
-                "params": ["host", "port"],
-                "non-trigger": ConfigurationManager.get_model_config(
-                    modelname
-                ).get_mosaik_non_trigger_variables(),
-                "persistent": ConfigurationManager.get_model_config(
-                    modelname
-                ).get_mosaik_persistent_variables(),
+                "params": ["host", "port", "unit_id"],
+                "non-trigger": model_config.get_mosaik_non_trigger_variables(),
+                "persistent": model_config.get_mosaik_persistent_variables()
+                + [
+                    attribute
+                    for _, *attributes in model_config.mosaik_staleness_attributes
+                    for attribute in attributes
+                ],
             }
             self.instance_counter[modelname] = 0
 
         self.modbus_manager: dict[str, MappingManager] = {}
         self.step_size: int = -1  # negative value indicates uninitialized
+        self.time_resolution: float = 1.0
         self.use_async: bool = False
+        self.native_async: bool = False
+        # runs the write/read cycles of all entities at once in sync mode
+        self.concurrent: bool = False
+        # threads running the cycles of the entities in async and concurrent mode
+        self.max_workers: int | None = None
+        self.executor: cf.ThreadPoolExecutor | None = None
+        # most cycles running at once per host and port, shared by its entities
+        self.max_cycles_per_host: int | None = None
+        self.host_limits: dict[
+            tuple[str, int], asyncio.Semaphore | threading.Semaphore
+        ] = {}
+        self.entity_limit: dict[str, asyncio.Semaphore | threading.Semaphore] = {}
+        self.connection_pool: ModbusConnectionPool
         self.loop: asyncio.AbstractEventLoop
-        self.resp_future: dict[str, cf.Future[dict[str, float]]] = {}
-        self.entity_public: dict[str, dict[str, float]] = {}
+        # cycles in flight per entity in async mode, oldest first; cycles dropped
+        # in favor of a newer one resolve to None
+        self.steps_in_flight: int = 1
+        self.latest_wins: bool = False
+        self.in_flight: dict[str, deque[cf.Future[CycleResult | None]]] = {}
+        self.cycles_submitted: dict[str, int] = {}
+        # runs the cycles of an entity one after another in submission order
+        self.entity_locks: dict[str, asyncio.Lock] = {}
+        # cycles running in the executor in sync mode, until they are published
+        self.cycles: dict[str, cf.Future[CycleResult]] = {}
+        # seconds a step waits for an entity, for models with a step deadline
+        self.step_deadline: dict[str, float] = {}
+        # inputs of steps which could not start a cycle, as the entity was still
+        # busy after the deadline; they are written by its next cycle
+        self.pending_inputs: dict[str, dict[str, Any]] = {}
+        # time every persistent variable was last read and its (name, age attribute,
+        # stale attribute), for models with a step deadline; variables which have
+        # not been read yet are as old as their entity
+        self.created_at: dict[str, float] = {}
+        self.read_at: dict[str, dict[str, float]] = {}
+        self.staleness_attributes: dict[str, tuple[tuple[str, str, str], ...]] = {}
+        self.entity_public: dict[str, dict[str, Any]] = {}
 
         # New: List to store the RTT of every step
         self.step_durations = []
 
         super().__init__(self.metadata)
 
-    def init(self, sid, time_resolution: float, step_size: int, use_async: bool):
+    def init(
+        self,
+        sid,
+        time_resolution: float,
+        step_size: int,
+        use_async: bool,
+        native_async: bool = False,
+        connections_per_host: int = 1,
+        concurrent: bool = False,
+        max_workers: int | None = None,
+        max_cycles_per_host: int | None = None,
+        steps_in_flight: int = 1,
+        latest_wins: bool = False,
+    ):
         if step_size <= 0:
             raise ValueError("Step size must be positive and non-zero")
+        if native_async and not use_async:
+            raise ValueError("native_async requires use_async")
+        if concurrent and use_async:
+            raise ValueError("concurrent requires use_async=False")
+        if max_workers is not None and max_workers < 1:
+            raise ValueError("max_workers must be positive")
+        if max_cycles_per_host is not None and max_cycles_per_host < 1:
+            raise ValueError("max_cycles_per_host must be positive")
+        if steps_in_flight < 0:
+            raise ValueError("steps_in_flight must not be negative")
+        if not use_async and (steps_in_flight > 1 or latest_wins):
+            raise ValueError(
+                "steps_in_flight above 1 and latest_wins require use_async"
+            )
         self.step_size = step_size
+        self.time_resolution = time_resolution
         self.use_async = use_async
+        self.native_async = native_async
+        self.concurrent = concurrent
+        self.max_workers = max_workers
+        self.max_cycles_per_host = max_cycles_per_host
+        self.steps_in_flight = steps_in_flight
+        self.latest_wins = latest_wins
+        self.connection_pool = ModbusConnectionPool(
+            native_async=native_async, connections_per_host=connections_per_host
+        )
         if self.use_async:
             self.loop = asyncio.new_event_loop()
             threading.Thread(target=self.loop.run_forever, daemon=True).start()
@@ -58,13 +139,21 @@ class ModbusSimInterface(mosaik_api_v3.Simulator):
         if self.step_size <= 0:
             return super().finalize()
 
-        for manager in self.modbus_manager.values():
-            manager.close()
+        # the connections are shared between entities and owned by the pool
+        if self.native_async:
+            asyncio.run_coroutine_threadsafe(
+                self.connection_pool.close_async(), self.loop
+            ).result()
+        else:
+            self.connection_pool.close()
+        if self.executor is not None:
+            # cycles still hung after their deadline are left behind
+            self.executor.shutdown(wait=False, cancel_futures=True)
         if self.use_async:
             self.loop.call_soon_threadsafe(self.loop.stop)
         return super().finalize()
 
-    def create(self, num: int, model: str, host: str, port: int):
+    def create(self, num: int, model: str, host: str, port: int, unit_id: int = 1):
         result = []
         for _ in range(num):
             eid = f"{model}_{host}_{port}_{self.instance_counter[model]}"
@@ -74,56 +163,403 @@ class ModbusSimInterface(mosaik_api_v3.Simulator):
                 host=host,
                 port=port,
                 config=model_config,
+                modbus_client=self.connection_pool.get_client(
+                    host,
+                    port,
+                    unit_id=unit_id,
+                    pipeline_depth=model_config.modbus_client.pipeline_depth,
+                ),
             )
-            if self.use_async:
-                self.resp_future[eid] = cf.Future()
-                self.resp_future[eid].set_result(
+            if self.max_cycles_per_host is not None:
+                if (host, port) not in self.host_limits:
+                    self.host_limits[(host, port)] = (
+                        asyncio.Semaphore(self.max_cycles_per_host)
+                        if self.use_async
+                        else threading.Semaphore(self.max_cycles_per_host)
+                    )
+                self.entity_limit[eid] = self.host_limits[(host, port)]
+            self.entity_public[eid] = {}
+            if self.use_async or model_config.step_deadline is not None:
+                # published until the first cycle of the entity is done, which
+                # may miss the deadline of the step
+                self.entity_public[eid].update(
                     model_config.get_mosaik_persistent_variables_defaults()
                 )
-
-            self.entity_public[eid] = {}
+            if self.use_async:
+                self.in_flight[eid] = deque()
+                self.cycles_submitted[eid] = 0
+                self.entity_locks[eid] = asyncio.Lock()
+            if model_config.step_deadline is not None:
+                self.step_deadline[eid] = (
+                    model_config.step_deadline * self.step_size * self.time_resolution
+                )
+                self.created_at[eid] = time.monotonic()
+                self.read_at[eid] = {}
+                self.staleness_attributes[eid] = (
+                    model_config.mosaik_staleness_attributes
+                )
+                for _, age, stale in model_config.mosaik_staleness_attributes:
+                    self.entity_public[eid][age] = 0.0
+                    self.entity_public[eid][stale] = True
             result.append({"eid": eid, "type": model})
 
         return result
 
+    @staticmethod
+    def combine_inputs(values: dict[str, Any]) -> Any:
+        """
+        Combines the values sent to one attribute by several sources, by summing them up.
+
+        Array attributes are summed element wise.
+
+        :param values: the values by source
+        :type values: dict[str, Any]
+        :return: the combined value
+        :rtype: Any
+        """
+        if len(values) == 1:
+            return next(iter(values.values()))
+        if all(isinstance(v, (list, tuple)) for v in values.values()):
+            return [sum(elements) for elements in zip(*values.values())]
+        return sum(values.values())
+
     def step(self, time_val, inputs, max_advance):
-        for eid, attrs in inputs.items():
-            if self.use_async:
-                # In async mode, we wait for the previous step's Modbus result to resolve
-                self.entity_public[eid].update(self.resp_future[eid].result())
+        start = time.monotonic()
+        if self.concurrent:
+            self.step_concurrent(inputs, start)
+            return time_val + self.step_size
 
-                vars = {v: sum(vals.values()) for v, vals in attrs.items()}
+        step_inputs = {
+            eid: {
+                v: ModbusSimInterface.combine_inputs(vals) for v, vals in attrs.items()
+            }
+            for eid, attrs in inputs.items()
+        }
+        if not self.use_async:
+            # the cycles with a step deadline run in the executor, all started before
+            # waiting, so an entity which misses it does not use up that of the others
+            for eid, vars in step_inputs.items():
+                if eid in self.step_deadline:
+                    self.start_cycle(eid, vars)
 
-                self.resp_future[eid] = asyncio.run_coroutine_threadsafe(
-                    self.fetch_entity_data_async(self.modbus_manager[eid], vars),
-                    self.loop,
-                )
+        for eid, vars in step_inputs.items():
+            deadline = self.get_deadline(eid, start)
+            missed = False
+            if self.use_async:
+                in_flight = self.in_flight[eid]
+                # results are taken in the order the cycles were started, waiting
+                # for the oldest ones while the entity has too many in flight
+                while in_flight and (
+                    in_flight[0].done()
+                    or (
+                        not self.latest_wins
+                        and len(in_flight) >= self.steps_in_flight
+                    )
+                ):
+                    if not ModbusSimInterface.wait(in_flight[0], deadline):
+                        missed = True
+                        break
+                    self.publish(eid, in_flight.popleft().result())
+
+                if missed:
+                    # the entity already has as many cycles in flight as allowed
+                    self.pending_inputs.setdefault(eid, {}).update(vars)
+                else:
+                    self.cycles_submitted[eid] += 1
+                    in_flight.append(
+                        asyncio.run_coroutine_threadsafe(
+                            self.run_cycle(
+                                eid,
+                                self.pending_inputs.pop(eid, {}) | vars,
+                                self.cycles_submitted[eid],
+                            ),
+                            self.loop,
+                        )
+                    )
+                    if self.steps_in_flight == 0:
+                        if ModbusSimInterface.wait(in_flight[0], deadline):
+                            self.publish(eid, in_flight.popleft().result())
+                        else:
+                            missed = True
+            elif eid in self.step_deadline:
+                missed = not self.finish_cycle(eid, deadline)
             else:
                 # In sync mode, we perform the Modbus read/write immediately
-                vars = {v: sum(vals.values()) for v, vals in attrs.items()}
                 result = ModbusSimInterface.fetch_entity_data(
                     self.modbus_manager[eid], vars
                 )
                 self.entity_public[eid].update(result)
 
+            if eid in self.step_deadline:
+                self.update_staleness(eid, missed)
+
         return time_val + self.step_size
 
+    def step_concurrent(
+        self, inputs: dict[str, dict[str, dict[str, Any]]], start: float
+    ) -> None:
+        """
+        Runs the write/read cycles of all entities concurrently and waits for all of them, so the
+        values read within the step include its writes like in sync mode, but the step takes about
+        as long as the slowest device instead of all of them together.
+
+        Entities of models with a step deadline are only waited for until it passes.
+
+        :param inputs: the inputs of the step by entity
+        :type inputs: dict[str, dict[str, dict[str, Any]]]
+        :param start: the time the step started at, as :func:`time.monotonic`
+        :type start: float
+        """
+        for eid, attrs in inputs.items():
+            self.start_cycle(
+                eid,
+                {
+                    v: ModbusSimInterface.combine_inputs(vals)
+                    for v, vals in attrs.items()
+                },
+            )
+        finished = {
+            eid: ModbusSimInterface.wait(self.cycles[eid], self.get_deadline(eid, start))
+            for eid in inputs
+        }
+        for eid, done in finished.items():
+            if done:
+                # raises the error of the first failed entity
+                self.finish_cycle(eid, None)
+            if eid in self.step_deadline:
+                self.update_staleness(eid, not done)
+
+    def start_cycle(self, eid: str, vars: dict[str, Any]) -> None:
+        """
+        Starts a write/read cycle of an entity in the executor, in sync mode.
+
+        The result of a previous cycle which missed its deadline is published first. If that cycle
+        is still running, no cycle is started and the inputs are written by the next one instead.
+
+        :param eid: the entity
+        :type eid: str
+        :param vars: the inputs of the step
+        :type vars: dict[str, Any]
+        """
+        cycle = self.cycles.get(eid)
+        if cycle is not None:
+            if not cycle.done():
+                self.pending_inputs.setdefault(eid, {}).update(vars)
+                return
+            self.publish(eid, self.cycles.pop(eid).result())
+
+        self.cycles[eid] = self.get_executor().submit(
+            self.run_cycle_sync, eid, self.pending_inputs.pop(eid, {}) | vars
+        )
+
+    def finish_cycle(self, eid: str, deadline: float | None) -> bool:
+        """
+        Waits for the cycle of an entity started in sync mode and publishes its result.
+
+        :param eid: the entity
+        :type eid: str
+        :param deadline: the time to wait until, as :func:`time.monotonic`, None to wait without limit
+        :type deadline: float | None
+        :return: whether the cycle was done before the deadline, otherwise it keeps running
+        :rtype: bool
+        """
+        if not ModbusSimInterface.wait(self.cycles[eid], deadline):
+            return False
+        self.publish(eid, self.cycles.pop(eid).result())
+        return True
+
+    def run_cycle_sync(self, eid: str, vars: dict[str, Any]) -> CycleResult:
+        """
+        Runs a cycle of an entity in sync mode, in a thread of the executor.
+
+        :param eid: the entity
+        :type eid: str
+        :param vars: the inputs of the step
+        :type vars: dict[str, Any]
+        :return: the time of the read, the persistent variables and those read by the cycle
+        :rtype: CycleResult
+        """
+        mapping_manager = self.modbus_manager[eid]
+        result = ModbusSimInterface.fetch_entity_data(
+            mapping_manager, vars, self.entity_limit.get(eid)
+        )
+        return (
+            time.monotonic(),
+            result,
+            mapping_manager.get_refreshed_mosaik_persistent_variables(),
+        )
+
+    def get_deadline(self, eid: str, start: float) -> float | None:
+        """
+        Gets the time a step waits for an entity until.
+
+        :param eid: the entity
+        :type eid: str
+        :param start: the time the step started at, as :func:`time.monotonic`
+        :type start: float
+        :return: the deadline as :func:`time.monotonic`, None if the model has none
+        :rtype: float | None
+        """
+        if eid not in self.step_deadline:
+            return None
+        return start + self.step_deadline[eid]
+
+    @staticmethod
+    def wait(future: cf.Future[Any], deadline: float | None) -> bool:
+        """
+        Waits for a cycle to finish, successfully or not.
+
+        :param future: the cycle
+        :type future: cf.Future[Any]
+        :param deadline: the time to wait until, as :func:`time.monotonic`, None to wait without limit
+        :type deadline: float | None
+        :return: whether the cycle is done
+        :rtype: bool
+        """
+        timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+        try:
+            future.exception(timeout=timeout)
+        except cf.TimeoutError:
+            return False
+        return True
+
+    def publish(self, eid: str, result: CycleResult | None) -> None:
+        """
+        Makes the result of a cycle available to Mosaik, unless the cycle was dropped.
+
+        :param eid: the entity
+        :type eid: str
+        :param result: the time of the read, the persistent variables and those read by the cycle, None if the cycle was dropped
+        :type result: CycleResult | None
+        """
+        if result is None:
+            return
+        read_at, values, refreshed = result
+        self.entity_public[eid].update(values)
+        if eid in self.read_at:
+            # variables of bundles which were not due keep the time of their last read
+            self.read_at[eid].update(dict.fromkeys(refreshed, read_at))
+
+    def update_staleness(self, eid: str, missed: bool) -> None:
+        """
+        Updates the age and staleness attributes of the persistent variables of an entity at the
+        end of a step.
+
+        The age is the time in seconds since the value was read from the device. It is stale if the
+        step missed its deadline waiting for the entity and the last known value is sent instead, or
+        if it has not been read at all yet.
+
+        :param eid: the entity
+        :type eid: str
+        :param missed: whether the step missed the deadline of the entity
+        :type missed: bool
+        """
+        now = time.monotonic()
+        public = self.entity_public[eid]
+        read_at = self.read_at[eid]
+        for var_name, age, stale in self.staleness_attributes[eid]:
+            read = read_at.get(var_name)
+            public[age] = now - (self.created_at[eid] if read is None else read)
+            public[stale] = missed or read is None
+
+    async def run_cycle(
+        self, eid: str, vars: dict[str, Any], cycle: int
+    ) -> CycleResult | None:
+        """
+        Runs a cycle of an entity in async mode, after all of its cycles started before.
+
+        With ``latest_wins``, a cycle superseded by a newer one while it was waiting only takes over
+        its inputs, which the newer cycle writes, and resolves to None without any I/O.
+
+        :param eid: the entity
+        :type eid: str
+        :param vars: the inputs of the step
+        :type vars: dict[str, Any]
+        :param cycle: the number of the cycle of the entity
+        :type cycle: int
+        :return: the time of the read, the persistent variables and those read by the cycle, None if the cycle was dropped
+        :rtype: CycleResult | None
+        """
+        mapping_manager = self.modbus_manager[eid]
+        async with self.entity_locks[eid]:
+            if self.latest_wins and cycle != self.cycles_submitted[eid]:
+                mapping_manager.update_variable_buffer(vars)
+                return None
+
+            limit = self.entity_limit.get(eid)
+            if self.native_async:
+                result = await ModbusSimInterface.fetch_entity_data_native(
+                    mapping_manager, vars, limit
+                )
+            else:
+                result = await self.fetch_entity_data_async(
+                    mapping_manager, vars, limit
+                )
+            if self.steps_in_flight > 1 or self.latest_wins:
+                # the dict is reused by the next cycle, which may finish before
+                # this result is published
+                result = dict(result)
+            return (
+                time.monotonic(),
+                result,
+                mapping_manager.get_refreshed_mosaik_persistent_variables(),
+            )
+
+    def get_executor(self) -> cf.ThreadPoolExecutor:
+        """
+        Gets the executor running the cycles of the entities, created on first use with
+        ``max_workers`` threads or one per entity, as the cycles mostly wait on I/O.
+
+        :return: the executor, shut down on finalize
+        :rtype: cf.ThreadPoolExecutor
+        """
+        if self.executor is None:
+            self.executor = cf.ThreadPoolExecutor(
+                max_workers=self.max_workers or max(1, len(self.modbus_manager)),
+                thread_name_prefix="modbus-cycle",
+            )
+        return self.executor
+
     async def fetch_entity_data_async(
-        self, mapping_manager: MappingManager, vars: dict[str, Any]
+        self,
+        mapping_manager: MappingManager,
+        vars: dict[str, Any],
+        limit: asyncio.Semaphore | None = None,
     ) -> dict[str, Any]:
-        return await self.loop.run_in_executor(
-            None, ModbusSimInterface.fetch_entity_data, mapping_manager, vars
-        )
+        # waits for a free slot of the host before occupying a thread
+        async with limit if limit is not None else nullcontext():
+            return await self.loop.run_in_executor(
+                self.get_executor(),
+                ModbusSimInterface.fetch_entity_data,
+                mapping_manager,
+                vars,
+            )
 
     @classmethod
-    def fetch_entity_data(
-        cls, mapping_manager: MappingManager, vars: dict[str, Any]
+    async def fetch_entity_data_native(
+        cls,
+        mapping_manager: MappingManager,
+        vars: dict[str, Any],
+        limit: asyncio.Semaphore | None = None,
     ) -> dict[str, Any]:
-        mapping_manager.update_variable_buffer(vars)
-        mapping_manager.write_phase()  # Writes to hardware registers
+        async with limit if limit is not None else nullcontext():
+            mapping_manager.update_variable_buffer(vars)
+            # all entities share the event loop, no executor threads are involved
+            await mapping_manager.read_write_phase_async()
+            return mapping_manager.get_all_mosaik_persistent_variables()
 
-        mapping_manager.read_phase()  # Reads from hardware registers
-        return mapping_manager.get_all_mosaik_persistent_variables()
+    @classmethod
+    def fetch_entity_data(
+        cls,
+        mapping_manager: MappingManager,
+        vars: dict[str, Any],
+        limit: threading.Semaphore | None = None,
+    ) -> dict[str, Any]:
+        with limit if limit is not None else nullcontext():
+            mapping_manager.update_variable_buffer(vars)
+            # Writes to and afterwards reads from hardware registers
+            mapping_manager.read_write_phase()
+            return mapping_manager.get_all_mosaik_persistent_variables()
 
     def get_data(self, outputs):
         data = {}
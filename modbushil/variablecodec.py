@@ -0,0 +1,292 @@
+import struct
+from operator import itemgetter
+from typing import Any, Callable
+
+from .datatype import DataType
+from .modbusregistertypes import ModbusRegisterTypes
+from .registerrange import RegisterRange
+
+# struct format characters by number of registers
+_SIGNED_FORMATS: dict[int, str] = {1: "h", 2: "i", 4: "q"}
+_UNSIGNED_FORMATS: dict[int, str] = {1: "H", 2: "I", 4: "Q"}
+_FLOAT_FORMATS: dict[int, str] = {2: "f", 4: "d"}
+
+
+class VariableCodec:
+    """
+    Decodes and encodes the value of a variable directly from and to the raw bytes of a :class:`RegisterImage`.
+
+    Everything depending on the data type, the register length and the byte and word order is resolved
+    once on construction, so decoding is a single ``unpack_from`` on the image for the common register
+    lengths. Values are encoded with the same precompiled struct, integers wrap around to the register
+    width like in :mod:`registerhelpers`.
+
+    The byte order is the order of the two bytes within each register, the word order the order of the
+    registers of a multi-register value. As the image stores registers little-endian, the default word
+    order little with byte order big and the word order big with byte order little map directly to a
+    struct. For the two remaining combinations the registers are reversed in addition.
+
+    With a count, the variable is an array of count values of the data type stored back to back, which
+    is decoded into a list with a single struct as well.
+
+    The data type bits takes the (first bit, number of bits) of a field within the unsigned register
+    value. A single bit is decoded as bool, wider fields as int. Encoding only replaces the field.
+    """
+
+    def __init__(
+        self,
+        data_type: DataType,
+        register: RegisterRange,
+        byte_order: str = "big",
+        word_order: str = "little",
+        count: int | None = None,
+        bits: tuple[int, int] | None = None,
+    ):
+        self.data_type: DataType = data_type
+        self.register: RegisterRange = register
+        self.byte_order: str = byte_order
+        self.word_order: str = word_order
+        self.count: int | None = count
+        if byte_order not in ("big", "little"):
+            raise ValueError(f"Invalid byte order: {byte_order}")
+        if word_order not in ("big", "little"):
+            raise ValueError(f"Invalid word order: {word_order}")
+
+        is_discrete = register.type in (
+            ModbusRegisterTypes.COIL,
+            ModbusRegisterTypes.DISCRETE_INPUT,
+        )
+        if (data_type == DataType.bool) != is_discrete:
+            raise ValueError(
+                f"Data type {data_type.value} can not be mapped to {register.type.name}"
+            )
+
+        elements = 1 if count is None else count
+        if elements < 1 or register.length % elements != 0:
+            raise ValueError(
+                f"Register length {register.length} does not fit {elements} array elements"
+            )
+        element_length = register.length // elements
+
+        self.size: int
+        # kind of value: "b" bool, "i" signed, "u" unsigned integer or "f" float
+        self.kind: str
+        # positions of the value bytes relative to the offset, least significant
+        # byte first, for decoders working on the raw image
+        self.byte_positions: tuple[int, ...]
+        self.decode_from: Callable[[Any, int], Any]
+        self.encode_into: Callable[[bytearray, int, Any], bool]
+
+        if data_type == DataType.bits:
+            if bits is None or count is not None:
+                raise ValueError("Bit fields require a bit range and can not be arrays")
+            first, width = bits
+            if first + width > 16 * register.length:
+                raise ValueError(
+                    f"Bit range {first}-{first + width - 1} exceeds {register.length} registers"
+                )
+            self.word_codec: VariableCodec = VariableCodec(
+                DataType.uint64, register, byte_order, word_order
+            )
+            self.bit_shift: int = first
+            self.bit_mask: int = (1 << width) - 1
+            self.size = self.word_codec.size
+            self.kind = "b" if width == 1 else "u"
+            self.byte_positions = self.word_codec.byte_positions
+            self.decode_from = (
+                self._decode_flag if width == 1 else self._decode_bit_field
+            )
+            self.encode_into = self._encode_bit_field
+            return
+
+        if data_type == DataType.bool:
+            self.kind = "b"
+            if count is None:
+                # only the first discrete of the range is used
+                self.size = 1
+                self.decode_from = self._decode_bool
+                self.encode_into = self._encode_bool
+            else:
+                self.size = count
+                self.decode_from = self._decode_bool_array
+                self.encode_into = self._encode_bool_array
+            self.byte_positions = tuple(range(self.size))
+            return
+
+        self.size = 2 * register.length
+        self._mask: int = (1 << (16 * element_length)) - 1
+        # byte order of the value bytes in the image, after reversing the registers
+        # of each element if required
+        self._endian: str = "little" if byte_order == "big" else "big"
+        self._reverse_words: bool = element_length > 1 and byte_order == word_order
+        self._words: struct.Struct = struct.Struct(f"={register.length}H")
+        prefix = "<" if self._endian == "little" else ">"
+        repeat = "" if count is None else str(count)
+
+        words = range(element_length)
+        if self._reverse_words:
+            words = words[::-1]
+        self._word_order: Callable[[Any], Any] = itemgetter(
+            *(e * element_length + w for e in range(elements) for w in words)
+        )
+        positions = tuple(p for w in words for p in (2 * w, 2 * w + 1))
+        if self._endian == "big":
+            positions = positions[::-1]
+        self.byte_positions = tuple(
+            2 * element_length * e + p for e in range(elements) for p in positions
+        )
+
+        if data_type in (DataType.float32, DataType.float64):
+            if element_length not in _FLOAT_FORMATS:
+                raise ValueError(
+                    f"Floating point values require 2 or 4 registers, got {element_length}"
+                )
+            self.kind = "f"
+            self._struct: struct.Struct = struct.Struct(
+                prefix + repeat + _FLOAT_FORMATS[element_length]
+            )
+            self._decode_struct: struct.Struct = self._struct
+            if count is not None:
+                self.decode_from = self._decode_array
+                self.encode_into = self._encode_float_array
+            elif self._reverse_words:
+                self.decode_from = self._decode_reversed
+                self.encode_into = self._encode_float_reversed
+            else:
+                self.decode_from = self._decode_with_struct
+                self.encode_into = self._encode_float
+            return
+
+        self._signed: bool = data_type in (
+            DataType.int16,
+            DataType.int32,
+            DataType.int64,
+        )
+        self.kind = "i" if self._signed else "u"
+        if element_length in _UNSIGNED_FORMATS:
+            # encode through the unsigned format, so out of range values wrap around
+            self._struct = struct.Struct(
+                prefix + repeat + _UNSIGNED_FORMATS[element_length]
+            )
+            self._decode_struct = struct.Struct(
+                prefix
+                + repeat
+                + (_SIGNED_FORMATS if self._signed else _UNSIGNED_FORMATS)[
+                    element_length
+                ]
+            )
+            if count is not None:
+                self.decode_from = self._decode_array
+                self.encode_into = self._encode_int_array
+            elif self._reverse_words:
+                self.decode_from = self._decode_reversed
+                self.encode_into = self._encode_int_reversed
+            else:
+                self.decode_from = self._decode_with_struct
+                self.encode_into = self._encode_int
+        elif count is not None:
+            raise ValueError(
+                f"Array elements of {element_length} registers are not supported"
+            )
+        else:
+            # no struct format for this width
+            self.decode_from = self._decode_int_bytes
+            self.encode_into = self._encode_int_bytes
+
+    def _decode_with_struct(self, buffer: Any, offset: int) -> Any:
+        return self._decode_struct.unpack_from(buffer, offset)[0]
+
+    def _decode_reversed(self, buffer: Any, offset: int) -> Any:
+        words = self._word_order(self._words.unpack_from(buffer, offset))
+        return self._decode_struct.unpack(self._words.pack(*words))[0]
+
+    def _decode_array(self, buffer: Any, offset: int) -> list[Any]:
+        if self._reverse_words:
+            words = self._word_order(self._words.unpack_from(buffer, offset))
+            return list(self._decode_struct.unpack(self._words.pack(*words)))
+        return list(self._decode_struct.unpack_from(buffer, offset))
+
+    def _decode_int_bytes(self, buffer: Any, offset: int) -> int:
+        raw = bytes(buffer[offset : offset + self.size])
+        if self._reverse_words:
+            raw = self._reverse(raw)
+        return int.from_bytes(raw, self._endian, signed=self._signed)
+
+    def _decode_bool(self, buffer: Any, offset: int) -> bool:
+        return buffer[offset] != 0
+
+    def _decode_bool_array(self, buffer: Any, offset: int) -> list[bool]:
+        return [value != 0 for value in buffer[offset : offset + self.size]]
+
+    def _decode_flag(self, buffer: Any, offset: int) -> bool:
+        return (self.word_codec.decode_from(buffer, offset) >> self.bit_shift) & 1 != 0
+
+    def _decode_bit_field(self, buffer: Any, offset: int) -> int:
+        word = self.word_codec.decode_from(buffer, offset)
+        return (word >> self.bit_shift) & self.bit_mask
+
+    def _encode_bit_field(self, buffer: bytearray, offset: int, value: Any) -> bool:
+        word = self.word_codec.decode_from(buffer, offset)
+        word &= ~(self.bit_mask << self.bit_shift)
+        word |= (int(value) & self.bit_mask) << self.bit_shift
+        return self.word_codec.encode_into(buffer, offset, word)
+
+    def _encode_int(self, buffer: bytearray, offset: int, value: Any) -> bool:
+        masked = int(value) & self._mask
+        if self._struct.unpack_from(buffer, offset)[0] == masked:
+            return False
+        self._struct.pack_into(buffer, offset, masked)
+        return True
+
+    def _encode_float(self, buffer: bytearray, offset: int, value: Any) -> bool:
+        return self._store(buffer, offset, self._struct.pack(float(value)))
+
+    def _encode_int_reversed(self, buffer: bytearray, offset: int, value: Any) -> bool:
+        packed = self._struct.pack(int(value) & self._mask)
+        return self._store(buffer, offset, self._reverse(packed))
+
+    def _encode_float_reversed(
+        self, buffer: bytearray, offset: int, value: Any
+    ) -> bool:
+        packed = self._struct.pack(float(value))
+        return self._store(buffer, offset, self._reverse(packed))
+
+    def _encode_int_array(self, buffer: bytearray, offset: int, value: Any) -> bool:
+        packed = self._struct.pack(*[int(v) & self._mask for v in value])
+        if self._reverse_words:
+            packed = self._reverse(packed)
+        return self._store(buffer, offset, packed)
+
+    def _encode_float_array(self, buffer: bytearray, offset: int, value: Any) -> bool:
+        packed = self._struct.pack(*map(float, value))
+        if self._reverse_words:
+            packed = self._reverse(packed)
+        return self._store(buffer, offset, packed)
+
+    def _encode_int_bytes(self, buffer: bytearray, offset: int, value: Any) -> bool:
+        raw = (int(value) & self._mask).to_bytes(self.size, self._endian)
+        if self._reverse_words:
+            raw = self._reverse(raw)
+        return self._store(buffer, offset, raw)
+
+    def _encode_bool(self, buffer: bytearray, offset: int, value: Any) -> bool:
+        return self._store(buffer, offset, b"\x01" if value else b"\x00")
+
+    def _encode_bool_array(self, buffer: bytearray, offset: int, value: Any) -> bool:
+        return self._store(buffer, offset, bytes(map(bool, value)))
+
+    def _reverse(self, raw: bytes) -> bytes:
+        """
+        Reverses the order of the registers of each value in raw.
+        """
+        return self._words.pack(*self._word_order(self._words.unpack(raw)))
+
+    @staticmethod
+    def _store(buffer: bytearray, offset: int, packed: bytes) -> bool:
+        """
+        Stores the packed value, returns whether the buffer changed.
+        """
+        if buffer.startswith(packed, offset):
+            return False
+        buffer[offset : offset + len(packed)] = packed
+        return True
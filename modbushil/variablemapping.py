@@ -3,6 +3,7 @@ from typing import Any
 from .datatype import DataType
 from .iotype import IOType
 from .registerrange import RegisterRange
+from .variablecodec import VariableCodec
 
 
 class VariableMapping:
@@ -10,8 +11,12 @@ class VariableMapping:
         self.io_type: IOType = IOType.from_string(var_config["iotype"])
 
         self.data_type: DataType | None = None
+        # number of elements of array variables like "float32[96]", None for scalars
+        self.count: int | None = None
         if "datatype" in var_config:
-            self.data_type = DataType.from_string(var_config["datatype"])
+            self.data_type, self.count = DataType.from_array_string(
+                var_config["datatype"]
+            )
 
         self.register: RegisterRange | None = None
         if "register" in var_config:
@@ -23,6 +28,47 @@ class VariableMapping:
                 var_config["register"],
                 reg_type_override=None,
             )
+            if self.count is not None:
+                # arrays are given by their first register or their whole block
+                assert self.data_type is not None
+                block_length = self.count * self.data_type.register_count()
+                if self.register.length == 1:
+                    self.register = RegisterRange(
+                        self.register.start, block_length, self.register.type
+                    )
+                elif self.register.length != block_length:
+                    raise ValueError(
+                        f"Register range {var_config['register']} does not match the {block_length} registers of {var_config['datatype']}"
+                    )
+
+        # (first bit, number of bits) of bit field variables, the bit numbers count
+        # from the least significant bit of the register value
+        self.bits: tuple[int, int] | None = None
+        if "bit" in var_config:
+            if self.data_type != DataType.bits:
+                raise ValueError("'bit' requires the datatype 'bits'.")
+            self.bits = VariableMapping.parse_bits(var_config["bit"])
+        elif self.data_type == DataType.bits:
+            raise ValueError("The datatype 'bits' requires 'bit'.")
+
+        # order of the bytes within a register and of the registers within a value
+        self.byte_order: str = "big"
+        if "byteorder" in var_config:
+            self.byte_order = str(var_config["byteorder"]).lower()
+        self.word_order: str = "little"
+        if "wordorder" in var_config:
+            self.word_order = str(var_config["wordorder"]).lower()
+
+        self.codec: VariableCodec | None = None
+        if self.register is not None and self.data_type is not None:
+            self.codec = VariableCodec(
+                self.data_type,
+                self.register,
+                self.byte_order,
+                self.word_order,
+                self.count,
+                self.bits,
+            )
 
         self.mosaik: bool = False
         if "mosaik" in var_config:
@@ -30,4 +76,28 @@ class VariableMapping:
 
         self.scale: float | None = None
         if "scale" in var_config:
+            if self.data_type == DataType.bits:
+                raise ValueError("'scale' can not be used with the datatype 'bits'.")
             self.scale = float(var_config["scale"])
+
+    @staticmethod
+    def parse_bits(bit: int | str) -> tuple[int, int]:
+        """
+        Parses a bit number like ``3`` or an inclusive bit range like ``"4-7"``.
+
+        :param bit: the bit number or range
+        :type bit: int | str
+        :return: the first bit and the number of bits
+        :rtype: tuple[int, int]
+        """
+        parts = str(bit).split("-")
+        if len(parts) not in (1, 2):
+            raise ValueError(f"Invalid bit range: {bit}")
+        try:
+            first = int(parts[0])
+            last = int(parts[-1])
+        except ValueError:
+            raise ValueError(f"Invalid bit range: {bit}")
+        if first < 0 or last < first:
+            raise ValueError(f"Invalid bit range: {bit}")
+        return first, last - first + 1
@@ -0,0 +1,162 @@
+from typing import Any
+
+from .iotype import IOType
+from .modbusregistertypes import ModbusRegisterTypes
+from .registerimage import RegisterImage
+from .requestplanner import RequestPlan
+from .variablecodec import VariableCodec
+from .variablemapping import VariableMapping
+from .variableslots import VariableSlots
+
+# variable slot, codec and byte offset in the read image
+ReadEntry = tuple[int, VariableCodec, int]
+ScaledReadEntry = tuple[int, VariableCodec, int, float]
+# variable slot, codec, byte offset in the write image, start of the write range
+# and span (offset, length) within it
+WriteEntry = tuple[int, VariableCodec, int, int, tuple[int, int]]
+ScaledWriteEntry = tuple[int, VariableCodec, int, int, tuple[int, int], float]
+# codec of the register value, byte offset, (slot, mask) of single bits and
+# (slot, shift, mask) of wider fields
+BitFieldGroup = tuple[
+    VariableCodec,
+    int,
+    tuple[tuple[int, int], ...],
+    tuple[tuple[int, int, int], ...],
+]
+
+
+class VariablePlan:
+    """
+    Immutable plan of the variables decoded from and encoded into the register images on every step,
+    built once per model and shared by all of its entities.
+
+    The entries are flat tuples of the variable slots grouped by register type, so an entity looks up its image once per
+    register type and then runs through the entries without any further checks. Variables are split by
+    kind and by whether they are scaled, which makes every loop free of branches. The byte offsets are
+    the same for every entity, as their images are all laid out from the same :class:`RequestPlan`.
+    """
+
+    def __init__(
+        self,
+        variables: dict[str, VariableMapping],
+        slots: VariableSlots,
+        request_plan: RequestPlan,
+    ):
+        read_images = {
+            reg_type: RegisterImage(reg_type, request_plan.read_ranges[reg_type])
+            for reg_type in ModbusRegisterTypes
+        }
+        write_images = {
+            reg_type: RegisterImage(reg_type, request_plan.write_ranges[reg_type])
+            for reg_type in ModbusRegisterTypes
+        }
+
+        reads: dict[ModbusRegisterTypes, list[Any]] = {}
+        scaled_reads: dict[ModbusRegisterTypes, list[Any]] = {}
+        array_reads: dict[ModbusRegisterTypes, list[Any]] = {}
+        scaled_array_reads: dict[ModbusRegisterTypes, list[Any]] = {}
+        writes: dict[ModbusRegisterTypes, list[Any]] = {}
+        scaled_writes: dict[ModbusRegisterTypes, list[Any]] = {}
+        array_writes: dict[ModbusRegisterTypes, list[Any]] = {}
+        scaled_array_writes: dict[ModbusRegisterTypes, list[Any]] = {}
+        # fields of the same register value, which is decoded once for all of them
+        bit_fields: dict[
+            tuple[ModbusRegisterTypes, int, int, str, str],
+            tuple[VariableCodec, list[tuple[int, int]], list[tuple[int, int, int]]],
+        ] = {}
+
+        for var_name, var in variables.items():
+            if var.register is None or var.codec is None:
+                continue
+            reg_type = var.register.type
+            slot = slots[var_name]
+
+            if var.io_type in (IOType.READ, IOType.BOTH):
+                _, offset = read_images[reg_type].locate(
+                    var.register.start, var.register.length
+                )
+                if var.bits is not None:
+                    key = (
+                        reg_type,
+                        offset,
+                        var.codec.size,
+                        var.byte_order,
+                        var.word_order,
+                    )
+                    if key not in bit_fields:
+                        bit_fields[key] = (var.codec.word_codec, [], [])
+                    _, flags, fields = bit_fields[key]
+                    if var.codec.bit_mask == 1:
+                        flags.append((slot, 1 << var.codec.bit_shift))
+                    else:
+                        fields.append(
+                            (slot, var.codec.bit_shift, var.codec.bit_mask)
+                        )
+                elif var.scale is None:
+                    (reads if var.count is None else array_reads).setdefault(
+                        reg_type, []
+                    ).append((slot, var.codec, offset))
+                else:
+                    (
+                        scaled_reads if var.count is None else scaled_array_reads
+                    ).setdefault(reg_type, []).append(
+                        (slot, var.codec, offset, var.scale)
+                    )
+
+            if var.io_type in (IOType.WRITE, IOType.BOTH):
+                range_start, offset = write_images[reg_type].locate(
+                    var.register.start, var.register.length
+                )
+                span = (var.register.start - range_start, var.register.length)
+                if var.scale is None:
+                    (writes if var.count is None else array_writes).setdefault(
+                        reg_type, []
+                    ).append((slot, var.codec, offset, range_start, span))
+                else:
+                    (
+                        scaled_writes if var.count is None else scaled_array_writes
+                    ).setdefault(reg_type, []).append(
+                        (slot, var.codec, offset, range_start, span, var.scale)
+                    )
+
+        self.reads: tuple[
+            tuple[ModbusRegisterTypes, tuple[ReadEntry, ...]], ...
+        ] = VariablePlan._freeze(reads)
+        self.scaled_reads: tuple[
+            tuple[ModbusRegisterTypes, tuple[ScaledReadEntry, ...]], ...
+        ] = VariablePlan._freeze(scaled_reads)
+        self.array_reads: tuple[
+            tuple[ModbusRegisterTypes, tuple[ReadEntry, ...]], ...
+        ] = VariablePlan._freeze(array_reads)
+        self.scaled_array_reads: tuple[
+            tuple[ModbusRegisterTypes, tuple[ScaledReadEntry, ...]], ...
+        ] = VariablePlan._freeze(scaled_array_reads)
+        self.writes: tuple[
+            tuple[ModbusRegisterTypes, tuple[WriteEntry, ...]], ...
+        ] = VariablePlan._freeze(writes)
+        self.scaled_writes: tuple[
+            tuple[ModbusRegisterTypes, tuple[ScaledWriteEntry, ...]], ...
+        ] = VariablePlan._freeze(scaled_writes)
+        self.array_writes: tuple[
+            tuple[ModbusRegisterTypes, tuple[WriteEntry, ...]], ...
+        ] = VariablePlan._freeze(array_writes)
+        self.scaled_array_writes: tuple[
+            tuple[ModbusRegisterTypes, tuple[ScaledWriteEntry, ...]], ...
+        ] = VariablePlan._freeze(scaled_array_writes)
+
+        bit_field_groups: dict[ModbusRegisterTypes, list[BitFieldGroup]] = {}
+        for (reg_type, offset, *_), (word_codec, flags, fields) in bit_fields.items():
+            bit_field_groups.setdefault(reg_type, []).append(
+                (word_codec, offset, tuple(flags), tuple(fields))
+            )
+        self.bit_field_groups: tuple[
+            tuple[ModbusRegisterTypes, tuple[BitFieldGroup, ...]], ...
+        ] = VariablePlan._freeze(bit_field_groups)
+
+    @staticmethod
+    def _freeze(
+        grouped: dict[ModbusRegisterTypes, list[Any]],
+    ) -> tuple[tuple[ModbusRegisterTypes, tuple[Any, ...]], ...]:
+        return tuple(
+            (reg_type, tuple(entries)) for reg_type, entries in grouped.items()
+        )
@@ -0,0 +1,53 @@
+from typing import Any, Iterable
+
+class _Unset:
+    def __repr__(self) -> str:
+        return "UNSET"
+
+    def __bool__(self) -> bool:
+        # would otherwise encode as True, e.g. switching on a coil that has no value yet
+        raise TypeError("Unset variables have no truth value")
+
+
+# value of the variables which have not been set yet
+UNSET: Any = _Unset()
+
+
+class VariableSlots:
+    """
+    Numbering of all variables of a model, built once with its settings and shared by all entities.
+
+    Every entity stores its variables in a list of :func:`len` values, indexed by these slots instead of
+    by name. Codecs and methods resolve their variables to slots once, so a step only indexes lists.
+    Variables without a value hold :data:`UNSET`.
+    """
+
+    def __init__(self, names: Iterable[str]):
+        self.names: tuple[str, ...] = tuple(dict.fromkeys(names))
+        self.index: dict[str, int] = {name: i for i, name in enumerate(self.names)}
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __getitem__(self, name: str) -> int:
+        """
+        Gets the slot of a variable.
+
+        :param name: the name of the variable
+        :type name: str
+        :return: the slot of the variable
+        :rtype: int
+        """
+        try:
+            return self.index[name]
+        except KeyError:
+            raise ValueError(f"Unknown variable: {name}") from None
+
+    def create_buffer(self) -> list[Any]:
+        """
+        Creates the variable buffer of an entity, with all variables unset.
+
+        :return: one value per slot
+        :rtype: list[Any]
+        """
+        return [UNSET] * len(self.names)
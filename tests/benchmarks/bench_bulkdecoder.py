@@ -0,0 +1,62 @@
+"""
+Compares decoding a 10k-register map one variable at a time with the NumPy bulk decoder.
+
+Run from the repository root with ``python -m tests.benchmarks.bench_bulkdecoder``, requires NumPy.
+"""
+
+import timeit
+from unittest.mock import MagicMock
+
+from modbushil.mappingmanager import MappingManager
+from modbushil.modbusintegrationsettings import ModbusIntegrationSettings
+
+REGISTER_COUNT = 10_000
+NUMBER = 50
+
+
+def create_manager(vectorized_decode: bool) -> MappingManager:
+    # cell voltages as float32, alternating with scaled int16 temperatures
+    variables = {}
+    for address in range(0, REGISTER_COUNT, 3):
+        if address + 2 >= REGISTER_COUNT:
+            break
+        variables[f"voltage_{address}"] = {
+            "iotype": "read",
+            "datatype": "float32",
+            "register": f"i{address}-{address + 1}",
+        }
+        variables[f"temperature_{address}"] = {
+            "iotype": "read",
+            "datatype": "int16",
+            "register": f"i{address + 2}",
+            "scale": 0.1,
+        }
+    config = {
+        "modbus_io_bundles": "auto",
+        "vectorized_decode": vectorized_decode,
+        "variables": variables,
+    }
+    return MappingManager(
+        ModbusIntegrationSettings(config), "localhost", 502, modbus_client=MagicMock()
+    )
+
+
+def main():
+    scalar = create_manager(vectorized_decode=False)
+    vectorized = create_manager(vectorized_decode=True)
+    print(f"{len(scalar.slots)} variables on {REGISTER_COUNT} registers")
+    # decode all variables as if every bundle had just been read
+    for manager in (scalar, vectorized):
+        manager.modbus_manager.refreshed_intervals = set(manager.read_plans)
+
+    scalar_time = timeit.timeit(scalar._decode_read_variables, number=NUMBER) / NUMBER
+    vectorized_time = (
+        timeit.timeit(vectorized._decode_read_variables, number=NUMBER) / NUMBER
+    )
+    print(f"scalar:     {scalar_time * 1e3:8.2f} ms per step")
+    print(f"vectorized: {vectorized_time * 1e3:8.2f} ms per step")
+    print(f"speedup:    {scalar_time / vectorized_time:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
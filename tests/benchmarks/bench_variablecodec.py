@@ -0,0 +1,85 @@
+"""
+Compares the precompiled variable codecs with the register helpers they replace.
+
+Run from the repository root with ``python -m tests.benchmarks.bench_variablecodec``.
+"""
+
+import timeit
+
+import modbushil.registerhelpers as rh
+from modbushil.datatype import DataType
+from modbushil.modbusclientmanager import ModbusClientManager
+from modbushil.modbusiobundlesconfiguration import ModbusIOBundlesConfiguration
+from modbushil.modbusregistertypes import ModbusRegisterTypes
+from modbushil.registerrange import RegisterRange
+from modbushil.variablecodec import VariableCodec
+
+NUMBER = 200_000
+
+CASES = [
+    (DataType.int16, 1),
+    (DataType.uint32, 2),
+    (DataType.int64, 4),
+    (DataType.float32, 2),
+    (DataType.float64, 4),
+]
+
+
+def main():
+    io_config = ModbusIOBundlesConfiguration(
+        {"read": {"holding_register": ["0-9"]}, "write": {"holding_register": ["0-9"]}}
+    )
+    manager = ModbusClientManager("localhost", 502, io_config, modbus_client=object())
+    manager.read_images[ModbusRegisterTypes.HOLDING_REGISTER].store(
+        0, [0x1234, 0x5678, 0x9ABC, 0x4093, 1, 2, 3, 4, 5, 6]
+    )
+
+    print(f"{'data type':<10} {'helpers':>12} {'codec':>12} {'speedup':>8}")
+    for data_type, length in CASES:
+        register = RegisterRange(0, length, ModbusRegisterTypes.HOLDING_REGISTER)
+        codec = VariableCodec(data_type, register)
+        data, offset = manager.resolve_read(register)
+        get = (
+            manager.get_float
+            if data_type in (DataType.float32, DataType.float64)
+            else manager.get_int
+        )
+
+        helpers = timeit.timeit(lambda: get(register), number=NUMBER)
+        compiled = timeit.timeit(lambda: codec.decode_from(data, offset), number=NUMBER)
+        print(
+            f"{data_type.value:<10} {helpers / NUMBER * 1e9:>9.0f} ns "
+            f"{compiled / NUMBER * 1e9:>9.0f} ns {helpers / compiled:>7.1f}x"
+        )
+
+    print()
+    print(f"{'encode':<10} {'helpers':>12} {'codec':>12} {'speedup':>8}")
+    for data_type, length in CASES:
+        register = RegisterRange(0, length, ModbusRegisterTypes.HOLDING_REGISTER)
+        codec = VariableCodec(data_type, register)
+        data, offset, _, _ = manager.resolve_write(register)
+        if data_type in (DataType.float32, DataType.float64):
+            helpers = timeit.timeit(
+                lambda: manager.set_registers(
+                    register, rh.float_to_register(12.5, length)
+                ),
+                number=NUMBER,
+            )
+        else:
+            helpers = timeit.timeit(
+                lambda: manager.set_registers(
+                    register, rh.int_to_register(-12, length)
+                ),
+                number=NUMBER,
+            )
+        compiled = timeit.timeit(
+            lambda: codec.encode_into(data, offset, 12.5), number=NUMBER
+        )
+        print(
+            f"{data_type.value:<10} {helpers / NUMBER * 1e9:>9.0f} ns "
+            f"{compiled / NUMBER * 1e9:>9.0f} ns {helpers / compiled:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
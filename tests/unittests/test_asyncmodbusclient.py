@@ -0,0 +1,156 @@
+import asyncio
+import struct
+from unittest import IsolatedAsyncioTestCase
+
+from modbushil.asyncmodbusclient import AsyncModbusClient
+
+
+class FakeModbusServer:
+    """Minimal Modbus TCP server keeping 100 holding registers and 100 coils."""
+
+    def __init__(self, batch: int = 1):
+        self.registers = [0] * 100
+        self.coils = [False] * 100
+        # number of requests collected before replying to them in reverse order
+        self.batch = batch
+        self.server: asyncio.Server | None = None
+        self.port = 0
+
+    async def start(self):
+        self.server = await asyncio.start_server(self.handle, "127.0.0.1", 0)
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        assert self.server is not None
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                replies = []
+                for _ in range(self.batch):
+                    header = await reader.readexactly(7)
+                    tid, _, length, unit = struct.unpack(">HHHB", header)
+                    pdu = await reader.readexactly(length - 1)
+                    rx = self.process(pdu)
+                    replies.append(
+                        struct.pack(">HHHB", tid, 0, len(rx) + 1, unit) + rx
+                    )
+                for reply in reversed(replies):
+                    writer.write(reply)
+                await writer.drain()
+        except asyncio.IncompleteReadError:
+            writer.close()
+
+    def process(self, pdu: bytes) -> bytes:
+        fc = pdu[0]
+        if fc == 0x01:
+            addr, nb = struct.unpack_from(">HH", pdu, 1)
+            packed = bytearray((nb + 7) // 8)
+            for i in range(nb):
+                if self.coils[addr + i]:
+                    packed[i // 8] |= 1 << (i % 8)
+            return bytes([fc, len(packed)]) + packed
+        if fc == 0x03:
+            addr, nb = struct.unpack_from(">HH", pdu, 1)
+            regs = self.registers[addr : addr + nb]
+            return struct.pack(f">BB{nb}H", fc, 2 * nb, *regs)
+        if fc == 0x0F:
+            addr, nb = struct.unpack_from(">HH", pdu, 1)
+            for i in range(nb):
+                self.coils[addr + i] = bool(pdu[6 + i // 8] >> (i % 8) & 1)
+            return pdu[:5]
+        if fc == 0x10:
+            addr, nb = struct.unpack_from(">HH", pdu, 1)
+            self.registers[addr : addr + nb] = struct.unpack_from(f">{nb}H", pdu, 6)
+            return pdu[:5]
+        if fc == 0x17:
+            r_addr, r_nb, w_addr, w_nb = struct.unpack_from(">HHHH", pdu, 1)
+            self.registers[w_addr : w_addr + w_nb] = struct.unpack_from(
+                f">{w_nb}H", pdu, 10
+            )
+            regs = self.registers[r_addr : r_addr + r_nb]
+            return struct.pack(f">BB{r_nb}H", fc, 2 * r_nb, *regs)
+        return bytes([fc | 0x80, 0x01])
+
+
+class TestAsyncModbusClient(IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.server = FakeModbusServer()
+        await self.server.start()
+        self.client = AsyncModbusClient("127.0.0.1", self.server.port, timeout=1.0)
+
+    async def asyncTearDown(self):
+        await self.client.close()
+        await self.server.stop()
+
+    async def test_write_and_read_registers(self):
+        self.assertTrue(await self.client.write_multiple_registers(10, [1, 2, 0xFFFF]))
+        self.assertEqual(
+            await self.client.read_holding_registers(9, 5), [0, 1, 2, 0xFFFF, 0]
+        )
+
+    async def test_write_and_read_coils(self):
+        values = [True, False, True] + [False] * 6 + [True]
+        self.assertTrue(await self.client.write_multiple_coils(3, values))
+        self.assertEqual(await self.client.read_coils(3, 10), values)
+
+    async def test_write_read_multiple_registers(self):
+        self.server.registers[0:2] = [7, 8]
+        self.assertEqual(
+            await self.client.write_read_multiple_registers(20, [5], 0, 2), [7, 8]
+        )
+        self.assertEqual(self.server.registers[20], 5)
+
+    async def test_exception_response_returns_none(self):
+        self.assertIsNone(await self.client.read_input_registers(0, 1))
+        self.assertIn("exception 1", self.client.last_error)
+
+    async def test_connection_failure_returns_none(self):
+        await self.server.stop()
+        client = AsyncModbusClient("127.0.0.1", self.server.port, timeout=1.0)
+        self.assertIsNone(await client.read_holding_registers(0, 1))
+        self.assertFalse(client.is_open)
+        self.server = FakeModbusServer()
+        await self.server.start()
+
+    async def test_frame_without_pdu_closes_connection(self):
+        async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+            header = await reader.readexactly(7)
+            tid, _, length, unit = struct.unpack(">HHHB", header)
+            await reader.readexactly(length - 1)
+            # the MBAP length does not even cover the unit ID
+            writer.write(struct.pack(">HHHB", tid, 0, 0, unit))
+            await writer.drain()
+
+        server = await asyncio.start_server(handle, "127.0.0.1", 0)
+        client = AsyncModbusClient(
+            "127.0.0.1", server.sockets[0].getsockname()[1], timeout=5.0
+        )
+
+        start = asyncio.get_running_loop().time()
+        self.assertIsNone(await client.read_holding_registers(0, 1))
+        self.assertLess(asyncio.get_running_loop().time() - start, 1.0)
+        self.assertFalse(client.is_open)
+        server.close()
+        await server.wait_closed()
+
+    async def test_pipelined_requests_are_matched_by_transaction_id(self):
+        server = FakeModbusServer(batch=3)
+        server.registers[0:3] = [10, 20, 30]
+        await server.start()
+        client = AsyncModbusClient(
+            "127.0.0.1", server.port, timeout=1.0, max_outstanding=3
+        )
+
+        # the server only replies once all three requests are outstanding
+        results = await asyncio.gather(
+            client.read_holding_registers(0, 1),
+            client.read_holding_registers(1, 1),
+            client.read_holding_registers(2, 1),
+        )
+
+        self.assertEqual(results, [[10], [20], [30]])
+        await client.close()
+        await server.stop()
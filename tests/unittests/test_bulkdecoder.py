@@ -0,0 +1,80 @@
+from unittest import TestCase, skipUnless
+from unittest.mock import MagicMock
+
+from modbushil.bulkdecoder import BulkDecoder
+from modbushil.mappingmanager import MappingManager
+from modbushil.modbusintegrationsettings import ModbusIntegrationSettings
+from modbushil.modbusiobundlesconfiguration import EVERY_STEP
+
+
+def create_manager(vectorized_decode: bool) -> MappingManager:
+    config = {
+        "modbus_io_bundles": "auto",
+        "vectorized_decode": vectorized_decode,
+        "variables": {
+            "int16": {"iotype": "read", "datatype": "int16", "register": "i0"},
+            "uint16": {"iotype": "read", "datatype": "uint16", "register": "i1"},
+            "int32": {
+                "iotype": "read",
+                "datatype": "int32",
+                "register": "i2-3",
+                "scale": 0.1,
+            },
+            "uint32": {
+                "iotype": "read",
+                "datatype": "uint32",
+                "register": "i4-5",
+                "wordorder": "big",
+            },
+            "float32": {
+                "iotype": "read",
+                "datatype": "float32",
+                "register": "i6-7",
+                "byteorder": "little",
+            },
+            "float64": {
+                "iotype": "read",
+                "datatype": "float64",
+                "register": "i8-11",
+                "scale": 2,
+            },
+            "int48": {"iotype": "read", "datatype": "int64", "register": "i12-14"},
+            "flag": {"iotype": "read", "datatype": "bool", "register": "d3"},
+        },
+    }
+    mock_client = MagicMock()
+    mock_client.read_input_registers.return_value = [
+        0xFFF6, 0xFFF6, 0x5678, 0x1234, 0x5678, 0x1234, 0x449A, 0x522B,
+        0xC6E7, 0x84F4, 0x4A45, 0x4093, 0xFFFE, 0xFFFF, 0xFFFF,
+    ]  # fmt: skip
+    mock_client.read_discrete_inputs.return_value = [False, False, False, True]
+    return MappingManager(
+        ModbusIntegrationSettings(config), "localhost", 502, modbus_client=mock_client
+    )
+
+
+@skipUnless(BulkDecoder.is_available(), "NumPy is not installed")
+class TestBulkDecoder(TestCase):
+    def test_matches_scalar_decoding(self):
+        scalar = create_manager(vectorized_decode=False)
+        vectorized = create_manager(vectorized_decode=True)
+        self.assertIsNone(scalar.read_plans[EVERY_STEP][1])
+        self.assertIsNotNone(vectorized.read_plans[EVERY_STEP][1])
+
+        scalar.read_phase()
+        vectorized.read_phase()
+
+        self.assertEqual(vectorized.get_variables(), scalar.get_variables())
+        for name, value in scalar.get_variables().items():
+            with self.subTest(name=name):
+                self.assertIs(type(vectorized.get_variable_value(name)), type(value))
+
+    def test_unsupported_widths_remain_scalar(self):
+        manager = create_manager(vectorized_decode=True)
+
+        bulk_decoder = manager.read_plans[EVERY_STEP][1]
+        assert bulk_decoder is not None
+        self.assertEqual(
+            [manager.slots.names[slot] for slot, *_ in bulk_decoder.remaining],
+            ["int48"],
+        )
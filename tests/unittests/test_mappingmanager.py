@@ -0,0 +1,354 @@
+from unittest import TestCase
+from unittest.mock import MagicMock
+
+from modbushil.mappingmanager import MappingManager
+from modbushil.modbusintegrationsettings import ModbusIntegrationSettings
+from modbushil.modbusregistertypes import ModbusRegisterTypes
+
+
+def create_manager(config: dict) -> tuple[MappingManager, MagicMock]:
+    mock_client = MagicMock()
+    manager = MappingManager(
+        ModbusIntegrationSettings(config), "localhost", 502, modbus_client=mock_client
+    )
+    return manager, mock_client
+
+
+class TestMappingManager(TestCase):
+    def test_read_phase_decodes_variables(self):
+        manager, mock_client = create_manager(
+            {
+                "modbus_io_bundles": {"read": {"holding_register": ["0-3"]}},
+                "variables": {
+                    "power": {
+                        "iotype": "read",
+                        "datatype": "int16",
+                        "register": "h0",
+                        "scale": 0.5,
+                    },
+                    "energy": {
+                        "iotype": "read",
+                        "datatype": "uint32",
+                        "register": "h2-3",
+                    },
+                },
+                "methods": {
+                    "read": [
+                        {
+                            "set": "double_power",
+                            "action": "eval",
+                            "expression": "$(power) * 2",
+                        }
+                    ]
+                },
+            }
+        )
+        mock_client.read_holding_registers.return_value = [0xFFF6, 0, 0x5678, 0x1234]
+
+        manager.read_phase()
+
+        self.assertEqual(manager.get_variable_value("power"), -5.0)
+        self.assertEqual(manager.get_variable_value("energy"), 0x12345678)
+        self.assertEqual(manager.get_variable_value("double_power"), -10.0)
+
+    def test_read_phase_only_decodes_refreshed_bundles(self):
+        manager, mock_client = create_manager(
+            {
+                "modbus_io_bundles": {
+                    "read": {
+                        "holding_register": ["0"],
+                        "input_register": [{"range": "0", "interval": 2}],
+                    }
+                },
+                "variables": {
+                    "power": {
+                        "iotype": "read",
+                        "datatype": "int16",
+                        "register": "h0",
+                        "mosaik": True,
+                    },
+                    "energy": {
+                        "iotype": "read",
+                        "datatype": "uint16",
+                        "register": "i0",
+                        "mosaik": True,
+                    },
+                },
+            }
+        )
+        self.assertEqual(len(manager.read_plans), 2)
+
+        values, refreshed = [], []
+        for step in range(4):
+            mock_client.read_holding_registers.return_value = [step]
+            mock_client.read_input_registers.return_value = [10 + step]
+            manager.read_phase()
+            values.append(
+                (
+                    manager.get_variable_value("power"),
+                    manager.get_variable_value("energy"),
+                )
+            )
+            refreshed.append(
+                sorted(manager.get_refreshed_mosaik_persistent_variables())
+            )
+
+        self.assertEqual(values, [(0, 10), (1, 10), (2, 12), (3, 12)])
+        self.assertEqual(
+            refreshed,
+            [["energy", "power"], ["power"], ["energy", "power"], ["power"]],
+        )
+        self.assertEqual(mock_client.read_input_registers.call_count, 2)
+
+    def test_array_variables(self):
+        manager, mock_client = create_manager(
+            {
+                "modbus_io_bundles": "auto",
+                "variables": {
+                    "temperatures": {
+                        "iotype": "read",
+                        "datatype": "int16[4]",
+                        "register": "i10",
+                        "scale": 0.5,
+                        "mosaik": True,
+                    },
+                    "limits": {
+                        "iotype": "write",
+                        "datatype": "uint16[2]",
+                        "register": "h0-1",
+                        "mosaik": True,
+                    },
+                },
+                "methods": {
+                    "read": [
+                        {
+                            "set": "max_temperature",
+                            "action": "eval",
+                            "expression": "max($(temperatures))",
+                        }
+                    ]
+                },
+            }
+        )
+        mock_client.read_input_registers.return_value = [2, 0xFFFE, 8, 4]
+
+        manager.read_phase()
+
+        mock_client.read_input_registers.assert_called_once_with(10, 4)
+        self.assertEqual(
+            manager.get_variable_value("temperatures"), [1.0, -1.0, 4.0, 2.0]
+        )
+        self.assertEqual(manager.get_variable_value("max_temperature"), 4.0)
+        self.assertEqual(
+            manager.config.get_mosaik_persistent_variables_defaults(),
+            {"temperatures": [0, 0, 0, 0]},
+        )
+
+        manager.set_variable_value("limits", [7, 9])
+        manager.write_phase()
+        mock_client.write_multiple_registers.assert_called_once_with(0, [7, 9])
+
+        manager.set_variable_value("limits", [7])
+        with self.assertRaises(ValueError):
+            manager.write_phase()
+
+    def test_write_phase_only_sends_changed_variables(self):
+        manager, mock_client = create_manager(
+            {
+                "modbus_io_bundles": {"write": {"holding_register": ["0-9"]}},
+                "variables": {
+                    "setpoint": {
+                        "iotype": "write",
+                        "datatype": "float32",
+                        "register": "h0-1",
+                        "mosaik": True,
+                    },
+                    "mode": {
+                        "iotype": "write",
+                        "datatype": "uint16",
+                        "register": "h9",
+                        "mosaik": True,
+                        "scale": 0.5,
+                    },
+                },
+                "modbus_client": {"write_merge_gap": 0},
+            }
+        )
+        manager.update_variable_buffer({"setpoint": 1.5, "mode": 1.5})
+        manager.write_phase()
+        mock_client.write_multiple_registers.assert_called_once_with(
+            0, [0, 0x3FC0, 0, 0, 0, 0, 0, 0, 0, 3]
+        )
+        mock_client.reset_mock()
+
+        manager.update_variable_buffer({"setpoint": 1.5, "mode": 2.5})
+        manager.write_phase()
+        mock_client.write_multiple_registers.assert_called_once_with(9, [5])
+
+    def test_unset_bool_coil_is_not_written(self):
+        manager, mock_client = create_manager(
+            {
+                "modbus_io_bundles": {"write": {"coil": ["0-1"]}},
+                "variables": {
+                    "enable": {
+                        "iotype": "write",
+                        "datatype": "bool",
+                        "register": "c0",
+                        "mosaik": True,
+                    },
+                },
+            }
+        )
+
+        with self.assertRaisesRegex(ValueError, "enable"):
+            manager.write_phase()
+        mock_client.write_multiple_coils.assert_not_called()
+
+    def test_bit_fields_share_one_decode(self):
+        manager, mock_client = create_manager(
+            {
+                "modbus_io_bundles": "auto",
+                "variables": {
+                    "running": {
+                        "iotype": "read",
+                        "datatype": "bits",
+                        "register": "i0",
+                        "bit": 0,
+                        "mosaik": True,
+                    },
+                    "fault": {
+                        "iotype": "read",
+                        "datatype": "bits",
+                        "register": "i0",
+                        "bit": 1,
+                    },
+                    "state": {
+                        "iotype": "read",
+                        "datatype": "bits",
+                        "register": "i0",
+                        "bit": "8-11",
+                        "mosaik": True,
+                    },
+                },
+            }
+        )
+        mock_client.read_input_registers.return_value = [0x0501]
+
+        manager.read_phase()
+
+        self.assertEqual(len(manager.plan.bit_field_groups[0][1]), 1)
+        self.assertIs(manager.get_variable_value("running"), True)
+        self.assertIs(manager.get_variable_value("fault"), False)
+        self.assertEqual(manager.get_variable_value("state"), 5)
+        self.assertEqual(
+            manager.config.get_mosaik_persistent_variables_defaults(),
+            {"running": False, "state": 0},
+        )
+
+    def test_methods_only_run_for_changed_variables(self):
+        for incremental in (True, False):
+            calls: list[float] = []
+            manager, mock_client = create_manager(
+                {
+                    "modbus_io_bundles": "auto",
+                    "variables": {
+                        "power": {
+                            "iotype": "read",
+                            "datatype": "int16",
+                            "register": "i0",
+                        },
+                    },
+                    "methods": {
+                        "incremental": incremental,
+                        "read": [
+                            {
+                                "set": "power_kw",
+                                "action": "function",
+                                "function": lambda p: calls.append(p) or p / 1000,
+                                "parameters": ["power"],
+                            }
+                        ],
+                    },
+                }
+            )
+            for power in (1000, 1000, 2000):
+                mock_client.read_input_registers.return_value = [power]
+                manager.read_phase()
+
+            with self.subTest(incremental=incremental):
+                self.assertEqual(manager.get_variable_value("power_kw"), 2.0)
+                self.assertEqual(
+                    calls, [1000, 2000] if incremental else [1000, 1000, 2000]
+                )
+
+    def test_entities_share_the_variable_plan(self):
+        settings = ModbusIntegrationSettings(
+            {
+                "modbus_io_bundles": "auto",
+                "variables": {
+                    "setpoint": {
+                        "iotype": "write",
+                        "datatype": "uint16",
+                        "register": "h0",
+                        "mosaik": True,
+                    },
+                },
+            }
+        )
+        first, second = (
+            MappingManager(settings, "localhost", 502, modbus_client=MagicMock())
+            for _ in range(2)
+        )
+        self.assertIs(first.plan, second.plan)
+
+        first.set_variable_value("setpoint", 5)
+        first.write_phase()
+        for manager, expected in ((first, [5]), (second, [0])):
+            image = manager.modbus_manager.write_images[
+                ModbusRegisterTypes.HOLDING_REGISTER
+            ]
+            self.assertEqual(image.get_registers(0, 1), expected)
+
+        with self.assertRaises(ValueError):
+            second.write_phase()
+
+    def test_slot_indexed_variable_buffer(self):
+        manager, mock_client = create_manager(
+            {
+                "modbus_io_bundles": "auto",
+                "variables": {
+                    "power": {
+                        "iotype": "read",
+                        "datatype": "int16",
+                        "register": "i0",
+                        "mosaik": True,
+                    },
+                },
+                "methods": {
+                    "read": [
+                        {
+                            "set": "power_kw",
+                            "action": "eval",
+                            "expression": "$(power) / 1000",
+                        }
+                    ]
+                },
+            }
+        )
+        self.assertEqual(len(manager.variable_buffer), 2)
+        with self.assertRaises(KeyError):
+            manager.get_variable_value("power")
+        with self.assertRaises(ValueError):
+            manager.set_variable_value("unknown", 1)
+
+        mock_client.read_input_registers.return_value = [500]
+        manager.read_phase()
+        result = manager.get_all_mosaik_persistent_variables()
+        self.assertEqual(result, {"power": 500})
+        self.assertEqual(manager.get_variables(), {"power": 500, "power_kw": 0.5})
+
+        # the same dict is updated on every step
+        mock_client.read_input_registers.return_value = [700]
+        manager.read_phase()
+        self.assertIs(manager.get_all_mosaik_persistent_variables(), result)
+        self.assertEqual(result, {"power": 700})
@@ -0,0 +1,45 @@
+from unittest import TestCase
+
+from modbushil.methodcache import MethodCache
+
+
+class TestMethodCache(TestCase):
+    def test_least_recently_used_eviction(self):
+        calls = []
+
+        def square(x):
+            calls.append(x)
+            return x * x
+
+        cache = MethodCache(square, {"size": 2})
+        results = [cache(x) for x in (1, 2, 1, 3, 2, 1)]
+
+        self.assertEqual(results, [1, 4, 1, 9, 4, 1])
+        # 2 was least recently used when 3 was added
+        self.assertEqual(calls, [1, 2, 3, 2, 1])
+        self.assertEqual((cache.hits, cache.misses), (1, 5))
+        self.assertEqual(len(cache), 2)
+
+        cache.clear()
+        self.assertEqual((cache.hits, cache.misses, len(cache)), (0, 0, 0))
+
+    def test_quantization(self):
+        calls = []
+
+        def identity(x, values):
+            calls.append(x)
+            return x, values
+
+        cache = MethodCache(identity, {"size": 8, "quantize": 0.5})
+
+        self.assertEqual(cache(1.1, [0.9]), (1.0, [1.0]))
+        self.assertEqual(cache(0.9, [1.2]), (1.0, [1.0]))
+        self.assertEqual(cache(3, [1.0]), (3, [1.0]))
+        self.assertEqual(calls, [1.0, 3])
+        self.assertEqual(cache.hits, 1)
+
+    def test_invalid_configuration(self):
+        for cache_config in ({"size": 0}, {"size": 2.5}, {"size": 1, "quantize": 0}):
+            with self.subTest(cache_config=cache_config):
+                with self.assertRaises(ValueError):
+                    MethodCache(abs, cache_config)
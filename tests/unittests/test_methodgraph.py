@@ -0,0 +1,109 @@
+from unittest import TestCase
+
+from modbushil.methodgraph import MethodGraph
+from modbushil.methodinvoker import MethodInvoker
+from modbushil.variableslots import UNSET, VariableSlots
+
+
+def counting_method(
+    variable: str, parameters: list[str], calls: list[str]
+) -> MethodInvoker:
+    def function(*values):
+        calls.append(variable)
+        return sum(values)
+
+    return MethodInvoker(
+        {
+            "set": variable,
+            "action": "function",
+            "function": function,
+            "parameters": parameters,
+        }
+    )
+
+
+def create_graph(
+    methods: list[MethodInvoker], variables: list[str]
+) -> tuple[MethodGraph, VariableSlots]:
+    slots = VariableSlots(variables + [method.variable for method in methods])
+    for method in methods:
+        method.bind(slots)
+    return MethodGraph(methods), slots
+
+
+class TestMethodGraph(TestCase):
+    def test_only_downstream_methods_run(self):
+        calls: list[str] = []
+        graph, slots = create_graph(
+            [
+                counting_method("ab", ["a", "b"], calls),
+                counting_method("cd", ["c", "d"], calls),
+                counting_method("total", ["ab", "cd"], calls),
+            ],
+            ["a", "b", "c", "d"],
+        )
+        state = graph.create_state()
+        buffer = slots.create_buffer()
+        buffer[:4] = [1, 2, 3, 4]
+
+        graph.evaluate(buffer, state)
+        self.assertEqual(calls, ["ab", "cd", "total"])
+        self.assertEqual(buffer[slots["total"]], 10)
+
+        calls.clear()
+        graph.evaluate(buffer, state)
+        self.assertEqual(calls, [])
+
+        buffer[slots["c"]] = 5
+        graph.evaluate(buffer, state)
+        self.assertEqual(calls, ["cd", "total"])
+        self.assertEqual(buffer[slots["total"]], 12)
+
+        # unchanged results do not propagate
+        calls.clear()
+        buffer[slots["a"]], buffer[slots["b"]] = 2, 1
+        graph.evaluate(buffer, state)
+        self.assertEqual(calls, ["ab"])
+
+    def test_matches_full_evaluation(self):
+        configs = [
+            {"set": "x", "action": "eval", "expression": "$(a) * 2"},
+            {"set": "y", "action": "eval", "expression": "$(x) + $(b)"},
+            # overwrites an input of the first method for the next step
+            {
+                "set": "a",
+                "action": "eval",
+                "expression": "$(a) + 1 if $(b) else $(a)",
+            },
+            {"set": "z", "action": "eval", "expression": "$(a) - $(y)"},
+        ]
+        methods = [MethodInvoker(c) for c in configs]
+        graph, slots = create_graph(methods, ["a", "b"])
+        state = graph.create_state()
+        incremental = slots.create_buffer()
+        incremental[slots["a"]] = 0
+        full = list(incremental)
+
+        for step, b in enumerate([0, 0, 1, 1, 0, 0, 2, 0]):
+            incremental[slots["b"]] = full[slots["b"]] = b
+            graph.evaluate(incremental, state)
+            for method in methods:
+                full[method.slot] = method.evaluate(full)
+            with self.subTest(step=step):
+                self.assertEqual(incremental, full)
+                self.assertNotIn(UNSET, incremental)
+
+    def test_states_are_independent(self):
+        calls: list[str] = []
+        graph, slots = create_graph(
+            [counting_method("double", ["a", "a"], calls)], ["a"]
+        )
+        first, second = graph.create_state(), graph.create_state()
+
+        first_buffer, second_buffer = slots.create_buffer(), slots.create_buffer()
+        first_buffer[slots["a"]] = second_buffer[slots["a"]] = 1
+        graph.evaluate(first_buffer, first)
+        graph.evaluate(first_buffer, first)
+        graph.evaluate(second_buffer, second)
+
+        self.assertEqual(calls, ["double", "double"])
@@ -64,3 +64,59 @@ class TestMethodInvoker(TestCase):
         result = invoker.invoke(variable_buffer)
         self.assertEqual(result, 7)
 
+
+    def test_eval_keeps_float_precision(self):
+        config = {
+            "set": "result",
+            "action": "eval",
+            "expression": "$(a) - $(a) + $(b)",
+        }
+        invoker = mi.MethodInvoker(config)
+        variable_buffer = {"a": 0.1 + 0.2, "b": 1 / 3}
+        result = invoker.invoke(variable_buffer)
+        self.assertEqual(result, 1 / 3)
+        self.assertEqual(invoker.required_variables, ["a", "a", "b"])
+
+    def test_eval_missing_variable(self):
+        config = {"set": "result", "action": "eval", "expression": "$(a) + 1"}
+        invoker = mi.MethodInvoker(config)
+        with self.assertRaises(ValueError):
+            invoker.invoke({})
+
+    def test_invalid_expression_is_rejected(self):
+        config = {"set": "result", "action": "eval", "expression": "$(a) +"}
+        with self.assertRaises(ValueError):
+            mi.MethodInvoker(config)
+
+    def test_restricted_eval(self):
+        config = {
+            "set": "result",
+            "action": "eval",
+            "expression": "clamp($(a) * 2, 0, $(limit))",
+        }
+        invoker = mi.MethodInvoker(config, restricted=True)
+        variable_buffer = {"a": 3, "limit": 5}
+        result = invoker.invoke(variable_buffer)
+        self.assertEqual(result, 5)
+
+        config["expression"] = "__import__('os').getcwd()"
+        with self.assertRaises(ValueError):
+            mi.MethodInvoker(config, restricted=True)
+
+    def test_cached_function(self):
+        config = {
+            "set": "efficiency",
+            "action": "function",
+            "function": lambda p: 0.9 - p / 1000,
+            "parameters": ["p"],
+            "cache": {"size": 16, "quantize": 1.0},
+        }
+        invoker = mi.MethodInvoker(config)
+        for p in (100.2, 99.9, 150.0, 100.1):
+            invoker.invoke({"p": p})
+        assert invoker.cache is not None
+        self.assertEqual((invoker.cache.hits, invoker.cache.misses), (2, 2))
+
+        config = {"set": "x", "action": "eval", "expression": "1", "cache": {"size": 1}}
+        with self.assertRaises(ValueError):
+            mi.MethodInvoker(config)
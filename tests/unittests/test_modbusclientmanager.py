@@ -1,6 +1,8 @@
-from unittest import TestCase
-from unittest.mock import MagicMock
+from unittest import IsolatedAsyncioTestCase, TestCase
+from unittest.mock import AsyncMock, MagicMock, patch
+from modbushil.asyncmodbusclient import AsyncModbusClient
 from modbushil.modbusclientmanager import ModbusClientManager
+from modbushil.modbusclientsettings import ModbusClientSettings
 from modbushil.modbusiobundlesconfiguration import ModbusIOBundlesConfiguration
 from modbushil.modbusregistertypes import ModbusRegisterTypes
 from modbushil.registerrange import RegisterRange
@@ -67,8 +69,8 @@ class TestModbusClientManager(TestCase):
 
         mock_client.read_holding_registers.assert_called_once_with(0, 5)
         self.assertEqual(
-            manager.buffer_register_read[ModbusRegisterTypes.HOLDING_REGISTER][0],
-            [1, 2, 3, 4, 5],
+            manager.read_images[ModbusRegisterTypes.HOLDING_REGISTER].data,
+            bytes([1, 0, 2, 0, 3, 0, 4, 0, 5, 0]),
         )
 
     def test_write_holding_registers(self):
@@ -81,13 +83,10 @@ class TestModbusClientManager(TestCase):
         manager = ModbusClientManager(
             "localhost", 502, io_config, modbus_client=mock_client
         )
-        manager.buffer_register_write[ModbusRegisterTypes.HOLDING_REGISTER][10] = [
-            10,
-            20,
-            30,
-            40,
-            50,
-        ]
+        manager.set_registers(
+            RegisterRange(10, 5, ModbusRegisterTypes.HOLDING_REGISTER),
+            [10, 20, 30, 40, 50],
+        )
 
         manager.do_write()
 
@@ -98,18 +97,16 @@ class TestModbusClientManager(TestCase):
     def test_get_registers(self):
         mock_client = MagicMock()
 
-        io_config = ModbusIOBundlesConfiguration({"read": {}, "write": {}})
+        io_config = ModbusIOBundlesConfiguration(
+            {"read": {"holding_register": ["5-9"]}, "write": {}}
+        )
 
         manager = ModbusClientManager(
             "localhost", 502, io_config, modbus_client=mock_client
         )
-        manager.buffer_register_read[ModbusRegisterTypes.HOLDING_REGISTER][5] = [
-            100,
-            200,
-            300,
-            400,
-            500,
-        ]
+        manager.read_images[ModbusRegisterTypes.HOLDING_REGISTER].store(
+            5, [100, 200, 300, 400, 500]
+        )
 
         buffer = manager.get_registers(
             RegisterRange(5, 3, ModbusRegisterTypes.HOLDING_REGISTER)
@@ -135,6 +132,306 @@ class TestModbusClientManager(TestCase):
         )
 
         self.assertEqual(
-            manager.buffer_register_write[ModbusRegisterTypes.HOLDING_REGISTER][8],
+            manager.write_images[ModbusRegisterTypes.HOLDING_REGISTER].get_registers(
+                8, 4
+            ),
             [7, 14, 21, 28],
         )
+
+    def test_get_registers_uses_index(self):
+        mock_client = MagicMock()
+        mock_client.read_input_registers.side_effect = [[1, 2, 3], [4, 5, 6]]
+
+        io_config = ModbusIOBundlesConfiguration(
+            {"read": {"input_register": ["0-2", "10-12"]}, "write": {}}
+        )
+
+        manager = ModbusClientManager(
+            "localhost", 502, io_config, modbus_client=mock_client
+        )
+        self.assertEqual(
+            manager.read_images[ModbusRegisterTypes.INPUT_REGISTER].index[11], 10
+        )
+
+        manager.do_read()
+
+        self.assertEqual(
+            manager.get_registers(
+                RegisterRange(11, 2, ModbusRegisterTypes.INPUT_REGISTER)
+            ),
+            [5, 6],
+        )
+        with self.assertRaises(ValueError):
+            manager.get_registers(
+                RegisterRange(12, 2, ModbusRegisterTypes.INPUT_REGISTER)
+            )
+        with self.assertRaises(ValueError):
+            manager.get_registers(
+                RegisterRange(5, 1, ModbusRegisterTypes.INPUT_REGISTER)
+            )
+
+    def test_read_is_stored_in_place(self):
+        mock_client = MagicMock()
+        mock_client.read_holding_registers.side_effect = [[1, 2], [0xFFFF, 4]]
+
+        io_config = ModbusIOBundlesConfiguration(
+            {"read": {"holding_register": ["4-5"]}, "write": {}}
+        )
+
+        manager = ModbusClientManager(
+            "localhost", 502, io_config, modbus_client=mock_client
+        )
+        image = manager.read_images[ModbusRegisterTypes.HOLDING_REGISTER]
+        data = image.data
+        view = manager.get_view(
+            RegisterRange(4, 2, ModbusRegisterTypes.HOLDING_REGISTER)
+        )
+
+        manager.do_read()
+        self.assertEqual(view.tobytes(), bytes([1, 0, 2, 0]))
+        manager.do_read()
+        self.assertEqual(view.tobytes(), bytes([0xFF, 0xFF, 4, 0]))
+        self.assertIs(image.data, data)
+
+    def test_set_bool_on_write_only_coil(self):
+        mock_client = MagicMock()
+
+        io_config = ModbusIOBundlesConfiguration(
+            {"read": {}, "write": {"coil": ["0-3"]}}
+        )
+
+        manager = ModbusClientManager(
+            "localhost", 502, io_config, modbus_client=mock_client
+        )
+        manager.set_bool(RegisterRange(2, 1, ModbusRegisterTypes.COIL), True)
+
+        self.assertEqual(
+            manager.write_images[ModbusRegisterTypes.COIL].get_discretes(0, 4),
+            [False, False, True, False],
+        )
+
+    def test_read_write_pairs_holding_registers_with_fc23(self):
+        mock_client = MagicMock()
+        mock_client.write_read_multiple_registers.return_value = [7, 8, 9]
+
+        io_config = ModbusIOBundlesConfiguration(
+            {
+                "read": {"holding_register": ["0-2"], "coil": ["0-1"]},
+                "write": {"holding_register": ["10-11"]},
+            }
+        )
+        mock_client.read_coils.return_value = [True, False]
+
+        manager = ModbusClientManager(
+            "localhost",
+            502,
+            io_config,
+            modbus_client=mock_client,
+            client_settings=ModbusClientSettings({"use_fc23": True}),
+        )
+        manager.set_registers(
+            RegisterRange(10, 2, ModbusRegisterTypes.HOLDING_REGISTER), [1, 2]
+        )
+
+        manager.do_read_write()
+
+        mock_client.write_read_multiple_registers.assert_called_once_with(
+            10, [1, 2], 0, 3
+        )
+        mock_client.write_multiple_registers.assert_not_called()
+        mock_client.read_holding_registers.assert_not_called()
+        mock_client.read_coils.assert_called_once_with(0, 2)
+        self.assertEqual(
+            manager.get_registers(
+                RegisterRange(0, 3, ModbusRegisterTypes.HOLDING_REGISTER)
+            ),
+            [7, 8, 9],
+        )
+
+    def test_read_write_without_fc23_uses_separate_requests(self):
+        mock_client = MagicMock()
+        mock_client.read_holding_registers.return_value = [7, 8, 9]
+
+        io_config = ModbusIOBundlesConfiguration(
+            {
+                "read": {"holding_register": ["0-2"]},
+                "write": {"holding_register": ["10-11"]},
+            }
+        )
+
+        manager = ModbusClientManager(
+            "localhost", 502, io_config, modbus_client=mock_client
+        )
+
+        manager.do_read_write()
+
+        mock_client.write_read_multiple_registers.assert_not_called()
+        mock_client.write_multiple_registers.assert_called_once_with(10, [0, 0])
+        mock_client.read_holding_registers.assert_called_once_with(0, 3)
+
+    def test_write_only_sends_changed_spans(self):
+        mock_client = MagicMock()
+
+        io_config = ModbusIOBundlesConfiguration(
+            {"read": {}, "write": {"holding_register": ["0-39"]}}
+        )
+
+        manager = ModbusClientManager(
+            "localhost",
+            502,
+            io_config,
+            modbus_client=mock_client,
+            client_settings=ModbusClientSettings({"write_merge_gap": 2}),
+        )
+        manager.do_write()
+        mock_client.write_multiple_registers.assert_called_once_with(0, [0] * 40)
+        mock_client.reset_mock()
+
+        # nothing changed, so nothing is sent
+        manager.set_registers(
+            RegisterRange(5, 1, ModbusRegisterTypes.HOLDING_REGISTER), [0]
+        )
+        manager.do_write()
+        mock_client.write_multiple_registers.assert_not_called()
+
+        # spans 5 and 7-8 are merged, span 30 is sent on its own
+        manager.set_registers(
+            RegisterRange(5, 1, ModbusRegisterTypes.HOLDING_REGISTER), [1]
+        )
+        manager.set_registers(
+            RegisterRange(7, 2, ModbusRegisterTypes.HOLDING_REGISTER), [2, 3]
+        )
+        manager.set_registers(
+            RegisterRange(30, 1, ModbusRegisterTypes.HOLDING_REGISTER), [4]
+        )
+        manager.do_write()
+        self.assertEqual(
+            mock_client.write_multiple_registers.call_args_list,
+            [((5, [1, 0, 2, 3]),), ((30, [4]),)],
+        )
+
+    def test_write_full_refresh_interval(self):
+        mock_client = MagicMock()
+
+        io_config = ModbusIOBundlesConfiguration(
+            {"read": {}, "write": {"coil": ["0-3"]}}
+        )
+
+        manager = ModbusClientManager(
+            "localhost",
+            502,
+            io_config,
+            modbus_client=mock_client,
+            client_settings=ModbusClientSettings({"full_refresh_interval": 3}),
+        )
+        for _ in range(6):
+            manager.do_write()
+
+        # initial write plus the refreshes in cycle 3 and 6
+        self.assertEqual(mock_client.write_multiple_coils.call_count, 3)
+
+
+    def test_read_only_sends_due_bundles(self):
+        mock_client = MagicMock()
+        mock_client.read_holding_registers.return_value = [1, 2]
+        mock_client.read_input_registers.return_value = [3, 4]
+        mock_client.read_coils.return_value = [True]
+
+        io_config = ModbusIOBundlesConfiguration(
+            {
+                "read": {
+                    "holding_register": ["0-1"],
+                    "input_register": [{"range": "0-1", "interval": 3}],
+                    "coil": [{"range": "0", "interval": "10s"}],
+                },
+                "write": {},
+            }
+        )
+        manager = ModbusClientManager(
+            "localhost", 502, io_config, modbus_client=mock_client
+        )
+
+        with patch("modbushil.modbusclientmanager.time.monotonic") as monotonic:
+            refreshed = []
+            for now in (0.0, 1.0, 2.0, 3.0, 4.0, 10.0, 11.0):
+                monotonic.return_value = now
+                manager.do_read()
+                refreshed.append(sorted(manager.refreshed_intervals))
+
+        self.assertEqual(mock_client.read_holding_registers.call_count, 7)
+        self.assertEqual(mock_client.read_input_registers.call_count, 3)
+        self.assertEqual(mock_client.read_coils.call_count, 2)
+        self.assertEqual(refreshed[0], [(1, 0.0), (1, 10.0), (3, 0.0)])
+        self.assertEqual(refreshed[1], [(1, 0.0)])
+        self.assertEqual(refreshed[3], [(1, 0.0), (3, 0.0)])
+        self.assertEqual(refreshed[5], [(1, 0.0), (1, 10.0)])
+
+    def test_failed_read_stays_due(self):
+        mock_client = MagicMock()
+        mock_client.read_holding_registers.return_value = None
+
+        io_config = ModbusIOBundlesConfiguration(
+            {"read": {"holding_register": [{"range": "0-1", "interval": 5}]}}
+        )
+        manager = ModbusClientManager(
+            "localhost", 502, io_config, modbus_client=mock_client
+        )
+
+        with self.assertRaises(ConnectionError):
+            manager.do_read()
+        mock_client.read_holding_registers.return_value = [1, 2]
+        manager.do_read()
+
+        self.assertEqual(mock_client.read_holding_registers.call_count, 2)
+        self.assertEqual(manager.refreshed_intervals, {(5, 0.0)})
+
+class TestModbusClientManagerAsync(IsolatedAsyncioTestCase):
+    async def test_read_write_async_with_fc23(self):
+        mock_client = AsyncMock(spec=AsyncModbusClient)
+        mock_client.is_open = True
+        mock_client.write_read_multiple_registers.return_value = [7, 8, 9]
+        mock_client.write_multiple_coils.return_value = True
+
+        io_config = ModbusIOBundlesConfiguration(
+            {
+                "read": {"holding_register": ["0-2"]},
+                "write": {"holding_register": ["10-11"], "coil": ["0"]},
+            }
+        )
+
+        manager = ModbusClientManager(
+            "localhost",
+            502,
+            io_config,
+            modbus_client=mock_client,
+            client_settings=ModbusClientSettings({"use_fc23": True}),
+        )
+        self.assertTrue(manager.is_async)
+
+        await manager.do_read_write_async()
+
+        mock_client.write_multiple_coils.assert_awaited_once_with(0, [False])
+        mock_client.write_read_multiple_registers.assert_awaited_once_with(
+            10, [0, 0], 0, 3
+        )
+        self.assertEqual(
+            manager.get_registers(
+                RegisterRange(0, 3, ModbusRegisterTypes.HOLDING_REGISTER)
+            ),
+            [7, 8, 9],
+        )
+
+    async def test_failed_async_read_raises(self):
+        mock_client = AsyncMock(spec=AsyncModbusClient)
+        mock_client.is_open = True
+        mock_client.read_input_registers.return_value = None
+
+        io_config = ModbusIOBundlesConfiguration(
+            {"read": {"input_register": ["0-2"]}, "write": {}}
+        )
+        manager = ModbusClientManager(
+            "localhost", 502, io_config, modbus_client=mock_client
+        )
+
+        with self.assertRaises(ConnectionError):
+            await manager.do_read_async()
@@ -0,0 +1,127 @@
+import asyncio
+import struct
+import threading
+from unittest import IsolatedAsyncioTestCase, TestCase
+from unittest.mock import AsyncMock, MagicMock
+
+from modbushil.asyncmodbusclient import AsyncModbusClient
+from modbushil.modbusconnectionpool import (
+    ModbusConnectionPool,
+    PooledAsyncModbusClient,
+    PooledModbusClient,
+)
+
+
+class TestModbusConnectionPool(TestCase):
+    def test_devices_behind_same_host_share_connection(self):
+        pool = ModbusConnectionPool()
+
+        client1 = pool.get_client("gateway", 502, unit_id=1)
+        client2 = pool.get_client("gateway", 502, unit_id=2)
+        client3 = pool.get_client("other", 502, unit_id=1)
+
+        assert isinstance(client1, PooledModbusClient)
+        assert isinstance(client2, PooledModbusClient)
+        assert isinstance(client3, PooledModbusClient)
+        self.assertIs(client1.client, client2.client)
+        self.assertIsNot(client1.client, client3.client)
+        self.assertEqual((client1.unit_id, client2.unit_id), (1, 2))
+
+    def test_devices_are_spread_over_connections_per_host(self):
+        pool = ModbusConnectionPool(connections_per_host=2)
+
+        clients = [pool.get_client("gateway", 502, unit_id=i) for i in range(4)]
+
+        self.assertIsNot(clients[0].client, clients[1].client)
+        self.assertIs(clients[0].client, clients[2].client)
+        self.assertIs(clients[1].client, clients[3].client)
+
+    def test_close_does_not_wait_for_busy_connections(self):
+        pool = ModbusConnectionPool()
+        pool.get_client("gateway", 502, unit_id=1)
+        client, lock = pool.clients[("gateway", 502)][0]
+        client.close = MagicMock()
+
+        # held by a request to a device which does not answer
+        with lock:
+            pool.close()
+            # the lock still belongs to the request
+            self.assertTrue(lock.locked())
+
+        client.close.assert_called_once_with()
+
+    def test_request_addresses_unit_id(self):
+        shared = MagicMock()
+        shared.read_holding_registers.side_effect = lambda *_: [shared.unit_id]
+        lock = threading.Lock()
+        client1 = PooledModbusClient(shared, lock, unit_id=3)
+        client2 = PooledModbusClient(shared, lock, unit_id=7)
+
+        self.assertEqual(client1.read_holding_registers(0, 1), [3])
+        self.assertEqual(client2.read_holding_registers(0, 1), [7])
+
+    def test_native_async_pool_uses_smallest_pipeline_depth(self):
+        pool = ModbusConnectionPool(native_async=True)
+
+        client1 = pool.get_client("gateway", 502, unit_id=1, pipeline_depth=4)
+        client2 = pool.get_client("gateway", 502, unit_id=2, pipeline_depth=1)
+        client3 = pool.get_client("gateway", 502, unit_id=3, pipeline_depth=2)
+
+        assert isinstance(client1, PooledAsyncModbusClient)
+        assert isinstance(client2, PooledAsyncModbusClient)
+        assert isinstance(client3, PooledAsyncModbusClient)
+        self.assertIs(client1.client, client2.client)
+        self.assertIs(client1.client, client3.client)
+        # a device without pipelining must not receive pipelined requests
+        self.assertEqual(client1.client.max_outstanding, 1)
+
+
+class TestPooledAsyncModbusClient(IsolatedAsyncioTestCase):
+    async def test_request_addresses_unit_id(self):
+        shared = AsyncMock(spec=AsyncModbusClient)
+        shared.read_input_registers.return_value = [1]
+        client = PooledAsyncModbusClient(shared, unit_id=5)
+
+        self.assertEqual(await client.read_input_registers(10, 1), [1])
+
+        shared.read_input_registers.assert_awaited_once_with(10, 1, unit_id=5)
+
+    async def test_unit_that_does_not_answer_keeps_connection_open(self):
+        async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+            try:
+                while True:
+                    header = await reader.readexactly(7)
+                    tid, _, length, unit = struct.unpack(">HHHB", header)
+                    pdu = await reader.readexactly(length - 1)
+                    # unit 2 never answers
+                    if unit == 1:
+                        asyncio.get_running_loop().call_later(
+                            0.3,
+                            writer.write,
+                            struct.pack(">HHHBBBH", tid, 0, 5, unit, pdu[0], 2, 42),
+                        )
+            except asyncio.IncompleteReadError:
+                writer.close()
+
+        server = await asyncio.start_server(handle, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        pool = ModbusConnectionPool(native_async=True)
+        dead = pool.get_client("127.0.0.1", port, unit_id=2, pipeline_depth=2)
+        healthy = pool.get_client("127.0.0.1", port, unit_id=1, pipeline_depth=2)
+        assert isinstance(dead, PooledAsyncModbusClient)
+        assert isinstance(healthy, PooledAsyncModbusClient)
+        healthy.client.timeout = 0.4
+
+        async def read_later() -> list[int] | None:
+            await asyncio.sleep(0.2)
+            return await healthy.read_holding_registers(0, 1)
+
+        # the request to unit 2 times out while the one to unit 1 is in flight
+        results = await asyncio.gather(dead.read_holding_registers(0, 1), read_later())
+
+        self.assertEqual(results, [None, [42]])
+        self.assertTrue(healthy.is_open)
+        self.assertEqual(await healthy.read_holding_registers(0, 1), [42])
+        await pool.close_async()
+        server.close()
+        await server.wait_closed()
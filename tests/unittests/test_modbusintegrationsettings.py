@@ -1,6 +1,7 @@
 from unittest import TestCase
 
 from modbushil.modbusintegrationsettings import ModbusIntegrationSettings
+from modbushil.modbusregistertypes import ModbusRegisterTypes
 
 
 class TestModbusIntegrationSettings(TestCase):
@@ -105,3 +106,186 @@ class TestModbusIntegrationSettings(TestCase):
             "is marked for Mosaik but is not valid in read cycle",
             str(context.exception),
         )
+
+    def test_auto_io_bundles(self):
+        config = {
+            "modbus_io_bundles": "auto",
+            "request_planner": {"round_trip_cost": 64},
+            "variables": {
+                "var1": {
+                    "datatype": "int32",
+                    "register": "I0-1",
+                    "iotype": "read",
+                    "mosaik": True,
+                },
+                "var2": {
+                    "datatype": "int16",
+                    "register": "I4",
+                    "iotype": "read",
+                    "mosaik": True,
+                },
+                "var3": {
+                    "datatype": "int16",
+                    "register": "H10",
+                    "iotype": "both",
+                    "mosaik": True,
+                },
+                "var4": {
+                    "datatype": "int16",
+                    "register": "H11",
+                    "iotype": "write",
+                    "mosaik": True,
+                },
+            },
+        }
+        settings = ModbusIntegrationSettings(config)
+
+        plan = settings.request_plan
+        self.assertEqual(
+            [
+                (r.start, r.length)
+                for r in plan.read_ranges[ModbusRegisterTypes.INPUT_REGISTER]
+            ],
+            [(0, 5)],
+        )
+        self.assertEqual(
+            [
+                (r.start, r.length)
+                for r in plan.read_ranges[ModbusRegisterTypes.HOLDING_REGISTER]
+            ],
+            [(10, 1)],
+        )
+        self.assertEqual(
+            [
+                (r.start, r.length)
+                for r in plan.write_ranges[ModbusRegisterTypes.HOLDING_REGISTER]
+            ],
+            [(10, 2)],
+        )
+        self.assertEqual(plan.request_count(), 3)
+
+    def test_auto_io_bundles_rejects_writing_input_registers(self):
+        config = {
+            "modbus_io_bundles": "auto",
+            "variables": {
+                "var1": {
+                    "datatype": "int16",
+                    "register": "I0",
+                    "iotype": "write",
+                    "mosaik": True,
+                },
+            },
+        }
+        with self.assertRaises(ValueError) as context:
+            ModbusIntegrationSettings(config)
+        self.assertIn("can not be written", str(context.exception))
+
+    def test_array_register_must_match_block(self):
+        config = {
+            "modbus_io_bundles": "auto",
+            "variables": {
+                "cells": {
+                    "datatype": "float32[3]",
+                    "register": "I100-104",
+                    "iotype": "read",
+                },
+            },
+        }
+        with self.assertRaises(ValueError):
+            ModbusIntegrationSettings(config)
+
+        config["variables"]["cells"]["register"] = "I100-105"
+        settings = ModbusIntegrationSettings(config)
+        self.assertEqual(settings.variables["cells"].count, 3)
+
+    def test_variable_defaults(self):
+        config = {
+            "modbus_io_bundles": "auto",
+            "variable_defaults": {"wordorder": "big"},
+            "variables": {
+                "var1": {"datatype": "int32", "register": "H0-1", "iotype": "read"},
+                "var2": {
+                    "datatype": "int32",
+                    "register": "H2-3",
+                    "iotype": "read",
+                    "wordorder": "little",
+                    "byteorder": "little",
+                },
+            },
+        }
+        settings = ModbusIntegrationSettings(config)
+
+        self.assertEqual(settings.variables["var1"].word_order, "big")
+        self.assertEqual(settings.variables["var1"].byte_order, "big")
+        self.assertEqual(settings.variables["var2"].word_order, "little")
+        self.assertEqual(settings.variables["var2"].byte_order, "little")
+
+        config["variable_defaults"] = {"scale": 2}
+        with self.assertRaises(ValueError):
+            ModbusIntegrationSettings(config)
+
+    def test_bit_variables(self):
+        config = {
+            "modbus_io_bundles": "auto",
+            "variables": {
+                "flags": {
+                    "datatype": "bits",
+                    "register": "H0",
+                    "iotype": "read",
+                    "bit": "4-7",
+                },
+            },
+        }
+        settings = ModbusIntegrationSettings(config)
+        self.assertEqual(settings.variables["flags"].bits, (4, 4))
+
+        for invalid in ("7-4", "a", "1-2-3", -1):
+            config["variables"]["flags"]["bit"] = invalid
+            with self.subTest(bit=invalid), self.assertRaises(ValueError):
+                ModbusIntegrationSettings(config)
+
+        del config["variables"]["flags"]["bit"]
+        with self.assertRaises(ValueError):
+            ModbusIntegrationSettings(config)
+
+        config["variables"]["flags"].update({"datatype": "uint16", "bit": 3})
+        with self.assertRaises(ValueError):
+            ModbusIntegrationSettings(config)
+
+    def test_step_deadline(self):
+        config = {
+            "modbus_io_bundles": "auto",
+            "variables": {
+                "P": {
+                    "datatype": "int",
+                    "register": "H0",
+                    "iotype": "read",
+                    "mosaik": True,
+                },
+                "Q": {
+                    "datatype": "int",
+                    "register": "H1",
+                    "iotype": "read",
+                    "mosaik": True,
+                },
+            },
+        }
+        settings = ModbusIntegrationSettings(config)
+        self.assertIsNone(settings.step_deadline)
+        self.assertEqual(settings.mosaik_staleness_attributes, ())
+
+        config["step_deadline"] = 0.8
+        settings = ModbusIntegrationSettings(config)
+        self.assertEqual(settings.step_deadline, 0.8)
+        self.assertEqual(
+            settings.mosaik_staleness_attributes,
+            (("P", "P_age", "P_stale"), ("Q", "Q_age", "Q_stale")),
+        )
+
+        config["variables"]["P_age"] = config["variables"].pop("Q")
+        with self.assertRaises(ValueError):
+            ModbusIntegrationSettings(config)
+
+        config["step_deadline"] = 0
+        with self.assertRaises(ValueError):
+            ModbusIntegrationSettings(config)
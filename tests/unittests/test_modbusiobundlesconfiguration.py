@@ -34,3 +34,44 @@ class TestModbusIOBundlesConfiguration(TestCase):
             11, 5, rr.ModbusRegisterTypes.HOLDING_REGISTER
         )
         self.assertFalse(io_bundles.has_read_range(test_range_outside))
+
+    def test_read_intervals(self):
+        config = {
+            "read": {
+                "holding_register": [
+                    "0-10",
+                    {"range": "20-30", "interval": 10},
+                    {"range": "40-50", "interval": "1.5s"},
+                ]
+            },
+            "write": {"holding_register": [{"range": "100-110"}]},
+        }
+        io_bundles = mbc.ModbusIOBundlesConfiguration(config)
+
+        self.assertEqual(
+            io_bundles.read_intervals[rr.ModbusRegisterTypes.HOLDING_REGISTER],
+            [mbc.EVERY_STEP, (10, 0.0), (1, 1.5)],
+        )
+        self.assertEqual(
+            io_bundles.get_read_interval(
+                rr.RegisterRange(22, 2, rr.ModbusRegisterTypes.HOLDING_REGISTER)
+            ),
+            (10, 0.0),
+        )
+
+        for invalid in (0, -1, True, 1.5, "0s", "s", "fast"):
+            with self.subTest(interval=invalid), self.assertRaises(ValueError):
+                mbc.ModbusIOBundlesConfiguration(
+                    {"read": {"coil": [{"range": "0-5", "interval": invalid}]}}
+                )
+
+        with self.assertRaises(ValueError):
+            mbc.ModbusIOBundlesConfiguration(
+                {"write": {"coil": [{"range": "0-5", "interval": 2}]}}
+            )
+
+        # the same registers can not be read at different intervals
+        with self.assertRaises(ValueError):
+            mbc.ModbusIOBundlesConfiguration(
+                {"read": {"coil": ["0-5", {"range": "5-8", "interval": 2}]}}
+            )
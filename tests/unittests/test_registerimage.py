@@ -0,0 +1,82 @@
+from unittest import TestCase
+
+from modbushil.modbusregistertypes import ModbusRegisterTypes
+from modbushil.registerimage import RegisterImage
+from modbushil.registerrange import RegisterRange
+
+
+class TestRegisterImage(TestCase):
+    def test_ranges_are_packed(self):
+        image = RegisterImage(
+            ModbusRegisterTypes.HOLDING_REGISTER,
+            [
+                RegisterRange(10, 2, ModbusRegisterTypes.HOLDING_REGISTER),
+                RegisterRange(40000, 2, ModbusRegisterTypes.HOLDING_REGISTER),
+                RegisterRange(20, 3, ModbusRegisterTypes.HOLDING_REGISTER),
+            ],
+        )
+
+        # the gaps between the ranges take no memory
+        self.assertEqual(len(image.data), 2 * 7)
+        self.assertEqual(image.locate(21, 2), (20, 6))
+        self.assertEqual(image.locate(40000, 2), (40000, 10))
+
+        image.store(40000, [1, 2])
+        image.store(10, [3, 4])
+        self.assertEqual(image.get_registers(40000, 2), [1, 2])
+        self.assertEqual(image.get_registers(10, 2), [3, 4])
+        self.assertEqual(image.get_registers(20, 3), [0, 0, 0])
+
+    def test_overlapping_ranges_share_their_values(self):
+        image = RegisterImage(
+            ModbusRegisterTypes.INPUT_REGISTER,
+            [
+                RegisterRange(0, 10, ModbusRegisterTypes.INPUT_REGISTER),
+                RegisterRange(4, 10, ModbusRegisterTypes.INPUT_REGISTER),
+                RegisterRange(14, 2, ModbusRegisterTypes.INPUT_REGISTER),
+            ],
+        )
+
+        self.assertEqual(len(image.data), 2 * 16)
+        image.store(4, list(range(10)))
+        image.store(14, [10, 11])
+        self.assertEqual(image.get_registers(6, 2), [2, 3])
+        self.assertEqual(image.get_registers(0, 10), [0] * 4 + list(range(6)))
+        # the adjacent range follows in the same segment
+        self.assertEqual(image.data[24:], bytes([8, 0, 9, 0, 10, 0, 11, 0]))
+
+    def test_locate_outside_ranges_raises(self):
+        image = RegisterImage(
+            ModbusRegisterTypes.INPUT_REGISTER,
+            [
+                RegisterRange(0, 2, ModbusRegisterTypes.INPUT_REGISTER),
+                RegisterRange(4, 2, ModbusRegisterTypes.INPUT_REGISTER),
+            ],
+        )
+
+        with self.assertRaises(ValueError):
+            image.locate(2, 1)
+        with self.assertRaises(ValueError):
+            image.locate(1, 2)
+
+    def test_set_registers_reports_changes(self):
+        image = RegisterImage(
+            ModbusRegisterTypes.HOLDING_REGISTER,
+            [RegisterRange(0, 4, ModbusRegisterTypes.HOLDING_REGISTER)],
+        )
+
+        self.assertEqual(image.set_registers(1, [-1, 0x1234]), 0)
+        self.assertIsNone(image.set_registers(1, [0xFFFF, 0x1234]))
+        self.assertEqual(image.get_registers(0, 4), [0, 0xFFFF, 0x1234, 0])
+        self.assertEqual(image.view(2, 1).tobytes(), bytes([0x34, 0x12]))
+
+    def test_discretes(self):
+        image = RegisterImage(
+            ModbusRegisterTypes.COIL,
+            [RegisterRange(8, 4, ModbusRegisterTypes.COIL)],
+        )
+
+        image.store(8, [True, False, True, True])
+        self.assertIsNone(image.set_discretes(9, [False, True]))
+        self.assertEqual(image.set_discretes(9, [True]), 8)
+        self.assertEqual(image.get_discretes(8, 4), [True, True, True, True])
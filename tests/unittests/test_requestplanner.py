@@ -0,0 +1,161 @@
+from unittest import TestCase
+
+from modbushil.modbusiobundlesconfiguration import ModbusIOBundlesConfiguration
+from modbushil.modbusregistertypes import ModbusRegisterTypes
+from modbushil.registerrange import RegisterRange
+from modbushil.requestplanner import RequestPlanner
+from modbushil.requestplannersettings import RequestPlannerSettings
+
+
+def spans(ranges: list[RegisterRange]) -> list[tuple[int, int]]:
+    return [(r.start, r.length) for r in ranges]
+
+
+class TestRequestPlanner(TestCase):
+    def test_merges_cheap_read_gaps(self):
+        io_config = ModbusIOBundlesConfiguration(
+            {"read": {"input_register": ["0-9", "12-19", "100-109"]}, "write": {}}
+        )
+        planner = RequestPlanner(RequestPlannerSettings({"round_trip_cost": 64}))
+
+        plan = planner.plan(io_config, [])
+
+        self.assertEqual(
+            spans(plan.read_ranges[ModbusRegisterTypes.INPUT_REGISTER]),
+            [(0, 20), (100, 10)],
+        )
+
+    def test_bundles_with_different_intervals_are_not_merged(self):
+        io_config = ModbusIOBundlesConfiguration(
+            {
+                "read": {
+                    "input_register": [
+                        "0-9",
+                        {"range": "12-19", "interval": 60},
+                        {"range": "25-29", "interval": 60},
+                        "30-39",
+                    ]
+                },
+                "write": {},
+            }
+        )
+        planner = RequestPlanner(RequestPlannerSettings({"round_trip_cost": 64}))
+
+        plan = planner.plan(io_config, [])
+
+        self.assertEqual(
+            spans(plan.read_ranges[ModbusRegisterTypes.INPUT_REGISTER]),
+            [(0, 10), (30, 10), (12, 18)],
+        )
+        self.assertEqual(
+            plan.read_intervals[ModbusRegisterTypes.INPUT_REGISTER],
+            [(1, 0.0), (1, 0.0), (60, 0.0)],
+        )
+
+    def test_gaps_are_not_bridged_across_bundles_of_other_intervals(self):
+        io_config = ModbusIOBundlesConfiguration(
+            {
+                "read": {
+                    "holding_register": [
+                        "0-9",
+                        {"range": "10-19", "interval": 10},
+                        "20-29",
+                    ]
+                },
+                "write": {},
+            }
+        )
+        planner = RequestPlanner(RequestPlannerSettings({"round_trip_cost": 64}))
+
+        plan = planner.plan(io_config, [])
+
+        # the slow bundle is only read at its interval
+        self.assertEqual(
+            spans(plan.read_ranges[ModbusRegisterTypes.HOLDING_REGISTER]),
+            [(0, 10), (20, 10), (10, 10)],
+        )
+        self.assertEqual(
+            plan.read_intervals[ModbusRegisterTypes.HOLDING_REGISTER],
+            [(1, 0.0), (1, 0.0), (10, 0.0)],
+        )
+
+    def test_zero_round_trip_cost_only_merges_adjacent_ranges(self):
+        io_config = ModbusIOBundlesConfiguration(
+            {"read": {"input_register": ["0-9", "10-19", "21-29"]}, "write": {}}
+        )
+        planner = RequestPlanner(RequestPlannerSettings({"round_trip_cost": 0}))
+
+        plan = planner.plan(io_config, [])
+
+        self.assertEqual(
+            spans(plan.read_ranges[ModbusRegisterTypes.INPUT_REGISTER]),
+            [(0, 20), (21, 9)],
+        )
+
+    def test_read_gaps_are_not_bridged_by_default(self):
+        io_config = ModbusIOBundlesConfiguration(
+            {"read": {"input_register": ["0-9", "11-19"]}, "write": {}}
+        )
+        planner = RequestPlanner(RequestPlannerSettings({}))
+
+        plan = planner.plan(io_config, [])
+
+        # devices may reject reads of the unconfigured register in between
+        self.assertEqual(
+            spans(plan.read_ranges[ModbusRegisterTypes.INPUT_REGISTER]),
+            [(0, 10), (11, 9)],
+        )
+
+    def test_write_gaps_are_never_bridged(self):
+        io_config = ModbusIOBundlesConfiguration(
+            {"read": {}, "write": {"holding_register": ["0-9", "11-19"]}}
+        )
+        planner = RequestPlanner(RequestPlannerSettings({}))
+
+        plan = planner.plan(io_config, [])
+
+        self.assertEqual(
+            spans(plan.write_ranges[ModbusRegisterTypes.HOLDING_REGISTER]),
+            [(0, 10), (11, 9)],
+        )
+
+    def test_splits_oversized_ranges_without_cutting_variables(self):
+        io_config = ModbusIOBundlesConfiguration(
+            {"read": {"holding_register": ["0-399"]}, "write": {}}
+        )
+        planner = RequestPlanner(RequestPlannerSettings({}))
+        # float64 across the first protocol boundary at 125
+        variables = [RegisterRange(123, 4, ModbusRegisterTypes.HOLDING_REGISTER)]
+
+        plan = planner.plan(io_config, variables)
+
+        self.assertEqual(
+            spans(plan.read_ranges[ModbusRegisterTypes.HOLDING_REGISTER]),
+            [(0, 123), (123, 125), (248, 125), (373, 27)],
+        )
+        for reg_range in plan.read_ranges[ModbusRegisterTypes.HOLDING_REGISTER]:
+            self.assertLessEqual(reg_range.length, 125)
+
+    def test_coil_gap_cost(self):
+        io_config = ModbusIOBundlesConfiguration(
+            {"read": {"coil": ["0-9", "200-209"]}, "write": {}}
+        )
+        planner = RequestPlanner(RequestPlannerSettings({"round_trip_cost": 64}))
+
+        plan = planner.plan(io_config, [])
+
+        # 190 coils are only 24 bytes, cheaper than a round trip
+        self.assertEqual(spans(plan.read_ranges[ModbusRegisterTypes.COIL]), [(0, 210)])
+
+    def test_fills_request_across_gap_before_splitting(self):
+        io_config = ModbusIOBundlesConfiguration(
+            {"read": {"holding_register": ["0-99", "105-300"]}, "write": {}}
+        )
+        planner = RequestPlanner(RequestPlannerSettings({"round_trip_cost": 64}))
+
+        plan = planner.plan(io_config, [])
+
+        self.assertEqual(
+            spans(plan.read_ranges[ModbusRegisterTypes.HOLDING_REGISTER]),
+            [(0, 125), (125, 125), (250, 51)],
+        )
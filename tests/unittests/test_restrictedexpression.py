@@ -0,0 +1,45 @@
+from unittest import TestCase
+
+from modbushil.restrictedexpression import RestrictedExpression
+
+
+class TestRestrictedExpression(TestCase):
+    def test_supported_elements(self):
+        cases = [
+            ("a * 2 + b / 4 - a // 3 % 2", 6.0),
+            ("-a ** 2 + +b", -5),
+            ("1 if a > b and not a == 3 or b <= 0 else 0", 0),
+            ("2 < a < 4", True),
+            ("min(a, b) + max(a, b, 10) + abs(-b)", 17),
+            ("round(a / b, 2)", 0.75),
+            ("clamp(a * 10, 0, 20)", 20),
+        ]
+        for expression, expected in cases:
+            with self.subTest(expression=expression):
+                function = RestrictedExpression(expression, ["a", "b"]).function
+                self.assertEqual(function(3, 4), expected)
+
+    def test_unsupported_elements_are_rejected(self):
+        expressions = [
+            "__import__('os').system('ls')",
+            "open('file')",
+            "a.real",
+            "a[0]",
+            "[a, b]",
+            "(lambda: a)()",
+            "c + 1",
+            "'text'",
+            "min(a, key=abs)",
+            "a ** b",
+            "a ** 100",
+            "(a ** 2) ** 2",
+            "a if",
+        ]
+        for expression in expressions:
+            with self.subTest(expression=expression), self.assertRaises(ValueError):
+                RestrictedExpression(expression, ["a", "b"])
+
+    def test_no_builtins(self):
+        function = RestrictedExpression("max(a)", ["a"]).function
+        self.assertEqual(function([1, 3, 2]), 3)
+        self.assertEqual(function.__globals__["__builtins__"], {})
@@ -0,0 +1,336 @@
+import threading
+import time
+from unittest import TestCase
+from unittest.mock import MagicMock, patch
+
+from modbushil.siminterface import ModbusSimInterface
+
+
+def create_entity(
+    delay: float, active: list[int], peak: list[int], lock: threading.Lock | None = None
+) -> MagicMock:
+    lock = lock or threading.Lock()
+    manager = MagicMock()
+    buffer: dict = {}
+
+    def read_write_phase():
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(delay)
+        # the read of the cycle sees the write of the same step
+        buffer["P_read"] = buffer["P_set"] * 2
+        with lock:
+            active[0] -= 1
+
+    manager.update_variable_buffer.side_effect = buffer.update
+    manager.read_write_phase.side_effect = read_write_phase
+    manager.get_all_mosaik_persistent_variables.side_effect = lambda: {
+        "P_read": buffer["P_read"]
+    }
+    manager.get_refreshed_mosaik_persistent_variables.return_value = ["P_read"]
+    return manager
+
+
+class TestModbusSimInterface(TestCase):
+    def test_concurrent_step(self):
+        sim = ModbusSimInterface()
+        sim.init(
+            "sid", time_resolution=1.0, step_size=1, use_async=False, concurrent=True
+        )
+        active, peak = [0], [0]
+        for i in range(4):
+            sim.modbus_manager[f"e{i}"] = create_entity(0.05, active, peak)
+            sim.entity_public[f"e{i}"] = {}
+
+        start = time.monotonic()
+        next_step = sim.step(
+            0,
+            {f"e{i}": {"P_set": {"src": i}} for i in range(4)},
+            max_advance=10,
+        )
+        duration = time.monotonic() - start
+        sim.finalize()
+
+        self.assertEqual(next_step, 1)
+        self.assertEqual(peak[0], 4)
+        self.assertLess(duration, 0.15)
+        self.assertEqual(
+            sim.get_data({f"e{i}": ["P_read"] for i in range(4)}),
+            {f"e{i}": {"P_read": 2 * i} for i in range(4)},
+        )
+
+    def test_concurrent_requires_sync_mode(self):
+        sim = ModbusSimInterface()
+        with self.assertRaises(ValueError):
+            sim.init(
+                "sid", time_resolution=1.0, step_size=1, use_async=True, concurrent=True
+            )
+
+    def test_cycles_per_host_are_limited_in_async_mode(self):
+        lock = threading.Lock()
+        active = {"a": [0], "b": [0], "all": [0]}
+        peak = {"a": [0], "b": [0], "all": [0]}
+
+        def create_manager(host, port, config, modbus_client):
+            manager = create_entity(0.02, active[host], peak[host], lock)
+            phase = manager.read_write_phase.side_effect
+
+            def read_write_phase():
+                with lock:
+                    active["all"][0] += 1
+                    peak["all"][0] = max(peak["all"][0], active["all"][0])
+                phase()
+                with lock:
+                    active["all"][0] -= 1
+
+            manager.read_write_phase.side_effect = read_write_phase
+            return manager
+
+        sim = ModbusSimInterface()
+        sim.init(
+            "sid",
+            time_resolution=1.0,
+            step_size=1,
+            use_async=True,
+            max_workers=8,
+            max_cycles_per_host=1,
+        )
+        with (
+            patch("modbushil.siminterface.MappingManager", create_manager),
+            patch("modbushil.siminterface.ConfigurationManager") as configuration,
+        ):
+            config = configuration.get_model_config.return_value
+            config.modbus_client.pipeline_depth = 1
+            config.step_deadline = None
+            sim.instance_counter["model"] = 0
+            entities = [
+                *sim.create(3, "model", "a", 502),
+                *sim.create(3, "model", "b", 502),
+            ]
+        eids = [entity["eid"] for entity in entities]
+
+        sim.step(0, {eid: {"P_set": {"src": 1}} for eid in eids}, max_advance=10)
+        results = [sim.in_flight[eid][-1].result(timeout=5)[1] for eid in eids]
+        sim.finalize()
+
+        self.assertEqual(results, [{"P_read": 2}] * 6)
+        self.assertEqual((peak["a"][0], peak["b"][0]), (1, 1))
+        self.assertEqual(peak["all"][0], 2)
+
+    def create_model_entity(
+        self,
+        sim: ModbusSimInterface,
+        delay: float,
+        step_deadline: float | None = None,
+        index: int = 0,
+    ) -> MagicMock:
+        manager = create_entity(delay, [0], [0])
+        with (
+            patch("modbushil.siminterface.MappingManager", return_value=manager),
+            patch("modbushil.siminterface.ConfigurationManager") as configuration,
+        ):
+            config = configuration.get_model_config.return_value
+            config.modbus_client.pipeline_depth = 1
+            config.step_deadline = step_deadline
+            config.mosaik_staleness_attributes = (
+                ("P_read", "P_read_age", "P_read_stale"),
+            )
+            config.get_mosaik_persistent_variables_defaults.return_value = {
+                "P_read": 0
+            }
+            sim.instance_counter["model"] = index
+            sim.create(1, "model", "localhost", 502)
+        return manager
+
+    def test_steps_in_flight(self):
+        sim = ModbusSimInterface()
+        sim.init(
+            "sid", time_resolution=1.0, step_size=1, use_async=True, steps_in_flight=3
+        )
+        manager = self.create_model_entity(sim, 0.05)
+        eid = "model_localhost_502_0"
+
+        start = time.monotonic()
+        for step in range(1, 4):
+            sim.step(step, {eid: {"P_set": {"src": step}}}, max_advance=10)
+        self.assertLess(time.monotonic() - start, 0.05)
+        self.assertEqual(len(sim.in_flight[eid]), 3)
+        self.assertEqual(sim.get_data({eid: ["P_read"]}), {eid: {"P_read": 0}})
+
+        # the fourth step waits for the oldest cycle and publishes its result
+        sim.step(4, {eid: {"P_set": {"src": 4}}}, max_advance=10)
+        self.assertEqual(sim.get_data({eid: ["P_read"]}), {eid: {"P_read": 2}})
+
+        results = [
+            result and result[1]
+            for result in (future.result(timeout=5) for future in sim.in_flight[eid])
+        ]
+        sim.finalize()
+        self.assertEqual(results, [{"P_read": 4}, {"P_read": 6}, {"P_read": 8}])
+        self.assertEqual(manager.read_write_phase.call_count, 4)
+
+    def test_latest_wins_drops_superseded_cycles(self):
+        sim = ModbusSimInterface()
+        sim.init(
+            "sid", time_resolution=1.0, step_size=1, use_async=True, latest_wins=True
+        )
+        manager = self.create_model_entity(sim, 0.05)
+        eid = "model_localhost_502_0"
+
+        sim.step(1, {eid: {"P_set": {"src": 1}}}, max_advance=10)
+        time.sleep(0.01)  # let the first cycle start
+        for step in range(2, 5):
+            sim.step(step, {eid: {"P_set": {"src": step}}}, max_advance=10)
+        results = [
+            result and result[1]
+            for result in (future.result(timeout=5) for future in sim.in_flight[eid])
+        ]
+        sim.finalize()
+
+        self.assertEqual(results, [{"P_read": 2}, None, None, {"P_read": 8}])
+        self.assertEqual(manager.read_write_phase.call_count, 2)
+
+    def test_synchronous_depth(self):
+        sim = ModbusSimInterface()
+        sim.init(
+            "sid", time_resolution=1.0, step_size=1, use_async=True, steps_in_flight=0
+        )
+        self.create_model_entity(sim, 0.01)
+        eid = "model_localhost_502_0"
+
+        sim.step(0, {eid: {"P_set": {"src": 3}}}, max_advance=10)
+        sim.finalize()
+
+        self.assertEqual(sim.get_data({eid: ["P_read"]}), {eid: {"P_read": 6}})
+
+    def test_pipelining_requires_async(self):
+        sim = ModbusSimInterface()
+        with self.assertRaises(ValueError):
+            sim.init("sid", 1.0, step_size=1, use_async=False, steps_in_flight=2)
+        with self.assertRaises(ValueError):
+            sim.init("sid", 1.0, step_size=1, use_async=False, latest_wins=True)
+        with self.assertRaises(ValueError):
+            sim.init("sid", 1.0, step_size=1, use_async=True, steps_in_flight=-1)
+
+    def test_sync_step_deadline(self):
+        sim = ModbusSimInterface()
+        # 0.5 of a step of 0.1 s
+        sim.init("sid", time_resolution=0.1, step_size=1, use_async=False)
+        manager = self.create_model_entity(sim, 0.2, step_deadline=0.5)
+        eid = "model_localhost_502_0"
+
+        start = time.monotonic()
+        sim.step(0, {eid: {"P_set": {"src": 1}}}, max_advance=10)
+        self.assertLess(time.monotonic() - start, 0.1)
+        # the defaults are returned until the device answers
+        public = sim.get_data({eid: ["P_read", "P_read_stale"]})[eid]
+        self.assertEqual(public["P_read"], 0)
+        self.assertIs(public["P_read_stale"], True)
+
+        # the device is still busy, the inputs wait for its next cycle
+        sim.step(1, {eid: {"P_set": {"src": 2}}}, max_advance=10)
+        self.assertEqual(manager.read_write_phase.call_count, 1)
+
+        time.sleep(0.2)
+        sim.step(2, {eid: {"P_set": {"src": 3}}}, max_advance=10)
+        public = dict(sim.entity_public[eid])
+        self.assertEqual(public["P_read"], 2)
+        self.assertIs(public["P_read_stale"], True)
+        self.assertGreater(public["P_read_age"], 0.0)
+
+        sim.cycles[eid].result(timeout=5)
+        sim.finalize()
+        self.assertEqual(manager.read_write_phase.call_count, 2)
+        self.assertEqual(manager.update_variable_buffer.call_args.args[0], {"P_set": 3})
+
+    def test_sync_step_deadline_of_other_entities(self):
+        sim = ModbusSimInterface()
+        sim.init("sid", time_resolution=0.1, step_size=1, use_async=False)
+        self.create_model_entity(sim, 5.0, step_deadline=1.0)
+        self.create_model_entity(sim, 0.0, step_deadline=1.0, index=1)
+        hung, healthy = "model_localhost_502_0", "model_localhost_502_1"
+
+        values = []
+        for step in range(1, 5):
+            start = time.monotonic()
+            sim.step(
+                step,
+                {hung: {"P_set": {"src": step}}, healthy: {"P_set": {"src": step}}},
+                max_advance=10,
+            )
+            self.assertLess(time.monotonic() - start, 0.5)
+            public = sim.get_data({healthy: ["P_read", "P_read_stale"]})[healthy]
+            self.assertIs(public["P_read_stale"], False)
+            values.append(public["P_read"])
+            self.assertIs(sim.entity_public[hung]["P_read_stale"], True)
+        sim.finalize()
+
+        self.assertEqual(values, [2, 4, 6, 8])
+
+    def test_sync_step_within_deadline(self):
+        sim = ModbusSimInterface()
+        sim.init("sid", time_resolution=1.0, step_size=1, use_async=False)
+        self.create_model_entity(sim, 0.01, step_deadline=1.0)
+        eid = "model_localhost_502_0"
+
+        sim.step(0, {eid: {"P_set": {"src": 1}}}, max_advance=10)
+        sim.finalize()
+
+        public = sim.get_data({eid: ["P_read", "P_read_stale"]})[eid]
+        self.assertEqual(public["P_read"], 2)
+        self.assertIs(public["P_read_stale"], False)
+        self.assertLess(public["P_read_age"], 0.5)
+
+    def test_async_step_deadline(self):
+        sim = ModbusSimInterface()
+        sim.init("sid", time_resolution=0.1, step_size=1, use_async=True)
+        manager = self.create_model_entity(sim, 0.2, step_deadline=0.5)
+        eid = "model_localhost_502_0"
+
+        sim.step(0, {eid: {"P_set": {"src": 1}}}, max_advance=10)
+        start = time.monotonic()
+        sim.step(1, {eid: {"P_set": {"src": 2}}}, max_advance=10)
+        self.assertLess(time.monotonic() - start, 0.1)
+        self.assertEqual(len(sim.in_flight[eid]), 1)
+        self.assertEqual(sim.pending_inputs[eid], {"P_set": 2})
+        self.assertEqual(sim.entity_public[eid]["P_read"], 0)
+        self.assertIs(sim.entity_public[eid]["P_read_stale"], True)
+
+        time.sleep(0.2)
+        sim.step(2, {eid: {"P_set": {"src": 3}}}, max_advance=10)
+        self.assertEqual(sim.entity_public[eid]["P_read"], 2)
+        self.assertIs(sim.entity_public[eid]["P_read_stale"], False)
+
+        sim.in_flight[eid][-1].result(timeout=5)
+        sim.finalize()
+        self.assertEqual(manager.read_write_phase.call_count, 2)
+        self.assertEqual(manager.update_variable_buffer.call_args.args[0], {"P_set": 3})
+
+    def test_finalize_does_not_wait_for_hung_cycles(self):
+        sim = ModbusSimInterface()
+        sim.init("sid", time_resolution=0.1, step_size=1, use_async=False)
+        self.create_model_entity(sim, 1.0, step_deadline=0.5)
+        eid = "model_localhost_502_0"
+
+        sim.step(0, {eid: {"P_set": {"src": 1}}}, max_advance=10)
+        start = time.monotonic()
+        sim.finalize()
+
+        self.assertLess(time.monotonic() - start, 0.5)
+
+    def test_age_of_values_not_read_by_the_cycle(self):
+        sim = ModbusSimInterface()
+        sim.init("sid", time_resolution=1.0, step_size=1, use_async=False)
+        manager = self.create_model_entity(sim, 0.0, step_deadline=1.0)
+        eid = "model_localhost_502_0"
+
+        sim.step(0, {eid: {"P_set": {"src": 1}}}, max_advance=10)
+        # the bundle of P_read is not due on the next step
+        manager.get_refreshed_mosaik_persistent_variables.return_value = []
+        time.sleep(0.05)
+        sim.step(1, {eid: {"P_set": {"src": 1}}}, max_advance=10)
+        sim.finalize()
+
+        self.assertGreaterEqual(sim.entity_public[eid]["P_read_age"], 0.05)
+        self.assertIs(sim.entity_public[eid]["P_read_stale"], False)
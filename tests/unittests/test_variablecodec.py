@@ -0,0 +1,203 @@
+from unittest import TestCase
+
+import modbushil.registerhelpers as rh
+from modbushil.datatype import DataType
+from modbushil.modbusregistertypes import ModbusRegisterTypes
+from modbushil.registerimage import RegisterImage
+from modbushil.registerrange import RegisterRange
+from modbushil.variablecodec import VariableCodec
+
+
+def holding_registers(start: int, length: int) -> RegisterRange:
+    return RegisterRange(start, length, ModbusRegisterTypes.HOLDING_REGISTER)
+
+
+class TestVariableCodec(TestCase):
+    def test_decode_matches_registerhelpers(self):
+        cases = [
+            (DataType.int16, [0xFFF6], rh.register_to_int),
+            (DataType.uint16, [0xFFF6], rh.register_to_uint),
+            (DataType.int32, [0x5678, 0x1234], rh.register_to_int),
+            (DataType.int32, [0xFFF6, 0xFFFF], rh.register_to_int),
+            (DataType.uint32, [0xFFF6, 0xFFFF], rh.register_to_uint),
+            (DataType.int64, [0x3456, 0x9012, 0x5678, 0x1234], rh.register_to_int),
+            (DataType.int64, [0xFFFF, 0xFFFF, 0xFFFF, 0xFFFF], rh.register_to_int),
+            (DataType.int32, [0x0001, 0x0002, 0x8000], rh.register_to_int),
+            (DataType.uint32, [0x0001, 0x0002, 0x8000], rh.register_to_uint),
+            (DataType.float32, [0x522B, 0x449A], rh.register_to_float),
+            (DataType.float64, [0xC6E7, 0x84F4, 0x4A45, 0x4093], rh.register_to_float),
+        ]
+        for data_type, regs, helper in cases:
+            with self.subTest(data_type=data_type, regs=regs):
+                register = holding_registers(3, len(regs))
+                image = RegisterImage(register.type, [holding_registers(0, 10)])
+                image.store(3, regs)
+
+                codec = VariableCodec(data_type, register)
+                _, offset = image.locate(3, len(regs))
+
+                self.assertEqual(codec.decode_from(image.data, offset), helper(regs))
+
+    def test_encode_matches_registerhelpers(self):
+        cases = [
+            (DataType.int16, 1, -10, rh.int_to_register),
+            (DataType.int16, 1, 70000, rh.int_to_register),
+            (DataType.uint32, 2, 0x12345678, rh.uint_to_register),
+            (DataType.int64, 4, -2, rh.int_to_register),
+            (DataType.int32, 3, -3, rh.int_to_register),
+            (DataType.float32, 2, -12.34, rh.float_to_register),
+            (DataType.float64, 4, 1234.56789, rh.float_to_register),
+        ]
+        for data_type, length, value, helper in cases:
+            with self.subTest(data_type=data_type, value=value):
+                image = RegisterImage(
+                    ModbusRegisterTypes.HOLDING_REGISTER, [holding_registers(0, 10)]
+                )
+                codec = VariableCodec(data_type, holding_registers(2, length))
+                _, offset = image.locate(2, length)
+
+                self.assertTrue(codec.encode_into(image.data, offset, value))
+                self.assertFalse(codec.encode_into(image.data, offset, value))
+                self.assertEqual(
+                    image.get_registers(2, length), helper(value, length)
+                )
+
+    def test_byte_and_word_order(self):
+        cases = [
+            ("big", "big", [0x1122, 0x3344]),
+            ("big", "little", [0x3344, 0x1122]),
+            ("little", "big", [0x2211, 0x4433]),
+            ("little", "little", [0x4433, 0x2211]),
+        ]
+        for byte_order, word_order, regs in cases:
+            with self.subTest(byte_order=byte_order, word_order=word_order):
+                image = RegisterImage(
+                    ModbusRegisterTypes.HOLDING_REGISTER, [holding_registers(0, 6)]
+                )
+                image.store(0, regs)
+                uint_codec = VariableCodec(
+                    DataType.uint32, holding_registers(0, 2), byte_order, word_order
+                )
+                self.assertEqual(uint_codec.decode_from(image.data, 0), 0x11223344)
+
+                uint_codec.encode_into(image.data, 4, 0x11223344)
+                self.assertEqual(image.get_registers(2, 2), regs)
+
+                float_codec = VariableCodec(
+                    DataType.float32, holding_registers(0, 2), byte_order, word_order
+                )
+                float_codec.encode_into(image.data, 4, 1.5)
+                self.assertEqual(float_codec.decode_from(image.data, 4), 1.5)
+
+    def test_orders_without_struct_format(self):
+        image = RegisterImage(
+            ModbusRegisterTypes.HOLDING_REGISTER, [holding_registers(0, 3)]
+        )
+        codec = VariableCodec(DataType.int64, holding_registers(0, 3), "big", "big")
+
+        self.assertTrue(codec.encode_into(image.data, 0, -2))
+        self.assertEqual(image.get_registers(0, 3), [0xFFFF, 0xFFFF, 0xFFFE])
+        self.assertEqual(codec.decode_from(image.data, 0), -2)
+
+    def test_byte_order_of_single_register(self):
+        image = RegisterImage(
+            ModbusRegisterTypes.HOLDING_REGISTER, [holding_registers(0, 1)]
+        )
+        image.store(0, [0x1234])
+        codec = VariableCodec(DataType.uint16, holding_registers(0, 1), "little")
+
+        self.assertEqual(codec.decode_from(image.data, 0), 0x3412)
+
+    def test_arrays(self):
+        cases = [
+            (DataType.int16, 1, [-1, 2, -3]),
+            (DataType.uint32, 2, [1, 0x12345678, 3]),
+            (DataType.float32, 2, [0.5, -1.25, 2.0]),
+            (DataType.float64, 4, [0.1, 1e300, -2.5]),
+        ]
+        for data_type, length, values in cases:
+            for word_order in ("big", "little"):
+                with self.subTest(data_type=data_type, word_order=word_order):
+                    register = holding_registers(0, length * len(values))
+                    image = RegisterImage(register.type, [register])
+                    codec = VariableCodec(
+                        data_type, register, "big", word_order, len(values)
+                    )
+
+                    self.assertTrue(codec.encode_into(image.data, 0, values))
+                    self.assertFalse(codec.encode_into(image.data, 0, values))
+                    self.assertEqual(codec.decode_from(image.data, 0), values)
+
+                    # every element is laid out like the scalar of the same type
+                    element = VariableCodec(
+                        data_type, holding_registers(0, length), "big", word_order
+                    )
+                    self.assertEqual(
+                        element.decode_from(image.data, 2 * length), values[1]
+                    )
+
+    def test_bool_array(self):
+        image = RegisterImage(
+            ModbusRegisterTypes.DISCRETE_INPUT,
+            [RegisterRange(0, 8, ModbusRegisterTypes.DISCRETE_INPUT)],
+        )
+        image.store(0, [False, True, True, False, False, False, False, True])
+        codec = VariableCodec(
+            DataType.bool,
+            RegisterRange(1, 3, ModbusRegisterTypes.DISCRETE_INPUT),
+            count=3,
+        )
+
+        self.assertEqual(codec.decode_from(image.data, 1), [True, True, False])
+
+    def test_bool(self):
+        image = RegisterImage(
+            ModbusRegisterTypes.COIL,
+            [RegisterRange(0, 4, ModbusRegisterTypes.COIL)],
+        )
+        codec = VariableCodec(
+            DataType.bool, RegisterRange(2, 1, ModbusRegisterTypes.COIL)
+        )
+
+        self.assertTrue(codec.encode_into(image.data, 2, True))
+        self.assertTrue(codec.decode_from(image.data, 2))
+        self.assertEqual(image.get_discretes(0, 4), [False, False, True, False])
+
+    def test_bit_fields(self):
+        image = RegisterImage(
+            ModbusRegisterTypes.HOLDING_REGISTER, [holding_registers(0, 2)]
+        )
+        image.store(0, [0b1010_0110_0000_1000, 0])
+        flag = VariableCodec(DataType.bits, holding_registers(0, 1), bits=(3, 1))
+        field = VariableCodec(DataType.bits, holding_registers(0, 1), bits=(12, 4))
+
+        self.assertIs(flag.decode_from(image.data, 0), True)
+        self.assertEqual(field.decode_from(image.data, 0), 0b1010)
+
+        # only the bits of the field are replaced
+        self.assertTrue(field.encode_into(image.data, 0, 0b0101))
+        self.assertFalse(field.encode_into(image.data, 0, 0b0101))
+        self.assertTrue(flag.encode_into(image.data, 0, False))
+        self.assertEqual(image.get_registers(0, 1), [0b0101_0110_0000_0000])
+
+        # fields of multi-register values follow the word order
+        wide = VariableCodec(DataType.bits, holding_registers(0, 2), bits=(16, 2))
+        self.assertTrue(wide.encode_into(image.data, 0, 3))
+        self.assertEqual(image.get_registers(1, 1), [0b11])
+
+        with self.assertRaises(ValueError):
+            VariableCodec(DataType.bits, holding_registers(0, 1), bits=(12, 5))
+        with self.assertRaises(ValueError):
+            VariableCodec(DataType.bits, holding_registers(0, 1))
+
+    def test_invalid_mappings_are_rejected(self):
+        with self.assertRaises(ValueError):
+            VariableCodec(DataType.float32, holding_registers(0, 1))
+        with self.assertRaises(ValueError):
+            VariableCodec(DataType.bool, holding_registers(0, 1))
+        with self.assertRaises(ValueError):
+            VariableCodec(
+                DataType.int16, RegisterRange(0, 1, ModbusRegisterTypes.COIL)
+            )
+        with self.assertRaises(ValueError):
+            VariableCodec(DataType.int32, holding_registers(0, 2), "middle")
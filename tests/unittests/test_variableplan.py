@@ -0,0 +1,66 @@
+from unittest import TestCase
+
+from modbushil.modbusintegrationsettings import ModbusIntegrationSettings
+from modbushil.modbusregistertypes import ModbusRegisterTypes
+
+
+class TestVariablePlan(TestCase):
+    def test_entries_are_split_by_kind_and_scale(self):
+        settings = ModbusIntegrationSettings(
+            {
+                "modbus_io_bundles": {
+                    "read": {"input_register": ["0-9"]},
+                    "write": {"holding_register": ["0-9"]},
+                },
+                "variables": {
+                    "power": {"iotype": "read", "datatype": "int16", "register": "i2"},
+                    "voltage": {
+                        "iotype": "read",
+                        "datatype": "uint16",
+                        "register": "i3",
+                        "scale": 0.1,
+                    },
+                    "cells": {
+                        "iotype": "read",
+                        "datatype": "int16[2]",
+                        "register": "i4",
+                    },
+                    "setpoint": {
+                        "iotype": "write",
+                        "datatype": "float32",
+                        "register": "h4-5",
+                        "mosaik": True,
+                        "scale": 2,
+                    },
+                    "internal": {"iotype": "both"},
+                },
+            }
+        )
+        plan = settings.variable_plan
+        codecs = {name: var.codec for name, var in settings.variables.items()}
+        slots = settings.slots
+        input_register = ModbusRegisterTypes.INPUT_REGISTER
+        holding_register = ModbusRegisterTypes.HOLDING_REGISTER
+
+        self.assertEqual(
+            plan.reads, ((input_register, ((slots["power"], codecs["power"], 4),)),)
+        )
+        self.assertEqual(
+            plan.scaled_reads,
+            ((input_register, ((slots["voltage"], codecs["voltage"], 6, 0.1),)),),
+        )
+        self.assertEqual(
+            plan.array_reads, ((input_register, ((slots["cells"], codecs["cells"], 8),)),)
+        )
+        self.assertEqual(plan.writes, ())
+        self.assertEqual(
+            plan.scaled_writes,
+            (
+                (
+                    holding_register,
+                    ((slots["setpoint"], codecs["setpoint"], 8, 0, (4, 2), 2.0),),
+                ),
+            ),
+        )
+        self.assertEqual(plan.scaled_array_reads, ())
+        self.assertEqual(plan.bit_field_groups, ())
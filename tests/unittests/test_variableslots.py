@@ -0,0 +1,14 @@
+from unittest import TestCase
+
+from modbushil.variableslots import UNSET, VariableSlots
+
+
+class TestVariableSlots(TestCase):
+    def test_slots(self):
+        slots = VariableSlots(["a", "b", "a", "c"])
+
+        self.assertEqual(len(slots), 3)
+        self.assertEqual([slots["a"], slots["b"], slots["c"]], [0, 1, 2])
+        self.assertEqual(slots.create_buffer(), [UNSET, UNSET, UNSET])
+        with self.assertRaises(ValueError):
+            slots["d"]